@@ -7,6 +7,70 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 720
     DATABASE_URL: str = "sqlite+aiosqlite:///./hotel.db"
+    DB_ECHO: bool = True  # Solo para desarrollo
+    INIT_DB_COMPLETO: bool = False  # Ejecutar DDL y semilla en cada arranque aunque el esquema esté al día
+    
+    # Perfil del motor SQLite: "produccion" (WAL, pragmas, pool de lectores y escritor único)
+    # o "basico" (motor sin configurar)
+    DB_PROFILE: str = "produccion"
+    DB_READ_POOL_SIZE: int = 5
+    DB_POOL_TIMEOUT: int = 30
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 64 MB
+    
+    # Commit agrupado de las altas de pedidos (opcional)
+    PEDIDOS_GROUP_COMMIT: bool = False
+    GROUP_COMMIT_MS: int = 5
+    GROUP_COMMIT_MAX_FILAS: int = 100
+    
+    # Estáticos con huella y plantillas precomprimidos en memoria (False: servir desde disco)
+    ESTATICOS_EN_MEMORIA: bool = True
+    
+    # Métricas HTTP y SQL en /api/admin/metrics (formato Prometheus)
+    METRICS_ENABLED: bool = True
+    
+    # Detector de N+1 (solo desarrollo): avisa cuando una forma de sentencia se repite
+    DETECTAR_N_MAS_1: bool = False
+    N_MAS_1_UMBRAL: int = 3
+    
+    # Hash y verificación de contraseñas en un pool de hilos (bcrypt libera el GIL)
+    PASSWORD_WORKERS: int = 2
+    PASSWORD_MAX_PENDIENTES: int = 16  # Por encima, los logins reciben 503 con Retry-After
+    
+    # Idempotency-Key en POST /api/pedidos/, /batch y /confirmar
+    IDEMPOTENCIA_HABILITADA: bool = True
+    IDEMPOTENCIA_TTL_SECONDS: int = 86400
+    IDEMPOTENCIA_MAX_CLAVES: int = 10000
+    IDEMPOTENCIA_PERSISTIR: bool = False  # Guardar también en la base (sobrevive a reinicios y workers)
+    
+    # Planificador de repartos (GET /api/admin/despacho)
+    DESPACHO_REPARTIDORES: int = 2
+    DESPACHO_MAX_PARADAS: int = 6  # Habitaciones por ruta
+    DESPACHO_MINUTOS_RUTA: float = 4.0  # Ida y vuelta a la planta
+    DESPACHO_MINUTOS_PARADA: float = 1.0
+    DESPACHO_RESINCRONIZAR_SECONDS: int = 300  # Recarga completa (cambios de otros workers)
+    
+    # Archivo de líneas entregadas/canceladas antiguas (pedidos -> pedidos_archivo)
+    ARCHIVO_HABILITADO: bool = True
+    ARCHIVO_DIAS: int = 30  # Antigüedad del ticket a partir de la cual se archiva
+    ARCHIVO_LOTE: int = 500  # Filas por transacción
+    ARCHIVO_PAUSA_MS: int = 50  # Pausa entre lotes para dejar pasar a los escritores
+    ARCHIVO_INTERVALO_SECONDS: int = 3600
+    
+    # Exportación de pedidos (GET /api/admin/pedidos/export): filas por lote del cursor
+    EXPORT_LOTE: int = 1000
+    
+    # Caché de autenticación en memoria
+    AUTH_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_MAX_TOKENS: int = 10000
+    
+    # Feed de pedidos en tiempo real (SSE)
+    SSE_BUFFER_SIZE: int = 1000
+    SSE_CLIENT_QUEUE_SIZE: int = 100
+    SSE_KEEPALIVE_SECONDS: int = 15
+    SSE_RETRY_MS: int = 3000
     
     # Configuración CORS como string - ¡SIMPLE!
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -1,19 +1,73 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    future=True,
-    echo=True  # Solo para desarrollo
-)
+_url = make_url(settings.DATABASE_URL)
+_es_sqlite_archivo = _url.get_backend_name() == "sqlite" and _url.database not in (None, "", ":memory:")
+_perfil_produccion = settings.DB_PROFILE == "produccion" and _es_sqlite_archivo
+
+def _aplicar_pragmas(solo_lectura: bool):
+    """Devuelve el listener que configura cada conexión SQLite nueva"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if solo_lectura:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+if _perfil_produccion:
+    # Escritor único: una sola conexión, así los commits se serializan en el pool
+    # (esperando turno) en lugar de chocar con "database is locked"
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        future=True,
+        echo=settings.DB_ECHO,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    # Lectores: pool aparte de conexiones de solo lectura que con WAL no bloquean al escritor
+    engine_lectura = create_async_engine(
+        settings.DATABASE_URL,
+        future=True,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    event.listen(engine.sync_engine, "connect", _aplicar_pragmas(solo_lectura=False))
+    event.listen(engine_lectura.sync_engine, "connect", _aplicar_pragmas(solo_lectura=True))
+else:
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        future=True,
+        echo=settings.DB_ECHO
+    )
+    engine_lectura = engine
 
 AsyncSessionLocal = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
 
+AsyncSessionLectura = sessionmaker(
+    engine_lectura, expire_on_commit=False, class_=AsyncSession
+)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_db_lectura():
+    """Sesión de solo lectura para endpoints GET (pool de lectores en el perfil de producción)"""
+    async with AsyncSessionLectura() as session:
+        yield session
@@ -1,13 +1,27 @@
-from fastapi import FastAPI, Request, HTTPException
+import time
+_INICIO_IMPORTS = time.perf_counter()
+
+import logging
+from datetime import datetime
+from fastapi import Depends, FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, RedirectResponse, HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.database import engine, engine_lectura, get_db_lectura, Base
 from app.routers import auth, habitaciones, productos, pedidos, categorias, admin
 from app.config import settings
-from app.models import Habitacion, Categoria, Producto
+from app.models import Habitacion, Categoria, Producto, UsuarioAdmin, EsquemaVersion, VERSION_ESQUEMA
+from app.utils.registro import registro_auth
+from app.utils.metricas import MiddlewareMetricas, metricas
+from app.utils.cache import menu_inicial
+from app.utils.security import hashear_password
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+MARCADOR_MENU = "/*MENU_INICIAL*/null"
 
 app = FastAPI(
     title="Sistema de Gestión de Pedidos - Hotel",
@@ -25,46 +39,155 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-async def init_db():
+if settings.METRICS_ENABLED:
+    app.add_middleware(MiddlewareMetricas)
+    metricas.instrumentar_engine(engine)
+    metricas.instrumentar_engine(engine_lectura)
+
+if settings.IDEMPOTENCIA_HABILITADA:
+    # Reintentos y dobles pulsaciones con la misma Idempotency-Key se ejecutan una sola vez
+    from app.utils.idempotencia import MiddlewareIdempotencia
+    app.add_middleware(MiddlewareIdempotencia, rutas=[
+        ("POST", "/api/pedidos/"), ("POST", "/api/pedidos/batch"), ("POST", "/api/pedidos/confirmar"),
+    ])
+
+if settings.DETECTAR_N_MAS_1:
+    from app.utils import consultas  # Solo en desarrollo
+    app.add_middleware(consultas.MiddlewareNMas1, umbral=settings.N_MAS_1_UMBRAL)
+    consultas.instrumentar_engine(engine)
+    consultas.instrumentar_engine(engine_lectura)
+
+def _agregar_columnas(conn):
+    """create_all no añade columnas nuevas a tablas ya existentes: se añaden aquí (nullable)"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existentes = {columna["name"] for columna in inspector.get_columns(table.name)}
+        for columna in table.columns:
+            if columna.name not in existentes:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {columna.name} {columna.type.compile(conn.dialect)}"
+                )
+
+async def _esquema_al_dia() -> bool:
+    """Comprueba la fila de versión: si coincide con el esquema declarado, no hace falta DDL"""
+    async with engine.connect() as conn:
+        try:
+            version = (await conn.execute(
+                select(EsquemaVersion.version).where(EsquemaVersion.id == 1)
+            )).scalar()
+        except OperationalError:  # Base nueva o anterior a la tabla de versión
+            return False
+    return version == VERSION_ESQUEMA
+
+async def _migrar_esquema():
+    # Solo hacen falta cuando hay que migrar: fuera del arranque en frío habitual
+    from app.utils.archivo import ids_sin_reutilizar
+    from app.utils.busqueda import crear_indice_busqueda
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_agregar_columnas)
+        await conn.run_sync(ids_sin_reutilizar)
+        # Líneas anteriores a guardar el precio: se fija el precio actual del producto
+        await conn.execute(text(
+            "UPDATE pedidos SET precio_unitario = "
+            "(SELECT precio FROM productos WHERE productos.id = pedidos.producto_id) "
+            "WHERE precio_unitario IS NULL"
+        ))
+        # create_all no añade índices nuevos a tablas ya existentes
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+        await conn.run_sync(crear_indice_busqueda)
+
+async def _sembrar(session: AsyncSession):
+    # Insertar habitaciones de demo si no existen
+    if not (await session.execute(text("SELECT * FROM habitaciones LIMIT 1"))).first():
+        for room in settings.DEMO_ROOMS.split(","):
+            numero, apellido = room.split(":")
+            session.add(Habitacion(numero=numero, apellido=apellido))
+    
+    # Insertar categorías si no existen
+    if not (await session.execute(text("SELECT * FROM categorias LIMIT 1"))).first():
+        categorias_iniciales = [
+            Categoria(nombre="Vinos", orden=1),
+            Categoria(nombre="Cafés", orden=2),
+            Categoria(nombre="Zumos", orden=3),
+            Categoria(nombre="Aguas", orden=4),
+            Categoria(nombre="Cervezas", orden=5),
+            Categoria(nombre="Infusiones", orden=6),
+            Categoria(nombre="Refrescos", orden=7),
+        ]
+        session.add_all(categorias_iniciales)
+    
+    # Insertar productos de demo si no existen
+    if not (await session.execute(text("SELECT * FROM productos LIMIT 1"))).first():
+        productos_iniciales = [
+            Producto(nombre="Vino Tinto", precio=10.0, categoria_id=1),
+            Producto(nombre="Café Espresso", precio=2.0, categoria_id=2),
+            Producto(nombre="Zumo de Naranja", precio=3.0, categoria_id=3),
+            Producto(nombre="Agua Mineral", precio=1.5, categoria_id=4),
+            Producto(nombre="Cerveza Lager", precio=2.5, categoria_id=5),
+            Producto(nombre="Té Verde", precio=2.0, categoria_id=6),
+            Producto(nombre="Coca Cola", precio=2.5, categoria_id=7),
+        ]
+        session.add_all(productos_iniciales)
+    
+    # Crear el administrador inicial si no existe
+    if not (await session.execute(text("SELECT * FROM usuarios_admin LIMIT 1"))).first():
+        session.add(UsuarioAdmin(
+            username=settings.ADMIN_USERNAME,
+            email=settings.ADMIN_EMAIL,
+            password_hash=await hashear_password(settings.ADMIN_PASSWORD),
+            es_superadmin=True,
+        ))
+    
+    # Registrar la versión del esquema: los próximos arranques se saltan DDL y semilla
+    await session.merge(EsquemaVersion(id=1, version=VERSION_ESQUEMA, fecha=datetime.utcnow()))
+    await session.commit()
+
+async def init_db():
+    """
+    Arranque de la base de datos. Si la fila de versión coincide con el esquema actual se
+    omiten el DDL y la semilla (arranque en frío de una sola consulta); si no, se migra,
+    se siembra y se actualiza la versión. INIT_DB_COMPLETO fuerza siempre el camino completo.
+    """
+    fases = {}
+    marca = time.perf_counter()
+    def medir(fase: str):
+        nonlocal marca
+        ahora = time.perf_counter()
+        fases[fase] = ahora - marca
+        marca = ahora
+
+    al_dia = not settings.INIT_DB_COMPLETO and await _esquema_al_dia()
+    medir("esquema")
+    if not al_dia:
+        await _migrar_esquema()
+        medir("ddl")
     async with AsyncSession(engine) as session:
-        # Insertar habitaciones de demo si no existen
-        if not (await session.execute(text("SELECT * FROM habitaciones LIMIT 1"))).first():
-            for room in settings.DEMO_ROOMS.split(","):
-                numero, apellido = room.split(":")
-                session.add(Habitacion(numero=numero, apellido=apellido))
-        
-        # Insertar categorías si no existen
-        if not (await session.execute(text("SELECT * FROM categorias LIMIT 1"))).first():
-            categorias_iniciales = [
-                Categoria(nombre="Vinos", orden=1),
-                Categoria(nombre="Cafés", orden=2),
-                Categoria(nombre="Zumos", orden=3),
-                Categoria(nombre="Aguas", orden=4),
-                Categoria(nombre="Cervezas", orden=5),
-                Categoria(nombre="Infusiones", orden=6),
-                Categoria(nombre="Refrescos", orden=7),
-            ]
-            session.add_all(categorias_iniciales)
-        
-        # Insertar productos de demo si no existen
-        if not (await session.execute(text("SELECT * FROM productos LIMIT 1"))).first():
-            productos_iniciales = [
-                Producto(nombre="Vino Tinto", precio=10.0, categoria_id=1),
-                Producto(nombre="Café Espresso", precio=2.0, categoria_id=2),
-                Producto(nombre="Zumo de Naranja", precio=3.0, categoria_id=3),
-                Producto(nombre="Agua Mineral", precio=1.5, categoria_id=4),
-                Producto(nombre="Cerveza Lager", precio=2.5, categoria_id=5),
-                Producto(nombre="Té Verde", precio=2.0, categoria_id=6),
-                Producto(nombre="Coca Cola", precio=2.5, categoria_id=7),
-            ]
-            session.add_all(productos_iniciales)
-        
-        await session.commit()
+        if not al_dia:
+            await _sembrar(session)
+            medir("semilla")
+        # Cargar habitaciones y admins en el registro de autenticación en memoria
+        await registro_auth.cargar(session)
+        medir("registro")
+
+    metricas.arranque.update(fases)
+    logger.info(
+        "Arranque: imports %.1f ms, %s (esquema %s)",
+        metricas.arranque["imports"] * 1000,
+        ", ".join(f"{fase} {duracion * 1000:.1f} ms" for fase, duracion in fases.items()),
+        "al día" if al_dia else "migrado",
+    )
 
 app.add_event_handler("startup", init_db)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+if settings.ARCHIVO_HABILITADO:
+    from app.utils.archivo import archivador
+    app.add_event_handler("startup", archivador.iniciar)
+    app.add_event_handler("shutdown", archivador.detener)
+if settings.PEDIDOS_GROUP_COMMIT:
+    from app.utils.ingesta import cola_pedidos
+    app.add_event_handler("shutdown", cola_pedidos.cerrar)
 
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(habitaciones.router, prefix="/api")
@@ -73,35 +196,54 @@ app.include_router(pedidos.router, prefix="/api/pedidos")
 app.include_router(categorias.router, prefix="/api")
 app.include_router(admin.router, prefix="/api/admin")
 
+metricas.arranque["imports"] = time.perf_counter() - _INICIO_IMPORTS
+
+if settings.ESTATICOS_EN_MEMORIA:
+    # Estáticos con huella y plantillas precomprimidos en memoria
+    from app.utils.estaticos import estaticos
+    _inicio_estaticos = time.perf_counter()
+    estaticos.cargar()
+    metricas.arranque["estaticos"] = time.perf_counter() - _inicio_estaticos
+
+    @app.get("/static/{ruta:path}", include_in_schema=False)
+    async def serve_static(request: Request, ruta: str):
+        respuesta = estaticos.estatico(request, ruta)
+        if respuesta is None:
+            raise HTTPException(status_code=404)
+        return respuesta
+else:
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+
+def _pagina(request: Request, nombre: str):
+    if settings.ESTATICOS_EN_MEMORIA:
+        return estaticos.plantilla(request, nombre)
+    return FileResponse(f"app/templates/{nombre}")
+
 @app.get("/", response_class=HTMLResponse)
-async def serve_index():
-    return FileResponse("app/templates/index.html")
+async def serve_index(request: Request):
+    return _pagina(request, "index.html")
 
 @app.get("/productos", response_class=HTMLResponse)
-async def serve_productos(request: Request):
+async def serve_productos(request: Request, db: AsyncSession = Depends(get_db_lectura)):
     if not request.cookies.get("access_token"):
         return RedirectResponse(url="/", status_code=303)
-    return FileResponse("app/templates/productos.html")
+    if not settings.ESTATICOS_EN_MEMORIA:
+        return FileResponse("app/templates/productos.html")
+    # El menú va incrustado en la página: se pinta sin esperar a /api/productos
+    version, menu = await menu_inicial(db)
+    return estaticos.plantilla_con_datos(request, "productos.html", MARCADOR_MENU, menu, version)
 
 @app.get("/carrito", response_class=HTMLResponse)
 async def serve_carrito(request: Request):
     if not request.cookies.get("access_token"):
         return RedirectResponse(url="/", status_code=303)
-    return FileResponse("app/templates/carrito.html")   
+    return _pagina(request, "carrito.html")
 
 @app.get("/admin", response_class=HTMLResponse)
 async def serve_admin_panel(request: Request):
     if not request.cookies.get("admin_token"):
         return RedirectResponse(url="/", status_code=303)
-    return FileResponse("app/templates/admin/index.html")
-
-@app.get("/carrito", response_class=HTMLResponse)
-async def serve_carrito(request: Request):
-    print("Cookies recibidas:", request.cookies)  # Depuración
-    if not request.cookies.get("access_token"):
-        print("No se encontró access_token, redirigiendo a /")
-        return RedirectResponse(url="/", status_code=303)
-    return FileResponse("app/templates/carrito.html")
+    return _pagina(request, "admin/index.html")
 
 @app.exception_handler(404)
 async def not_found_exception_handler(request: Request, exc: HTTPException):
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Enum as SQLEnum
+import hashlib
+from sqlalchemy import (
+    Column, Integer, String, Boolean, Float, Date, DateTime, ForeignKey, Index, LargeBinary, Enum as SQLEnum
+)
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -11,6 +14,14 @@ class EstadoPedidoDB(PythonEnum):
     entregado = "entregado"
     cancelado = "cancelado"
 
+# Transiciones de estado permitidas: destino -> estados de origen válidos
+TRANSICIONES_PEDIDO = {
+    EstadoPedidoDB.en_proceso: {EstadoPedidoDB.pendiente},
+    EstadoPedidoDB.entregado: {EstadoPedidoDB.en_proceso},
+    EstadoPedidoDB.cancelado: {EstadoPedidoDB.pendiente, EstadoPedidoDB.en_proceso},
+    EstadoPedidoDB.pendiente: set(),
+}
+
 # Modelo Habitación
 class Habitacion(Base):
     __tablename__ = 'habitaciones'
@@ -25,6 +36,7 @@ class Habitacion(Base):
     
     # Relación con Pedidos
     pedidos = relationship("Pedido", back_populates="habitacion")
+    tickets = relationship("Ticket", back_populates="habitacion")
 
 # Modelo Categoría
 class Categoria(Base):
@@ -47,6 +59,7 @@ class Producto(Base):
     descripcion = Column(String(255), nullable=True)
     precio = Column(Float)
     disponible = Column(Boolean, default=True)
+    stock = Column(Integer, nullable=True)  # NULL: sin control de existencias
     imagen = Column(String(255), nullable=True)
     categoria_id = Column(Integer, ForeignKey('categorias.id'))
     
@@ -66,10 +79,94 @@ class Pedido(Base):
     estado = Column(SQLEnum(EstadoPedidoDB), default=EstadoPedidoDB.pendiente)
     fecha = Column(DateTime, default=datetime.utcnow)
     hora_entrega = Column(DateTime, nullable=True)
+    precio_unitario = Column(Float, nullable=True)  # Precio del producto al hacer el pedido
+    ticket_id = Column(Integer, ForeignKey('tickets.id'), nullable=True, index=True)
     
     # Relaciones
     habitacion = relationship("Habitacion", back_populates="pedidos")
     producto = relationship("Producto", back_populates="pedidos")
+    ticket = relationship("Ticket", back_populates="lineas")
+    
+    # Índices para los listados filtrados y paginados por (fecha, id). AUTOINCREMENT: los ids
+    # de líneas archivadas no se vuelven a dar (sin él SQLite reutiliza el mayor al borrarlo)
+    __table_args__ = (
+        Index("ix_pedidos_estado_fecha", "estado", "fecha"),
+        Index("ix_pedidos_habitacion_estado", "habitacion_id", "estado"),
+        Index("ix_pedidos_fecha", "fecha"),
+        {"sqlite_autoincrement": True},
+    )
+
+# Líneas entregadas o canceladas antiguas, movidas fuera de `pedidos` (ver app/utils/archivo.py).
+# Mismas columnas que Pedido y mismo id; sin claves foráneas ni relaciones
+class PedidoArchivo(Base):
+    __tablename__ = 'pedidos_archivo'
+    
+    id = Column(Integer, primary_key=True)
+    habitacion_id = Column(Integer)
+    producto_id = Column(Integer)
+    cantidad = Column(Integer)
+    notas = Column(String(255), nullable=True)
+    estado = Column(SQLEnum(EstadoPedidoDB))
+    fecha = Column(DateTime)
+    hora_entrega = Column(DateTime, nullable=True)
+    precio_unitario = Column(Float, nullable=True)
+    ticket_id = Column(Integer, nullable=True, index=True)
+    
+    __table_args__ = (
+        Index("ix_pedidos_archivo_fecha", "fecha"),
+        Index("ix_pedidos_archivo_habitacion_fecha", "habitacion_id", "fecha"),
+    )
+
+# Cabecera de ticket: agrupa las líneas que se confirman juntas. El total y el estado
+# se recalculan en SQL a partir de las líneas (ver app/utils/tickets.py)
+class Ticket(Base):
+    __tablename__ = 'tickets'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    codigo = Column(String(30))
+    habitacion_id = Column(Integer, ForeignKey('habitaciones.id'))
+    habitacion_numero = Column(String(10))
+    habitacion_apellido = Column(String(50))
+    estado = Column(SQLEnum(EstadoPedidoDB), default=EstadoPedidoDB.en_proceso)
+    fecha = Column(DateTime, default=datetime.utcnow)
+    total = Column(Float, default=0.0)
+    
+    # Relaciones
+    habitacion = relationship("Habitacion", back_populates="tickets")
+    lineas = relationship("Pedido", back_populates="ticket")
+    
+    __table_args__ = (
+        Index("ix_tickets_habitacion_fecha", "habitacion_id", "fecha"),
+        Index("ix_tickets_estado_fecha", "estado", "fecha"),
+        Index("ix_tickets_fecha", "fecha"),
+    )
+
+# Resúmenes del dashboard, mantenidos en la misma transacción que los pedidos
+# (ver app/utils/resumenes.py). No cuentan las líneas canceladas.
+class ResumenHora(Base):
+    __tablename__ = 'resumen_hora'
+    
+    hora = Column(DateTime, primary_key=True)  # Fecha truncada a la hora
+    pedidos = Column(Integer, default=0)
+    unidades = Column(Integer, default=0)
+    ingresos = Column(Float, default=0.0)
+
+class ResumenDia(Base):
+    __tablename__ = 'resumen_dia'
+    
+    dia = Column(Date, primary_key=True)
+    pedidos = Column(Integer, default=0)
+    unidades = Column(Integer, default=0)
+    ingresos = Column(Float, default=0.0)
+
+class ResumenProductoDia(Base):
+    __tablename__ = 'resumen_producto_dia'
+    
+    dia = Column(Date, primary_key=True)
+    producto_id = Column(Integer, ForeignKey('productos.id'), primary_key=True)
+    categoria_id = Column(Integer, ForeignKey('categorias.id'), index=True)
+    unidades = Column(Integer, default=0)
+    ingresos = Column(Float, default=0.0)
 
 # Modelo Usuario Admin
 class UsuarioAdmin(Base):
@@ -81,4 +178,52 @@ class UsuarioAdmin(Base):
     nombre = Column(String(100), nullable=True)
     password_hash = Column(String(255))
     activo = Column(Boolean, default=True)
-    es_superadmin = Column(Boolean, default=False)
\ No newline at end of file
+    es_superadmin = Column(Boolean, default=False)
+
+# Versión del esquema aplicada a la base de datos (una sola fila, id = 1)
+class EsquemaVersion(Base):
+    __tablename__ = 'esquema_version'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(String(40))
+    fecha = Column(DateTime, default=datetime.utcnow)
+
+# Respuestas guardadas por Idempotency-Key (solo con IDEMPOTENCIA_PERSISTIR)
+class ClaveIdempotencia(Base):
+    __tablename__ = 'claves_idempotencia'
+    
+    clave = Column(String(64), primary_key=True)  # sha256 de sesión, ruta y clave del cliente
+    huella = Column(String(64))  # sha256 del cuerpo de la petición
+    estado = Column(Integer)
+    media_type = Column(String(100))
+    cuerpo = Column(LargeBinary)
+    expira = Column(DateTime, index=True)
+
+# Índice de texto completo de productos (solo SQLite con FTS5). Tabla de contenido externo:
+# el texto vive en `productos` y los triggers mantienen el índice en cada escritura.
+# unicode61 con remove_diacritics=2 pliega acentos ("cafe" encuentra "Café").
+DDL_BUSQUEDA_PRODUCTOS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5("
+    "nombre, descripcion, content='productos', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN "
+    "INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); END",
+    "CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion) "
+    "VALUES ('delete', old.id, old.nombre, old.descripcion); "
+    "INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion); END",
+)
+
+def _huella_esquema() -> str:
+    """Huella de las tablas, columnas e índices declarados: cambia con cualquier cambio de modelo"""
+    partes = list(DDL_BUSQUEDA_PRODUCTOS)
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        partes.append(f"{table.name}:{sorted(table.dialect_kwargs.items())}")
+        partes += [f"{c.name}:{c.type}:{c.nullable}" for c in table.columns]
+        partes += sorted(f"{i.name}:{','.join(c.name for c in i.columns)}" for i in table.indexes)
+    return hashlib.sha1("|".join(partes).encode()).hexdigest()
+
+VERSION_ESQUEMA = _huella_esquema()
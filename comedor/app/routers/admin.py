@@ -1,16 +1,34 @@
 # hotel_pedidos/app/routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.orm import selectinload
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app import schemas
-from app.models import Habitacion, Pedido, Producto, Categoria
-from app.database import get_db
+from app.models import (
+    Habitacion, Pedido, PedidoArchivo, Producto, Categoria, Ticket, UsuarioAdmin, EstadoPedidoDB,
+    TRANSICIONES_PEDIDO, ResumenDia, ResumenHora, ResumenProductoDia
+)
+from app.database import get_db, get_db_lectura
 from app.utils.security import get_current_admin  # Cambiado de auth a security
+from app.utils.cache import invalidar_menu, menu_cache
+from app.utils.registro import registro_auth
+from app.utils.eventos import hub_pedidos
+from app.utils.metricas import metricas
+from app.utils.helpers import parse_date_range, encode_cursor, decode_cursor
+from app.utils.resumenes import actualizar_resumenes, cambio_pedido, reconstruir_resumenes
+from app.utils.proyecciones import (
+    select_pedidos, pedidos_dicts, pagina_adapter, tickets_adapter, respuesta_json
+)
+from app.utils.tickets import actualizar_tickets, tickets_dicts
+from app.utils.stock import reponer_stock
+from app.utils.despacho import despacho
+from app.utils.archivo import archivador, corte_archivo, incluye_archivo
 
 router = APIRouter(
-    prefix="/api/admin",
     tags=["Administración"],
     dependencies=[Depends(get_current_admin)]  # Usamos get_current_admin como dependencia global
 )
@@ -22,33 +40,343 @@ class ProductoCreate(BaseModel):
     precio: float
     categoria_id: int
     disponible: bool = True
+    stock: Optional[int] = Field(None, ge=0)
     imagen: Optional[str] = None
 
 @router.get("/habitaciones/", response_model=List[schemas.HabitacionResponse])
-async def listar_habitaciones(db: Session = Depends(get_db)):
+async def listar_habitaciones(db: AsyncSession = Depends(get_db_lectura)):
     """
     Lista todas las habitaciones (solo administradores)
     """
-    return db.query(Habitacion).all()
+    habitaciones = (await db.execute(select(Habitacion).order_by(Habitacion.numero))).scalars().all()
+    return [_habitacion_response(habitacion) for habitacion in habitaciones]
+
+class CheckInData(BaseModel):
+    apellido: str = Field(..., max_length=50)
+    telefono: Optional[str] = Field(None, max_length=20)
+
+async def _get_habitacion(db: AsyncSession, habitacion_id: int) -> Habitacion:
+    habitacion = await db.get(Habitacion, habitacion_id)
+    if not habitacion:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habitación no encontrada"
+        )
+    return habitacion
+
+def _habitacion_response(habitacion: Habitacion) -> schemas.HabitacionResponse:
+    return schemas.HabitacionResponse(
+        id=habitacion.id,
+        numero=habitacion.numero,
+        apellido=habitacion.apellido,
+        telefono=habitacion.telefono,
+        check_in=habitacion.check_in,
+        check_out=habitacion.check_out,
+        activa=habitacion.activa
+    )
+
+def _pedido_response(pedido: Pedido) -> schemas.PedidoResponse:
+    return schemas.PedidoResponse(
+        id=pedido.id,
+        habitacion_id=pedido.habitacion_id,
+        producto_id=pedido.producto_id,
+        cantidad=pedido.cantidad,
+        notas=pedido.notas,
+        estado=pedido.estado.value,
+        fecha=pedido.fecha,
+        hora_entrega=pedido.hora_entrega,
+        precio_unitario=pedido.precio_unitario,
+        ticket_id=pedido.ticket_id,
+        producto=schemas.ProductoSimpleResponse(
+            id=pedido.producto.id,
+            nombre=pedido.producto.nombre,
+            precio=pedido.producto.precio,
+            imagen=pedido.producto.imagen,
+            disponible=pedido.producto.disponible
+        ),
+        habitacion=_habitacion_response(pedido.habitacion)
+    )
+
+@router.put("/habitaciones/{habitacion_id}/checkin", response_model=schemas.HabitacionResponse)
+async def checkin_habitacion(
+    habitacion_id: int,
+    datos: CheckInData,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Registra la entrada de un nuevo huésped en la habitación (solo administradores)
+    """
+    habitacion = await _get_habitacion(db, habitacion_id)
+    habitacion.apellido = datos.apellido
+    habitacion.telefono = datos.telefono
+    habitacion.check_in = datetime.utcnow()
+    habitacion.check_out = None
+    habitacion.activa = True
+    await db.commit()
+    registro_auth.actualizar_habitacion(habitacion)
+    return _habitacion_response(habitacion)
+
+@router.put("/habitaciones/{habitacion_id}/checkout", response_model=schemas.HabitacionResponse)
+async def checkout_habitacion(habitacion_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Registra la salida del huésped e invalida al instante todas sus sesiones (solo administradores)
+    """
+    habitacion = await _get_habitacion(db, habitacion_id)
+    habitacion.check_out = datetime.utcnow()
+    habitacion.activa = False
+    await db.commit()
+    registro_auth.actualizar_habitacion(habitacion)
+    registro_auth.revocar(f"habitacion:{habitacion.id}")
+    return _habitacion_response(habitacion)
+
+@router.put("/usuarios/{admin_id}", response_model=schemas.UsuarioAdminResponse)
+async def actualizar_admin(
+    admin_id: int,
+    datos: schemas.UsuarioAdminUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Actualiza un administrador; si se desactiva, sus tokens dejan de valer al instante (solo administradores)
+    """
+    admin = await db.get(UsuarioAdmin, admin_id)
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Administrador no encontrado"
+        )
+    for key, value in datos.model_dump(exclude_unset=True).items():
+        setattr(admin, key, value)
+    await db.commit()
+    registro_auth.actualizar_admin(admin)
+    return admin
+
+@router.get("/pedidos", response_model=schemas.PedidoPaginaResponse)
+async def listar_pedidos(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    habitacion: Optional[str] = Query(None, description="Número de habitación"),
+    cursor: Optional[str] = None,
+    per_page: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Lista los pedidos del más reciente al más antiguo (solo administradores)
+    Filtra por estado, rango de fechas y habitación, con paginación por cursor sobre (fecha, id).
+    Si el rango llega antes del corte del archivo, se leen también las líneas archivadas.
+    """
+    estado = None
+    if status_filter and status_filter != "all":
+        try:
+            estado = EstadoPedidoDB(status_filter)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Estado de pedido inválido"
+            )
+    inicio = fin = None
+    if date:
+        inicio, _ = parse_date_range(date, date)
+        fin = inicio + timedelta(days=1)
+    elif desde or hasta:
+        inicio, fin = parse_date_range(desde, hasta)
+    if cursor:
+        fecha, pedido_id = decode_cursor(cursor)
+
+    def consulta(P):
+        stmt = select_pedidos(P)
+        if estado is not None:
+            stmt = stmt.where(P.estado == estado)
+        if date:
+            stmt = stmt.where(P.fecha >= inicio, P.fecha < fin)
+        elif desde or hasta:
+            stmt = stmt.where(P.fecha >= inicio, P.fecha <= fin)
+        if habitacion:
+            habitacion_id = select(Habitacion.id).where(Habitacion.numero == habitacion).scalar_subquery()
+            stmt = stmt.where(P.habitacion_id == habitacion_id)
+        if cursor:
+            stmt = stmt.where(tuple_(P.fecha, P.id) < tuple_(fecha, pedido_id))
+        return stmt.order_by(P.fecha.desc(), P.id.desc()).limit(per_page + 1)
+
+    filas = (await db.execute(consulta(Pedido))).all()
+    archivables = estado in (None, EstadoPedidoDB.entregado, EstadoPedidoDB.cancelado)
+    if archivables and incluye_archivo(inicio):
+        # Misma página en el archivo y mezcla por (fecha, id): cada consulta usa su índice
+        filas += (await db.execute(consulta(PedidoArchivo))).all()
+        filas.sort(key=lambda fila: (fila.fecha, fila.id), reverse=True)
+    hay_mas = len(filas) > per_page
+    filas = filas[:per_page]
+    return respuesta_json({
+        "items": pedidos_dicts(filas),
+        "per_page": per_page,
+        "siguiente_cursor": encode_cursor(filas[-1].fecha, filas[-1].id) if hay_mas else None,
+    }, pagina_adapter)
+
+@router.get("/despacho", response_model=schemas.DespachoResponse)
+async def planificar_despacho(
+    limit: int = Query(10, ge=1, le=100, description="Número de rutas"),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Próximas rutas de reparto: líneas en proceso agrupadas por planta y estación, de la
+    más antigua a la más reciente, con salida y entrega estimadas
+    """
+    return await despacho.rutas(db, limit)
+
+@router.get("/tickets", response_model=schemas.TicketPaginaResponse)
+async def listar_tickets(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    habitacion: Optional[str] = Query(None, description="Número de habitación"),
+    cursor: Optional[str] = None,
+    per_page: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Lista los tickets confirmados con sus líneas y total (solo administradores)
+    Mismos filtros y paginación por cursor que /pedidos, sobre las cabeceras de ticket
+    """
+    stmt = select(Ticket)
+    if status_filter and status_filter != "all":
+        try:
+            estado = EstadoPedidoDB(status_filter)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Estado de pedido inválido"
+            )
+        stmt = stmt.where(Ticket.estado == estado)
+    if date:
+        inicio, _ = parse_date_range(date, date)
+        stmt = stmt.where(Ticket.fecha >= inicio, Ticket.fecha < inicio + timedelta(days=1))
+    elif desde or hasta:
+        inicio, fin = parse_date_range(desde, hasta)
+        stmt = stmt.where(Ticket.fecha >= inicio, Ticket.fecha <= fin)
+    if habitacion:
+        stmt = stmt.where(Ticket.habitacion_numero == habitacion)
+    if cursor:
+        fecha, ticket_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Ticket.fecha, Ticket.id) < tuple_(fecha, ticket_id))
+
+    stmt = stmt.order_by(Ticket.fecha.desc(), Ticket.id.desc()).limit(per_page + 1)
+    tickets = (await db.execute(stmt)).scalars().all()
+    hay_mas = len(tickets) > per_page
+    tickets = tickets[:per_page]
+    return respuesta_json({
+        "items": await tickets_dicts(db, tickets),
+        "per_page": per_page,
+        "siguiente_cursor": encode_cursor(tickets[-1].fecha, tickets[-1].id) if hay_mas else None,
+    }, tickets_adapter)
+
+@router.get("/stats")
+async def estadisticas(db: AsyncSession = Depends(get_db_lectura)):
+    """
+    Estadísticas del día para el dashboard (solo administradores)
+    Se leen de los resúmenes incrementales, no del histórico de pedidos
+    """
+    hoy = datetime.utcnow().date()
+    resumen = await db.get(ResumenDia, hoy)
+    stmt = (
+        select(Producto.nombre)
+        .join(ResumenProductoDia, ResumenProductoDia.producto_id == Producto.id)
+        .where(ResumenProductoDia.dia == hoy, ResumenProductoDia.unidades > 0)
+        .order_by(ResumenProductoDia.unidades.desc())
+        .limit(5)
+    )
+    top_products = (await db.execute(stmt)).scalars().all()
+    return {
+        "orders_today": resumen.pedidos if resumen else 0,
+        "units_today": resumen.unidades if resumen else 0,
+        "revenue_today": round(resumen.ingresos, 2) if resumen else 0.0,
+        "occupied_rooms": sum(1 for h in registro_auth.habitaciones.values() if h["activa"]),
+        "top_products": top_products,
+    }
+
+@router.get("/orders-by-hour")
+async def pedidos_por_hora(date: Optional[str] = None, db: AsyncSession = Depends(get_db_lectura)):
+    """
+    Pedidos por hora de un día (hoy por defecto) para el dashboard (solo administradores)
+    """
+    dia, _ = parse_date_range(date, date) if date else (datetime.utcnow(), None)
+    inicio = datetime.combine(dia.date(), datetime.min.time())
+    stmt = select(ResumenHora).where(
+        ResumenHora.hora >= inicio,
+        ResumenHora.hora < inicio + timedelta(days=1)
+    )
+    por_hora = {r.hora.hour: r for r in (await db.execute(stmt)).scalars().all()}
+    return [
+        {
+            "hora": f"{h:02d}:00",
+            "pedidos": por_hora[h].pedidos if h in por_hora else 0,
+            "ingresos": round(por_hora[h].ingresos, 2) if h in por_hora else 0.0,
+        }
+        for h in range(24)
+    ]
+
+@router.get("/products-by-category")
+async def productos_por_categoria(
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Unidades e ingresos por categoría en un rango de fechas (últimos 7 días por defecto)
+    """
+    inicio, fin = parse_date_range(desde, hasta)
+    stmt = (
+        select(
+            Categoria.nombre,
+            func.sum(ResumenProductoDia.unidades),
+            func.sum(ResumenProductoDia.ingresos)
+        )
+        .join(Categoria, Categoria.id == ResumenProductoDia.categoria_id)
+        .where(ResumenProductoDia.dia >= inicio.date(), ResumenProductoDia.dia <= fin.date())
+        .group_by(Categoria.id, Categoria.nombre)
+        .having(func.sum(ResumenProductoDia.unidades) > 0)
+        .order_by(Categoria.orden)
+    )
+    return [
+        {"categoria": nombre, "unidades": unidades or 0, "ingresos": round(ingresos or 0.0, 2)}
+        for nombre, unidades, ingresos in (await db.execute(stmt)).all()
+    ]
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def exportar_metricas():
+    """
+    Métricas de peticiones y SQL en formato de texto de Prometheus (solo administradores)
+    """
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.post("/resumenes/reconstruir")
+async def reconstruir(db: AsyncSession = Depends(get_db)):
+    """
+    Regenera los resúmenes del dashboard desde el histórico (solo administradores)
+    """
+    await reconstruir_resumenes(db)
+    return {"message": "Resúmenes reconstruidos"}
 
-@router.get("/pedidos/", response_model=List[schemas.PedidoResponse])
-async def listar_pedidos(db: Session = Depends(get_db)):
+@router.post("/archivo")
+async def archivar_pedidos():
     """
-    Lista todos los pedidos ordenados por fecha (solo administradores)
-    Incluye información completa de habitaciones y productos
+    Mueve ya al archivo las líneas entregadas o canceladas de tickets anteriores al corte
+    (solo administradores). Normalmente lo hace la tarea periódica.
     """
-    return db.query(Pedido).order_by(Pedido.fecha.desc()).all()
+    archivadas = await archivador.archivar()
+    return {"archivadas": archivadas, "corte": corte_archivo()}
 
 @router.post("/productos/", response_model=schemas.ProductoResponse)
 async def crear_producto(
     producto_data: ProductoCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crea un nuevo producto (solo administradores)
     """
     # Verificar que la categoría existe
-    categoria = db.query(Categoria).filter(Categoria.id == producto_data.categoria_id).first()
+    categoria = await db.get(Categoria, producto_data.categoria_id)
     if not categoria:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -62,41 +390,253 @@ async def crear_producto(
         precio=producto_data.precio,
         categoria_id=producto_data.categoria_id,
         disponible=producto_data.disponible,
+        stock=producto_data.stock,
         imagen=producto_data.imagen,
     )
     
     try:
         db.add(nuevo_producto)
-        db.commit()
-        db.refresh(nuevo_producto)
-        return nuevo_producto
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al crear el producto: {str(e)}"
         )
+    # El catálogo cambió: invalidar el menú cacheado
+    invalidar_menu()
+
+    await db.refresh(nuevo_producto, ["categoria", "pedidos"])
+    await db.refresh(nuevo_producto.categoria, ["productos"])
+    return nuevo_producto
+
+@router.put("/productos/{producto_id}/stock", response_model=schemas.ProductoSimpleResponse)
+async def fijar_stock(
+    producto_id: int,
+    datos: schemas.StockUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Fija las existencias de un producto (solo administradores). Con stock > 0 el producto
+    vuelve a estar disponible; con 0 se marca no disponible; null deja de controlarlas.
+    """
+    valores = {"stock": datos.stock}
+    if datos.stock is not None:
+        valores["disponible"] = datos.stock > 0
+    producto = (await db.execute(
+        update(Producto)
+        .where(Producto.id == producto_id)
+        .values(**valores)
+        .returning(Producto.id, Producto.nombre, Producto.precio, Producto.imagen, Producto.disponible)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if producto is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    await db.commit()
+    invalidar_menu()
+    return producto._asdict()
+
+@router.get("/pedidos/export")
+async def exportar(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+):
+    """
+    Volcado de líneas de pedido en CSV o NDJSON para contabilidad (solo administradores).
+    Un `hasta` sin hora incluye el día entero; por defecto, los últimos 7 días.
+    """
+    from app.utils.exportacion import MEDIA_TYPES, exportar_pedidos  # Solo al exportar
+    inicio, fin = parse_date_range(desde, hasta)
+    if hasta and "T" not in hasta and len(hasta) <= 10:
+        fin += timedelta(days=1)
+    nombre = f"pedidos_{inicio:%Y%m%d}_{fin:%Y%m%d}.{formato}"
+    return StreamingResponse(
+        exportar_pedidos(formato, inicio, fin),
+        media_type=MEDIA_TYPES[formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+@router.get("/pedidos/stream")
+async def stream_pedidos(request: Request):
+    """
+    Feed en tiempo real de pedidos (Server-Sent Events) para las pantallas de cocina.
+    Admite `Last-Event-ID` para recuperar los eventos perdidos durante una reconexión.
+    """
+    ultimo_id = request.headers.get("last-event-id")
+    try:
+        ultimo_id = int(ultimo_id) if ultimo_id else None
+    except ValueError:
+        ultimo_id = None
+    suscripcion = hub_pedidos.suscribir(ultimo_id)
+    return StreamingResponse(
+        hub_pedidos.stream(suscripcion, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.put("/pedidos/estado")
+async def actualizar_estado_pedidos(
+    cambio: schemas.PedidoEstadoLote,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cambia el estado de varios pedidos con un único UPDATE (solo administradores)
+    Selecciona por lista de ids o por filtro (habitación y/o estado actual). Solo se aplican
+    las transiciones válidas; el resultado indica qué pasó con cada id.
+    """
+    if not cambio.ids and not cambio.habitacion and not cambio.estado_actual:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indique ids o un filtro (habitacion, estado_actual)"
+        )
+    destino = EstadoPedidoDB(cambio.estado.value)
+    origenes = TRANSICIONES_PEDIDO[destino]
+    if cambio.estado_actual:
+        origenes = origenes & {EstadoPedidoDB(cambio.estado_actual.value)}
+
+    filtros = []
+    if cambio.ids:
+        filtros.append(Pedido.id.in_(cambio.ids))
+    if cambio.habitacion:
+        filtros.append(Pedido.habitacion_id == select(Habitacion.id).where(
+            Habitacion.numero == cambio.habitacion
+        ).scalar_subquery())
+    if cambio.estado_actual:
+        filtros.append(Pedido.estado == EstadoPedidoDB(cambio.estado_actual.value))
+
+    valores = {"estado": destino}
+    if destino == EstadoPedidoDB.entregado:
+        valores["hora_entrega"] = datetime.utcnow()
+    actualizados = []
+    if origenes:
+        stmt = (
+            update(Pedido)
+            .where(*filtros, Pedido.estado.in_(origenes))
+            .values(**valores)
+            .returning(
+                Pedido.id, Pedido.producto_id, Pedido.cantidad, Pedido.fecha,
+                Pedido.precio_unitario, Pedido.ticket_id
+            )
+            .execution_options(synchronize_session=False)
+        )
+        actualizados = (await db.execute(stmt)).all()
+
+    repuestos = []
+    if destino == EstadoPedidoDB.cancelado and actualizados:
+        # Las líneas ya confirmadas (con ticket) habían descontado stock
+        repuestos = await reponer_stock(db, [
+            (fila.producto_id, fila.cantidad) for fila in actualizados if fila.ticket_id is not None
+        ])
+        # Las líneas canceladas dejan de contar en los resúmenes
+        productos = await menu_cache.productos(db)
+        await actualizar_resumenes(db, [
+            cambio_pedido(
+                Pedido(fecha=fila.fecha, cantidad=fila.cantidad, estado=destino, precio_unitario=fila.precio_unitario),
+                productos[fila.producto_id],
+                (EstadoPedidoDB.en_proceso, fila.cantidad)  # cualquier origen no cancelado cuenta igual
+            )
+            for fila in actualizados
+        ])
+
+    await actualizar_tickets(db, [fila.ticket_id for fila in actualizados])
+
+    resultados = [{"id": fila.id, "resultado": "actualizado"} for fila in actualizados]
+    if cambio.ids:
+        # Clasificar los ids que no se actualizaron
+        restantes = set(cambio.ids) - {fila.id for fila in actualizados}
+        if restantes:
+            stmt = select(Pedido.id, Pedido.estado).where(*filtros, Pedido.id.in_(restantes))
+            estados = dict((await db.execute(stmt)).all())
+            for pedido_id in sorted(restantes):
+                if pedido_id in estados:
+                    resultados.append({
+                        "id": pedido_id,
+                        "resultado": "transicion_invalida",
+                        "estado_actual": estados[pedido_id].value
+                    })
+                else:
+                    resultados.append({"id": pedido_id, "resultado": "no_encontrado"})
+    await db.commit()
+    if repuestos:
+        invalidar_menu()
+
+    if actualizados:
+        if destino == EstadoPedidoDB.en_proceso:
+            despacho.invalidar()  # Líneas que pasan a proceso sin ticket (poco frecuente)
+        else:
+            despacho.retirar([fila.id for fila in actualizados])
+        hub_pedidos.publicar("pedidos_estado", {
+            "ids": [fila.id for fila in actualizados],
+            "estado": destino.value,
+            "hora_entrega": valores.get("hora_entrega"),
+        })
+    return {
+        "estado": destino.value,
+        "actualizados": len(actualizados),
+        "resultados": resultados,
+    }
 
 @router.put("/pedidos/{pedido_id}", response_model=schemas.PedidoResponse)
 async def actualizar_estado_pedido(
     pedido_id: int,
     estado: schemas.EstadoPedido,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualiza el estado de un pedido (solo administradores)
     """
-    pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
+    stmt = (
+        select(Pedido)
+        .where(Pedido.id == pedido_id)
+        .options(
+            selectinload(Pedido.habitacion),
+            selectinload(Pedido.producto)
+        )
+    )
+    pedido = (await db.execute(stmt)).scalars().first()
     if not pedido:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pedido no encontrado"
         )
     
-    pedido.estado = estado
+    destino = EstadoPedidoDB(estado.value)
+    if pedido.estado not in TRANSICIONES_PEDIDO[destino]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Transición no permitida: {pedido.estado.value} -> {destino.value}"
+        )
+    
+    antes = (pedido.estado, pedido.cantidad)
+    pedido.estado = destino
     if estado == "entregado":
         pedido.hora_entrega = datetime.utcnow()
+    repuestos = []
+    if (
+        pedido.estado == EstadoPedidoDB.cancelado
+        and antes[0] == EstadoPedidoDB.en_proceso
+        and pedido.ticket_id is not None
+    ):
+        repuestos = await reponer_stock(db, [(pedido.producto_id, pedido.cantidad)])
     
-    db.commit()
-    db.refresh(pedido)
-    return pedido
\ No newline at end of file
+    await actualizar_resumenes(db, [cambio_pedido(pedido, pedido.producto, antes)])
+    await actualizar_tickets(db, [pedido.ticket_id])
+    await db.commit()
+    if repuestos:
+        invalidar_menu()
+    if pedido.estado == EstadoPedidoDB.en_proceso:
+        despacho.invalidar()
+    else:
+        despacho.retirar([pedido.id])
+    hub_pedidos.publicar("pedido_estado", {
+        "id": pedido.id,
+        "habitacion_id": pedido.habitacion_id,
+        "estado": pedido.estado.value,
+        "hora_entrega": pedido.hora_entrega,
+    })
+    return _pedido_response(pedido)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app import schemas
 from app.database import get_db
-from app.utils.security import authenticate_habitacion, create_access_token
+from app.utils.security import authenticate_habitacion, create_access_token, decode_access_token, verificar_password
+from app.utils.registro import registro_auth
 from app.models import Habitacion, UsuarioAdmin
 
 router = APIRouter(tags=["Autenticación"])
@@ -16,12 +17,13 @@ async def login_habitacion(
     db: AsyncSession = Depends(get_db)
 ):
     habitacion = await authenticate_habitacion(db, form_data.numero, form_data.apellido)
-    if not habitacion:
+    if not habitacion or habitacion.activa is False:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Número de habitación o apellido incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    registro_auth.actualizar_habitacion(habitacion)
     access_token = create_access_token(
         data={"sub": habitacion.numero, "habitacion_id": habitacion.id, "user_type": "habitacion"}
     )
@@ -46,12 +48,15 @@ async def login_admin(
     stmt = select(UsuarioAdmin).where(UsuarioAdmin.username == form_data.username)
     result = await db.execute(stmt)
     user = result.scalars().first()
-    if not user or not user.verify_password(form_data.password):
+    # La conexión se devuelve al pool antes de bcrypt, que puede esperar su turno en cola
+    await db.close()
+    if not user or not user.activo or not await verificar_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    registro_auth.actualizar_admin(user)
     access_token = create_access_token(
         data={"sub": user.username, "user_type": "admin"}
     )
@@ -68,4 +73,27 @@ async def login_admin(
         path="/"  # Aseguramos que esté disponible en todas las rutas
 
     )
-    return response
\ No newline at end of file
+    return response
+
+@router.post("/logout")
+async def logout(request: Request):
+    """
+    Cierra la sesión: revoca el token en el registro en memoria y elimina las cookies.
+    """
+    tokens = [
+        request.cookies.get("access_token"),
+        request.cookies.get("admin_token"),
+        request.headers.get("authorization"),
+    ]
+    for token in tokens:
+        if token:
+            token = token.replace("Bearer ", "")
+            try:
+                payload = decode_access_token(token)
+            except HTTPException:
+                continue
+            registro_auth.revocar_token(token, payload.get("exp"))
+    response = JSONResponse(content={"message": "Sesión cerrada exitosamente"})
+    response.delete_cookie("access_token")
+    response.delete_cookie("admin_token", path="/")
+    return response
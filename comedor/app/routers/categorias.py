@@ -1,27 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from app import schemas
-from app.models import Categoria
-from app.database import get_db
+from app.models import Categoria, Producto
+from app.database import get_db_lectura
+from app.utils.cache import servir_menu
 from typing import List
 
 router = APIRouter(
-    prefix="/api/categorias",
+    prefix="/categorias",
     tags=["Categorías"]
 )
 
+categorias_adapter = TypeAdapter(List[schemas.CategoriaResponse])
+
 @router.get("", response_model=List[schemas.CategoriaResponse])
-async def listar_categorias(db: AsyncSession = Depends(get_db)):
-    stmt = select(Categoria).options(
-        selectinload(Categoria.productos)  # Cargar relación 'productos'
-    )
-    result = await db.execute(stmt)
-    return result.scalars().all()
+async def listar_categorias(request: Request, db: AsyncSession = Depends(get_db_lectura)):
+    async def cargar() -> bytes:
+        stmt = select(Categoria).options(
+            selectinload(Categoria.productos)  # Cargar relación 'productos'
+        )
+        result = await db.execute(stmt)
+        categorias = categorias_adapter.validate_python(result.scalars().all(), from_attributes=True)
+        return categorias_adapter.dump_json(categorias)
+
+    return await servir_menu(request, "categorias", cargar)
 
 @router.get("/{categoria_id}/productos", response_model=List[schemas.ProductoSimpleResponse])
-async def productos_por_categoria(categoria_id: int, db: AsyncSession = Depends(get_db)):
+async def productos_por_categoria(categoria_id: int, db: AsyncSession = Depends(get_db_lectura)):
     stmt = select(Categoria).where(Categoria.id == categoria_id)
     result = await db.execute(stmt)
     categoria = result.scalars().first()
@@ -29,4 +37,4 @@ async def productos_por_categoria(categoria_id: int, db: AsyncSession = Depends(
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     stmt = select(Producto).where(Producto.categoria_id == categoria_id)
     result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app import schemas
 from app.models import Habitacion
-from app.database import get_db
+from app.database import get_db, get_db_lectura
 from app.utils.auth import create_access_token
 from typing import List
 
@@ -43,7 +43,7 @@ async def verificar_habitacion(
     return response
 
 @router.get("/", response_model=List[schemas.HabitacionResponse])
-async def listar_habitaciones(db: AsyncSession = Depends(get_db)):
+async def listar_habitaciones(db: AsyncSession = Depends(get_db_lectura)):
     stmt = select(Habitacion)
     result = await db.execute(stmt)
     return result.scalars().all()
\ No newline at end of file
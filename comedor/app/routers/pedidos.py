@@ -1,16 +1,72 @@
 # hotel_pedidos/app/routers/pedidos.py
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy import select, delete, update
+from sqlalchemy import select, delete, update, insert
 from app import schemas
-from app.database import get_db
-from app.models import Pedido
+from app.database import get_db, get_db_lectura
+from app.models import Pedido, Ticket, EstadoPedidoDB
 from app.utils.security import get_current_habitacion
+from app.utils.eventos import hub_pedidos
+from app.utils.resumenes import actualizar_resumenes, cambio_pedido
+from app.utils.tickets import actualizar_tickets, crear_ticket, tickets_dicts
+from app.utils.proyecciones import select_pedidos, pedidos_dicts, pedidos_adapter, respuesta_json
+from app.utils.cache import invalidar_menu, menu_cache, ProductoRef
+from app.utils.stock import StockInsuficiente, descontar_stock
+from app.utils.despacho import LineaDespacho, despacho
+from app.utils.registro import registro_auth
+from app.config import settings
 from typing import List
+from datetime import datetime
+
+if settings.PEDIDOS_GROUP_COMMIT:
+    from app.utils.ingesta import cola_pedidos  # Solo con commit agrupado
 
 router = APIRouter(tags=["Pedidos"])
 
+def _respuesta_linea(pedido_id: int, fila: dict, producto: ProductoRef, habitacion: dict) -> schemas.PedidoResponse:
+    """Serializa una línea recién insertada con los datos de referencia que ya tiene el servidor"""
+    return schemas.PedidoResponse(
+        id=pedido_id,
+        habitacion_id=fila["habitacion_id"],
+        producto_id=fila["producto_id"],
+        cantidad=fila["cantidad"],
+        notas=fila["notas"],
+        estado=fila["estado"].value,
+        fecha=fila["fecha"],
+        hora_entrega=None,
+        precio_unitario=fila["precio_unitario"],
+        producto=schemas.ProductoSimpleResponse(
+            id=producto.id,
+            nombre=producto.nombre,
+            precio=producto.precio,
+            imagen=producto.imagen,
+            disponible=producto.disponible
+        ),
+        habitacion=schemas.HabitacionResponse(
+            id=habitacion["id"],
+            numero=habitacion["numero"],
+            apellido=habitacion["apellido"],
+            telefono=habitacion["telefono"],
+            check_in=habitacion["check_in"],
+            check_out=habitacion["check_out"],
+            activa=habitacion["activa"]
+        )
+    )
+
+def _fila_pedido(
+    habitacion_id: int, pedido: schemas.PedidoCreateFrontend, producto: ProductoRef, fecha: datetime
+) -> dict:
+    return {
+        "habitacion_id": habitacion_id,
+        "producto_id": pedido.producto_id,
+        "cantidad": pedido.cantidad,
+        "notas": pedido.notas,
+        "estado": EstadoPedidoDB.pendiente,
+        "fecha": fecha,
+        "precio_unitario": producto.precio,  # El precio queda fijado al hacer el pedido
+    }
+
 @router.post("/", response_model=schemas.PedidoResponse, status_code=status.HTTP_201_CREATED)
 async def create_pedido(
     pedido: schemas.PedidoCreateFrontend,
@@ -18,104 +74,80 @@ async def create_pedido(
     habitacion: dict = Depends(get_current_habitacion),
     db: AsyncSession = Depends(get_db)
 ):
-    db_pedido = Pedido(
-        habitacion_id=habitacion["id"],
-        producto_id=pedido.producto_id,
-        cantidad=pedido.cantidad,
-        notas=pedido.notas,
-        estado="pendiente"
-    )
-    db.add(db_pedido)
-    await db.commit()
-    await db.refresh(db_pedido)
-    
-    stmt = (
-        select(Pedido)
-        .where(Pedido.id == db_pedido.id)
-        .options(
-            selectinload(Pedido.habitacion),
-            selectinload(Pedido.producto)
-        )
-    )
-    result = await db.execute(stmt)
-    pedido_completo = result.scalars().first()
-    
-    # Serialización manual
-    return schemas.PedidoResponse(
-        id=pedido_completo.id,
-        habitacion_id=pedido_completo.habitacion_id,
-        producto_id=pedido_completo.producto_id,
-        cantidad=pedido_completo.cantidad,
-        notas=pedido_completo.notas,
-        estado=pedido_completo.estado,
-        fecha=pedido_completo.fecha,
-        hora_entrega=pedido_completo.hora_entrega,
-        producto=schemas.ProductoSimpleResponse(
-            id=pedido_completo.producto.id,
-            nombre=pedido_completo.producto.nombre,
-            precio=pedido_completo.producto.precio,
-            imagen=pedido_completo.producto.imagen,
-            disponible=pedido_completo.producto.disponible
-        ),
-        habitacion=schemas.HabitacionResponse(
-            id=pedido_completo.habitacion.id,
-            numero=pedido_completo.habitacion.numero,
-            apellido=pedido_completo.habitacion.apellido,
-            telefono=pedido_completo.habitacion.telefono,
-            check_in=pedido_completo.habitacion.check_in,
-            check_out=pedido_completo.habitacion.check_out,
-            activa=pedido_completo.habitacion.activa
+    # Producto y habitación salen de las cachés de referencia: no hace falta releerlos
+    producto = (await menu_cache.productos(db)).get(pedido.producto_id)
+    if not producto or not producto.disponible:
+        raise HTTPException(status_code=404, detail="Producto no disponible o no encontrado")
+    habitacion_ref = registro_auth.habitaciones[habitacion["id"]]
+    fila = _fila_pedido(habitacion["id"], pedido, producto, datetime.utcnow())
+
+    if settings.PEDIDOS_GROUP_COMMIT:
+        # Commit agrupado: la fila se inserta junto con las de otras peticiones concurrentes
+        await db.close()  # liberar la conexión del escritor antes de esperar al lote
+        pedido_id = await cola_pedidos.encolar(fila, cambio_pedido(Pedido(**fila), producto))
+    else:
+        result = await db.execute(insert(Pedido).values(**fila).returning(Pedido.id))
+        pedido_id = result.scalar_one()
+        await actualizar_resumenes(db, [cambio_pedido(Pedido(**fila), producto)])
+        await db.commit()
+
+    respuesta = _respuesta_linea(pedido_id, fila, producto, habitacion_ref)
+    hub_pedidos.publicar("pedido_creado", respuesta.model_dump(exclude={"habitacion": {"pedidos"}}))
+    return respuesta
+
+@router.post("/batch", response_model=List[schemas.PedidoResponse], status_code=status.HTTP_201_CREATED)
+async def create_pedidos_batch(
+    pedidos: List[schemas.PedidoCreateFrontend] = Body(..., min_length=1, max_length=100),
+    habitacion: dict = Depends(get_current_habitacion),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Crea varias líneas de pedido en una sola petición y una sola transacción.
+    Valida todos los productos contra la caché de referencia e inserta las líneas de una vez.
+    """
+    productos = await menu_cache.productos(db)
+    faltantes = sorted({
+        p.producto_id for p in pedidos
+        if p.producto_id not in productos or not productos[p.producto_id].disponible
+    })
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Producto no disponible o no encontrado: {', '.join(map(str, faltantes))}"
         )
-    )
+    habitacion_ref = registro_auth.habitaciones[habitacion["id"]]
+
+    fecha = datetime.utcnow()
+    filas = [_fila_pedido(habitacion["id"], p, productos[p.producto_id], fecha) for p in pedidos]
+    result = await db.execute(insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True), filas)
+    ids = result.scalars().all()
+    await actualizar_resumenes(db, [
+        cambio_pedido(Pedido(**fila), productos[fila["producto_id"]]) for fila in filas
+    ])
+    await db.commit()
+
+    respuestas = [
+        _respuesta_linea(pedido_id, fila, productos[fila["producto_id"]], habitacion_ref)
+        for pedido_id, fila in zip(ids, filas)
+    ]
+    for respuesta in respuestas:
+        hub_pedidos.publicar("pedido_creado", respuesta.model_dump(exclude={"habitacion": {"pedidos"}}))
+    return respuestas
 
 @router.get("/pendientes", response_model=List[schemas.PedidoResponse])
 async def get_pedidos_pendientes(
     request: Request,
     habitacion: dict = Depends(get_current_habitacion),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_lectura)
 ):
     stmt = (
-        select(Pedido)
+        select_pedidos()
         .where(Pedido.estado == "pendiente")
         .where(Pedido.habitacion_id == habitacion["id"])
-        .options(
-            selectinload(Pedido.habitacion),
-            selectinload(Pedido.producto)
-        )
+        .order_by(Pedido.id)
     )
     result = await db.execute(stmt)
-    pedidos = result.scalars().all()
-    
-    # Serialización manual para la lista
-    return [
-        schemas.PedidoResponse(
-            id=pedido.id,
-            habitacion_id=pedido.habitacion_id,
-            producto_id=pedido.producto_id,
-            cantidad=pedido.cantidad,
-            notas=pedido.notas,
-            estado=pedido.estado,
-            fecha=pedido.fecha,
-            hora_entrega=pedido.hora_entrega,
-            producto=schemas.ProductoSimpleResponse(
-                id=pedido.producto.id,
-                nombre=pedido.producto.nombre,
-                precio=pedido.producto.precio,
-                imagen=pedido.producto.imagen,
-                disponible=pedido.producto.disponible
-            ),
-            habitacion=schemas.HabitacionResponse(
-                id=pedido.habitacion.id,
-                numero=pedido.habitacion.numero,
-                apellido=pedido.habitacion.apellido,
-                telefono=pedido.habitacion.telefono,
-                check_in=pedido.habitacion.check_in,
-                check_out=pedido.habitacion.check_out,
-                activa=pedido.habitacion.activa
-            )
-        )
-        for pedido in pedidos
-    ]
+    return respuesta_json(pedidos_dicts(result), pedidos_adapter)
 
 @router.put("/{pedido_id}", response_model=schemas.PedidoResponse)
 async def update_pedido(
@@ -139,10 +171,26 @@ async def update_pedido(
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
     
+    # Las líneas confirmadas ya descontaron stock y están en reparto: solo las gestiona
+    # administración. Un pendiente solo puede cancelarse (se confirma con /confirmar).
+    if pedido.estado != EstadoPedidoDB.pendiente:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Solo se pueden modificar pedidos pendientes"
+        )
     update_data = pedido_update.model_dump(exclude_unset=True)
+    if update_data.get("estado") not in (None, schemas.EstadoPedido.pendiente, schemas.EstadoPedido.cancelado):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Un pedido pendiente solo puede cancelarse"
+        )
+    
+    antes = (pedido.estado, pedido.cantidad)
     for key, value in update_data.items():
         setattr(pedido, key, value)
     
+    await actualizar_resumenes(db, [cambio_pedido(pedido, pedido.producto, antes)])
+    await actualizar_tickets(db, [pedido.ticket_id])
     await db.commit()
     await db.refresh(pedido)
     
@@ -156,6 +204,8 @@ async def update_pedido(
         estado=pedido.estado,
         fecha=pedido.fecha,
         hora_entrega=pedido.hora_entrega,
+        precio_unitario=pedido.precio_unitario,
+        ticket_id=pedido.ticket_id,
         producto=schemas.ProductoSimpleResponse(
             id=pedido.producto.id,
             nombre=pedido.producto.nombre,
@@ -185,13 +235,23 @@ async def delete_pedido(
         select(Pedido)
         .where(Pedido.id == pedido_id)
         .where(Pedido.habitacion_id == habitacion["id"])
+        .options(selectinload(Pedido.producto))
     )
     result = await db.execute(stmt)
     pedido = result.scalars().first()
     if not pedido:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    # Lo confirmado pertenece a un ticket cuyo total es histórico: no se borra desde aquí
+    if pedido.estado != EstadoPedidoDB.pendiente or pedido.ticket_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Solo se pueden eliminar pedidos pendientes"
+        )
     
     await db.execute(delete(Pedido).where(Pedido.id == pedido_id))
+    await actualizar_resumenes(db, [
+        cambio_pedido(pedido, pedido.producto, (pedido.estado, pedido.cantidad), eliminado=True)
+    ])
     await db.commit()
     return {"message": "Pedido eliminado"}
 
@@ -201,14 +261,69 @@ async def confirmar_pedidos(
     habitacion: dict = Depends(get_current_habitacion),
     db: AsyncSession = Depends(get_db)
 ):
-    stmt = (
-        update(Pedido)
-        .where(Pedido.habitacion_id == habitacion["id"])
-        .where(Pedido.estado == "pendiente")
-        .values(estado="en_proceso")
-    )
-    result = await db.execute(stmt)
-    await db.commit()
-    if result.rowcount == 0:
+    # Las líneas pendientes pasan a un ticket nuevo con el total calculado en SQL
+    ticket_id = await crear_ticket(db, habitacion)
+    if ticket_id is None:
         raise HTTPException(status_code=404, detail="No hay pedidos pendientes para confirmar")
-    return {"message": "Pedidos confirmados exitosamente"}
\ No newline at end of file
+    # El stock se descuenta en la misma transacción: si falta algo no se confirma nada
+    try:
+        agotados = await descontar_stock(db, ticket_id)
+    except StockInsuficiente as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "No hay existencias suficientes", "productos": e.productos},
+        )
+    ticket = (await db.execute(
+        select(Ticket.codigo, Ticket.total, Ticket.fecha).where(Ticket.id == ticket_id)
+    )).one()
+    lineas = (await db.execute(
+        select(Pedido.id, Pedido.producto_id, Pedido.cantidad, Pedido.notas)
+        .where(Pedido.ticket_id == ticket_id)
+        .order_by(Pedido.id)
+    )).all()
+    pedido_ids = [linea.id for linea in lineas]
+    await db.commit()
+    if agotados:
+        invalidar_menu()
+    await despacho.agregar(db, [
+        LineaDespacho(
+            linea.id, ticket_id, habitacion["id"], habitacion["numero"],
+            linea.producto_id, linea.cantidad, linea.notas, ticket.fecha
+        )
+        for linea in lineas
+    ])
+    hub_pedidos.publicar("pedidos_confirmados", {
+        "habitacion_id": habitacion["id"],
+        "habitacion_numero": habitacion["numero"],
+        "pedido_ids": pedido_ids,
+        "ticket_id": ticket_id,
+        "total": ticket.total,
+    })
+    return {
+        "message": "Pedidos confirmados exitosamente",
+        "ticket_id": ticket_id,
+        "codigo": ticket.codigo,
+        "total": ticket.total,
+    }
+
+@router.get("/cuenta", response_model=schemas.CuentaResponse)
+async def cuenta_habitacion(
+    habitacion: dict = Depends(get_current_habitacion),
+    db: AsyncSession = Depends(get_db_lectura)
+):
+    """
+    Cuenta de la estancia actual: los tickets de la habitación desde el check-in.
+    Se lee de las cabeceras (índice por habitación y fecha) y sus líneas, sin JOIN con productos.
+    """
+    stmt = select(Ticket).where(Ticket.habitacion_id == habitacion["id"])
+    check_in = registro_auth.habitaciones[habitacion["id"]]["check_in"]
+    if check_in:
+        stmt = stmt.where(Ticket.fecha >= check_in)
+    tickets = (await db.execute(stmt.order_by(Ticket.fecha, Ticket.id))).scalars().all()
+    datos = await tickets_dicts(db, tickets)
+    return {
+        "habitacion_numero": habitacion["numero"],
+        "tickets": datos,
+        "total": round(sum(ticket["total"] for ticket in datos), 2),
+    }
\ No newline at end of file
@@ -1,24 +1,43 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app import schemas
 from app.models import Producto
-from app.database import get_db
+from app.database import get_db_lectura
+from app.utils.cache import servir_menu
+from app.utils.busqueda import buscar_productos
+from app.utils.proyecciones import respuesta_json
 from typing import List
 
 router = APIRouter(tags=["Productos"])  # Ajustado prefijo a /productos
 
+productos_adapter = TypeAdapter(List[schemas.ProductoSimpleResponse])
+
 @router.get("", response_model=List[schemas.ProductoSimpleResponse])
-async def listar_productos(db: AsyncSession = Depends(get_db)):
-    stmt = select(Producto)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+async def listar_productos(request: Request, db: AsyncSession = Depends(get_db_lectura)):
+    async def cargar() -> bytes:
+        result = await db.execute(select(Producto))
+        productos = productos_adapter.validate_python(result.scalars().all(), from_attributes=True)
+        return productos_adapter.dump_json(productos)
+
+    return await servir_menu(request, "productos", cargar)
+
+@router.get("/buscar", response_model=List[schemas.ProductoSimpleResponse])
+async def buscar(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    todos: bool = Query(False, description="Incluir productos no disponibles"),
+    db: AsyncSession = Depends(get_db_lectura),
+):
+    """Búsqueda sin acentos y por prefijo sobre nombre y descripción, por relevancia"""
+    return respuesta_json(await buscar_productos(db, q, limit, todos), productos_adapter)
 
 @router.get("/{categoria_id}", response_model=List[schemas.ProductoSimpleResponse])
-async def productos_por_categoria(categoria_id: int, db: AsyncSession = Depends(get_db)):
+async def productos_por_categoria(categoria_id: int, db: AsyncSession = Depends(get_db_lectura)):
     stmt = select(Producto).where(Producto.categoria_id == categoria_id)
     result = await db.execute(stmt)
     productos = result.scalars().all()
     if not productos:
         raise HTTPException(status_code=404, detail="No hay productos en esta categoría")
-    return productos
\ No newline at end of file
+    return productos
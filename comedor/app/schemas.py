@@ -96,6 +96,7 @@ class ProductoBase(BaseModel):
     descripcion: Optional[str] = Field(None, max_length=255, example="Refresco de cola 500ml")
     precio: float = Field(..., gt=0, example=2.5)
     disponible: bool = Field(default=True)
+    stock: Optional[int] = Field(None, ge=0, example=24)
     imagen: Optional[str] = Field(None, max_length=255, example="coca-cola.png")
     categoria_id: int = Field(..., gt=0, example=1)
 
@@ -123,9 +124,13 @@ class ProductoUpdate(BaseModel):
     descripcion: Optional[str] = None
     precio: Optional[float] = None
     disponible: Optional[bool] = None
+    stock: Optional[int] = None
     imagen: Optional[str] = None
     categoria_id: Optional[int] = None
 
+class StockUpdate(BaseModel):
+    stock: Optional[int] = Field(..., ge=0, description="Existencias; null deja de controlarlas")
+
 # --------------------------
 # Modelos para Pedido
 # --------------------------
@@ -149,6 +154,12 @@ class PedidoUpdate(BaseModel):
     notas: Optional[str] = Field(None, max_length=255)
     estado: Optional[EstadoPedido] = None
 
+class PedidoEstadoLote(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=1000, example=[12, 13, 14])
+    habitacion: Optional[str] = Field(None, max_length=10, example="102", description="Número de habitación")
+    estado_actual: Optional[EstadoPedido] = Field(None, example="en_proceso")
+    estado: EstadoPedido = Field(..., example="entregado")
+
 class PedidoSimpleResponse(BaseModel):
     id: int
     producto_id: int
@@ -164,6 +175,8 @@ class PedidoResponse(PedidoBase):
     id: int
     fecha: datetime
     hora_entrega: Optional[datetime] = None
+    precio_unitario: Optional[float] = None
+    ticket_id: Optional[int] = None
     producto: ProductoSimpleResponse
     habitacion: Optional[HabitacionResponse] = None
     
@@ -171,7 +184,71 @@ class PedidoResponse(PedidoBase):
         from_attributes=True,
         exclude=["habitacion__pedidos"]  # Excluir explícitamente pedidos de habitacion
     )
-    
+
+class PedidoPaginaResponse(BaseModel):
+    items: List[PedidoResponse]
+    per_page: int
+    siguiente_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente")
+
+# --------------------------
+# Modelos para Ticket
+# --------------------------
+class TicketLineaResponse(BaseModel):
+    id: int
+    producto_id: int
+    producto_nombre: str
+    cantidad: int
+    precio_unitario: float
+    notas: Optional[str] = None
+    estado: EstadoPedido
+
+class TicketResponse(BaseModel):
+    id: int
+    codigo: str
+    habitacion_id: int
+    habitacion_numero: str
+    habitacion_apellido: Optional[str] = None
+    estado: EstadoPedido
+    fecha: datetime
+    total: float
+    items: List[TicketLineaResponse] = []
+
+class TicketPaginaResponse(BaseModel):
+    items: List[TicketResponse]
+    per_page: int
+    siguiente_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente")
+
+class DespachoLineaResponse(BaseModel):
+    id: int
+    producto_id: int
+    producto_nombre: str
+    cantidad: int
+    notas: Optional[str] = None
+
+class DespachoParadaResponse(BaseModel):
+    habitacion_id: int
+    habitacion_numero: str
+    ticket_ids: List[int]
+    lineas: List[DespachoLineaResponse]
+
+class DespachoRutaResponse(BaseModel):
+    planta: Optional[int] = Field(None, description="Planta deducida del número de habitación")
+    estacion_id: Optional[int] = Field(None, description="Categoría que prepara las líneas")
+    estacion: str
+    paradas: List[DespachoParadaResponse]
+    espera_max_segundos: int = Field(..., description="Antigüedad de la línea más antigua de la ruta")
+    salida_estimada: datetime
+    entrega_estimada: datetime
+
+class DespachoResponse(BaseModel):
+    generado: datetime
+    lineas_abiertas: int
+    rutas: List[DespachoRutaResponse]
+
+class CuentaResponse(BaseModel):
+    habitacion_numero: str
+    tickets: List[TicketResponse]
+    total: float
 
 # --------------------------
 # Resolver referencias circulares
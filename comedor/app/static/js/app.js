@@ -57,17 +57,27 @@ function renderProducts(productos) {
     });
 }
 
+// Idempotency-Key: la misma clave se reutiliza mientras la acción no reciba respuesta,
+// así una doble pulsación o un reintento tras un corte de red no duplican el pedido
+function nuevaClaveIdempotencia() {
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+const clavesEnCurso = {};
+
 async function addToCart(productoId) {
+    const clave = clavesEnCurso[productoId] || (clavesEnCurso[productoId] = nuevaClaveIdempotencia());
     try {
         console.log('Añadiendo al carrito:', productoId);
         const response = await axios.post('/api/pedidos/', {
             producto_id: productoId,
             cantidad: 1,
             notas: "Añadido desde el frontend"
-        }, { withCredentials: true });
+        }, { withCredentials: true, headers: { 'Idempotency-Key': clave } });
+        delete clavesEnCurso[productoId];
         console.log('Respuesta del servidor:', response.data);
         alert(`Producto añadido al carrito (Pedido ID: ${response.data.pedido_id})`);
     } catch (error) {
+        if (error.response) delete clavesEnCurso[productoId];
         const errorMsg = error.response ? error.response.data.detail || error.response.statusText : error.message;
         console.error('Error al añadir al carrito:', errorMsg);
         alert(`Error al añadir al carrito: ${errorMsg}`);
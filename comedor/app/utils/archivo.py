@@ -0,0 +1,174 @@
+# hotel_pedidos/app/utils/archivo.py
+"""
+Archivo de pedidos: las líneas entregadas o canceladas de tickets cerrados con más de
+ARCHIVO_DIAS días se mueven de `pedidos` a `pedidos_archivo`, para que la tabla viva solo
+tenga lo que se está sirviendo (y lo reciente) y quepa en caché.
+
+- Se mueve por lotes de ARCHIVO_LOTE filas, cada uno en su propia transacción corta
+  (INSERT ... SELECT y DELETE por id), con una pausa entre lotes para no acaparar el
+  escritor de SQLite. Corre en segundo plano cada ARCHIVO_INTERVALO_SECONDS y se puede
+  lanzar a mano con POST /api/admin/archivo.
+- Toda línea archivada es de un ticket confirmado antes de `corte_archivo()` (o, sin
+  ticket, es ella misma anterior), así que su fecha también es anterior al corte. Las
+  consultas de histórico solo leen el archivo cuando su rango de fechas llega antes.
+- Una línea conserva su id en el archivo. `pedidos` usa AUTOINCREMENT para que SQLite no
+  reutilice los ids más altos una vez archivados; `ids_sin_reutilizar` migra las bases
+  creadas sin él.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, insert, or_, select, union_all
+from sqlalchemy.orm import aliased
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import EstadoPedidoDB, Pedido, PedidoArchivo, Ticket
+from app.utils.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = [columna.name for columna in PedidoArchivo.__table__.columns]
+
+def corte_archivo() -> datetime:
+    """Fecha antes de la cual puede haber líneas archivadas"""
+    return datetime.utcnow() - timedelta(days=settings.ARCHIVO_DIAS)
+
+def incluye_archivo(desde: Optional[datetime]) -> bool:
+    """¿Un rango que empieza en `desde` (None: sin límite) necesita leer el archivo?"""
+    return desde is None or desde < corte_archivo()
+
+def pedidos_historico():
+    """Entidad Pedido sobre pedidos UNION ALL pedidos_archivo (para agregados de todo el histórico)"""
+    historico = union_all(
+        select(*[Pedido.__table__.c[nombre] for nombre in COLUMNAS]),
+        select(*[PedidoArchivo.__table__.c[nombre] for nombre in COLUMNAS]),
+    ).subquery("pedidos_historico")
+    return aliased(Pedido, historico)
+
+def ids_sin_reutilizar(conn) -> None:
+    """
+    Reconstruye `pedidos` con AUTOINCREMENT si se creó sin él y deja la secuencia por encima
+    de todo id archivado (para run_sync en la migración). Las líneas que ya reutilizaron un
+    id del archivo reciben uno nuevo.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    tabla = Pedido.__table__
+    ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'pedidos'").scalar()
+    if "AUTOINCREMENT" not in (ddl or "").upper():
+        # Ninguna tabla referencia a pedidos: se copia a una tabla nueva con los mismos índices
+        columnas = ", ".join(columna.name for columna in tabla.columns)
+        for index in tabla.indexes:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        conn.exec_driver_sql("ALTER TABLE pedidos RENAME TO pedidos_sin_autoincrement")
+        tabla.create(conn)
+        conn.exec_driver_sql(
+            f"INSERT INTO pedidos ({columnas}) SELECT {columnas} FROM pedidos_sin_autoincrement"
+        )
+        conn.exec_driver_sql("DROP TABLE pedidos_sin_autoincrement")
+
+    def maximo_id() -> int:
+        return conn.exec_driver_sql(
+            "SELECT max(coalesce((SELECT max(id) FROM pedidos), 0), "
+            "coalesce((SELECT max(id) FROM pedidos_archivo), 0))"
+        ).scalar()
+
+    conn.exec_driver_sql(
+        "UPDATE pedidos SET id = id + ? WHERE id IN (SELECT id FROM pedidos_archivo)", (maximo_id(),)
+    )
+    ultimo = maximo_id()
+    if not conn.exec_driver_sql(
+        "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'pedidos'", (ultimo,)
+    ).rowcount:
+        conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('pedidos', ?)", (ultimo,))
+
+class Archivador:
+    def __init__(self):
+        self.archivadas = 0
+        self.ultima_ejecucion: Optional[float] = None
+        self.ultima_duracion = 0.0
+        self._tarea: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _lote(self, corte: datetime) -> int:
+        confirmada = func.coalesce(Ticket.fecha, Pedido.fecha)
+        candidatas = (
+            select(*[Pedido.__table__.c[nombre] for nombre in COLUMNAS])
+            .outerjoin(Ticket, Ticket.id == Pedido.ticket_id)
+            .where(
+                Pedido.estado.in_([EstadoPedidoDB.entregado, EstadoPedidoDB.cancelado]),
+                confirmada < corte,
+                # Solo tickets cerrados: sus líneas se archivan todas juntas
+                or_(Pedido.ticket_id.is_(None), Ticket.estado != EstadoPedidoDB.en_proceso),
+            )
+            .order_by(Pedido.id)
+            .limit(settings.ARCHIVO_LOTE)
+        )
+        async with AsyncSessionLocal() as db:
+            # La transacción empieza escribiendo: lo que se copia es lo que se borra
+            ids = (await db.execute(
+                insert(PedidoArchivo).from_select(COLUMNAS, candidatas).returning(PedidoArchivo.id)
+            )).scalars().all()
+            if ids:
+                await db.execute(delete(Pedido).where(Pedido.id.in_(ids)))
+            await db.commit()
+        return len(ids)
+
+    async def archivar(self) -> int:
+        """Mueve al archivo todo lo que ha pasado el corte, lote a lote. Devuelve las filas movidas"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            inicio = time.perf_counter()
+            corte = corte_archivo()
+            total = 0
+            while True:
+                movidas = await self._lote(corte)
+                total += movidas
+                if movidas < settings.ARCHIVO_LOTE:
+                    break
+                await asyncio.sleep(settings.ARCHIVO_PAUSA_MS / 1000)
+            self.archivadas += total
+            self.ultima_ejecucion = time.time()
+            self.ultima_duracion = time.perf_counter() - inicio
+        if total:
+            logger.info("Archivo: %d líneas movidas en %.1f ms", total, self.ultima_duracion * 1000)
+        return total
+
+    async def _periodicamente(self) -> None:
+        # La primera pasada espera un poco para no competir con el tráfico del arranque
+        await asyncio.sleep(min(settings.ARCHIVO_INTERVALO_SECONDS, 60))
+        while True:
+            try:
+                await self.archivar()
+            except Exception:  # Otro worker archivando a la vez, base ocupada...: se reintenta luego
+                logger.exception("Fallo al archivar pedidos")
+            await asyncio.sleep(settings.ARCHIVO_INTERVALO_SECONDS)
+
+    def iniciar(self) -> None:
+        if settings.ARCHIVO_HABILITADO and self._tarea is None:
+            self._tarea = asyncio.create_task(self._periodicamente())
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def metricas(self) -> List[str]:
+        return [
+            "# HELP archivo_lineas_total Líneas movidas de pedidos a pedidos_archivo",
+            "# TYPE archivo_lineas_total counter",
+            f"archivo_lineas_total {self.archivadas}",
+            "# HELP archivo_ultima_duracion_segundos Duración de la última pasada de archivo",
+            "# TYPE archivo_ultima_duracion_segundos gauge",
+            f"archivo_ultima_duracion_segundos {round(self.ultima_duracion, 6)}",
+        ]
+
+archivador = Archivador()
+metricas.registrar_colector(archivador.metricas)
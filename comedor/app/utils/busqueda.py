@@ -0,0 +1,83 @@
+# hotel_pedidos/app/utils/busqueda.py
+"""
+Búsqueda de productos por nombre y descripción (typeahead de la carta).
+
+En SQLite usa la tabla FTS5 `productos_fts` (ver DDL_BUSQUEDA_PRODUCTOS): sin acentos,
+por prefijo ("te" encuentra "Té Verde") y ordenada por bm25, con el nombre pesando más
+que la descripción. Sin FTS5 (u otro motor) se recurre a LIKE, sin plegado de acentos.
+"""
+import logging
+import re
+from typing import List, Optional
+from sqlalchemy import Boolean, Float, Integer, String, and_, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import DDL_BUSQUEDA_PRODUCTOS, Producto
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMINOS = 8
+_RE_TERMINOS = re.compile(r"\w+")
+
+_SQL_BUSCAR = text(
+    "SELECT p.id, p.nombre, p.precio, p.imagen, p.disponible "
+    "FROM productos_fts JOIN productos AS p ON p.id = productos_fts.rowid "
+    "WHERE productos_fts MATCH :consulta AND (:todos OR p.disponible) "
+    "ORDER BY bm25(productos_fts, 10.0, 1.0), p.nombre "
+    "LIMIT :limite"
+).columns(id=Integer, nombre=String, precio=Float, imagen=String, disponible=Boolean)
+
+_fts: Optional[bool] = None  # ¿Existe productos_fts? Se averigua en la primera búsqueda
+
+def crear_indice_busqueda(conn) -> None:
+    """Crea la tabla FTS5 y sus triggers y la reconstruye (para run_sync en la migración)"""
+    global _fts
+    if conn.dialect.name != "sqlite":
+        return
+    if not conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar():
+        logger.warning("SQLite sin FTS5: la búsqueda de productos usará LIKE")
+        _fts = False
+        return
+    for sentencia in DDL_BUSQUEDA_PRODUCTOS:
+        conn.exec_driver_sql(sentencia)
+    # Los productos anteriores al índice (o escritos sin triggers) se indexan aquí
+    conn.exec_driver_sql("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+    _fts = True
+
+def terminos(consulta: str) -> List[str]:
+    return _RE_TERMINOS.findall(consulta)[:MAX_TERMINOS]
+
+async def _hay_fts(db: AsyncSession) -> bool:
+    global _fts
+    if _fts is None:
+        if db.bind.dialect.name != "sqlite":
+            _fts = False
+        else:
+            _fts = (await db.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'"
+            ))).first() is not None
+    return _fts
+
+async def buscar_productos(db: AsyncSession, consulta: str, limite: int, todos: bool = False) -> List[dict]:
+    """Productos que contienen todos los términos (el último, y cada uno, como prefijo)"""
+    partes = terminos(consulta)
+    if not partes:
+        return []
+    if await _hay_fts(db):
+        # Cada término entre comillas: el texto del huésped nunca se interpreta como sintaxis FTS5
+        match = " ".join(f'"{termino}"*' for termino in partes)
+        filas = await db.execute(_SQL_BUSCAR, {"consulta": match, "todos": todos, "limite": limite})
+        return [dict(fila._mapping) for fila in filas]
+
+    condiciones = [
+        or_(Producto.nombre.ilike(f"%{termino}%"), Producto.descripcion.ilike(f"%{termino}%"))
+        for termino in partes
+    ]
+    if not todos:
+        condiciones.append(Producto.disponible.is_(True))
+    stmt = (
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.imagen, Producto.disponible)
+        .where(and_(*condiciones))
+        .order_by(Producto.nombre)
+        .limit(limite)
+    )
+    return [dict(fila._mapping) for fila in await db.execute(stmt)]
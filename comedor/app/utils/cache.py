@@ -0,0 +1,133 @@
+# hotel_pedidos/app/utils/cache.py
+import json
+import time
+from threading import Lock
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Categoria, Producto
+
+class ProductoRef(NamedTuple):
+    """Datos de referencia de un producto, sin ORM"""
+    id: int
+    nombre: str
+    precio: float
+    imagen: Optional[str]
+    disponible: bool
+    categoria_id: Optional[int]
+
+class MenuCache:
+    """
+    Caché del catálogo (productos y categorías) a nivel de proceso.
+    Guarda el JSON ya serializado junto a la versión del catálogo con la que se generó;
+    cualquier escritura del admin incrementa la versión y deja las entradas obsoletas.
+    """
+
+    def __init__(self):
+        # Se parte de la hora de arranque para que un ETag emitido por un proceso anterior
+        # nunca coincida con la versión de un catálogo que pudo cambiar entre medias
+        self._version = time.time_ns() // 1_000_000
+        self._entradas: Dict[str, Tuple[int, bytes]] = {}
+        self._productos: Optional[Tuple[int, Dict[int, ProductoRef]]] = None
+        self._lock = Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidar(self) -> int:
+        """Incrementa la versión del catálogo e invalida todas las entradas"""
+        with self._lock:
+            self._version += 1
+            self._entradas.clear()
+            self._productos = None
+            return self._version
+
+    def etag(self, clave: str, version: Optional[int] = None) -> str:
+        return f'"{clave}-v{self._version if version is None else version}"'
+
+    def obtener(self, clave: str) -> Optional[Tuple[int, bytes]]:
+        """Devuelve (versión, JSON) si la entrada pertenece a la versión actual"""
+        entrada = self._entradas.get(clave)
+        if entrada is None or entrada[0] != self._version:
+            return None
+        return entrada
+
+    def guardar(self, clave: str, version: int, contenido: bytes) -> None:
+        """Guarda el JSON generado con `version`; se descarta si el catálogo cambió mientras tanto"""
+        with self._lock:
+            if version == self._version:
+                self._entradas[clave] = (version, contenido)
+
+    async def productos(self, db: AsyncSession) -> Dict[int, ProductoRef]:
+        """Productos por id para la versión actual del catálogo (se cargan en una consulta si hace falta)"""
+        entrada = self._productos
+        if entrada is not None and entrada[0] == self._version:
+            return entrada[1]
+        version = self._version
+        result = await db.execute(select(
+            Producto.id, Producto.nombre, Producto.precio,
+            Producto.imagen, Producto.disponible, Producto.categoria_id
+        ))
+        productos = {fila.id: ProductoRef(*fila) for fila in result}
+        with self._lock:
+            if version == self._version:
+                self._productos = (version, productos)
+        return productos
+
+menu_cache = MenuCache()
+
+def invalidar_menu() -> int:
+    """Invalida el menú cacheado. Llamar después de cualquier escritura en productos o categorías"""
+    return menu_cache.invalidar()
+
+def no_modificado(request: Request, etag: str) -> bool:
+    """Indica si el cliente ya tiene la versión `etag` (cabecera If-None-Match)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    etags = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etags or etag in etags
+
+async def servir_menu(request: Request, clave: str, cargar: Callable[[], Awaitable[bytes]]) -> Response:
+    """
+    Responde una lectura del catálogo desde la caché con ETag.
+    Devuelve 304 si el cliente ya tiene la versión actual y solo llama a `cargar`
+    (la consulta a la base de datos) cuando la entrada no existe o quedó obsoleta.
+    """
+    headers = {"ETag": menu_cache.etag(clave), "Cache-Control": "no-cache"}
+    if no_modificado(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    entrada = menu_cache.obtener(clave)
+    if entrada is None:
+        version = menu_cache.version
+        entrada = (version, await cargar())
+        menu_cache.guardar(clave, *entrada)
+    headers["ETag"] = menu_cache.etag(clave, entrada[0])
+    return Response(content=entrada[1], media_type="application/json", headers=headers)
+
+async def menu_inicial(db: AsyncSession) -> Tuple[int, bytes]:
+    """
+    Instantánea del menú (categorías y productos disponibles) en JSON, lista para incrustar
+    en la página de productos. Se regenera solo cuando cambia la versión del catálogo.
+    """
+    entrada = menu_cache.obtener("menu_inicial")
+    if entrada is not None:
+        return entrada
+    version = menu_cache.version
+    productos = await menu_cache.productos(db)
+    categorias = await db.execute(
+        select(Categoria.id, Categoria.nombre, Categoria.icono, Categoria.orden).order_by(Categoria.orden, Categoria.id)
+    )
+    datos = {
+        "version": version,
+        "categorias": [fila._asdict() for fila in categorias],
+        "productos": [producto._asdict() for producto in productos.values() if producto.disponible],
+    }
+    # "<" escapado: el JSON va dentro de un <script> y no debe poder cerrarlo
+    contenido = json.dumps(datos, ensure_ascii=False).replace("<", "\\u003c").encode("utf-8")
+    menu_cache.guardar("menu_inicial", version, contenido)
+    return version, contenido
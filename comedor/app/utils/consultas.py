@@ -0,0 +1,118 @@
+# hotel_pedidos/app/utils/consultas.py
+"""
+Registro de las consultas SQL de un bloque de código, para cazar N+1 y fijar presupuestos.
+
+- En desarrollo (DETECTAR_N_MAS_1=true) cada petición se registra y se avisa en el log
+  cuando la misma forma de sentencia se repite N_MAS_1_UMBRAL veces o más.
+- En tests, `presupuesto` falla si un bloque supera un número de consultas o una latencia:
+
+    async with presupuesto(consultas=2, ms=50):
+        await cliente.get("/api/pedidos/pendientes")
+
+  La fixture `presupuesto_consultas` está en tests/conftest.py. El cliente debe llamar a la
+  app en proceso (httpx.ASGITransport) para que las consultas queden en el mismo contexto.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from app.utils.metricas import huella_sql
+
+logger = logging.getLogger(__name__)
+
+class RegistroConsultas:
+    """Sentencias ejecutadas dentro de un bloque (forma normalizada y duración)"""
+
+    def __init__(self):
+        self.sentencias: List[Tuple[str, float]] = []
+
+    @property
+    def total(self) -> int:
+        return len(self.sentencias)
+
+    @property
+    def tiempo(self) -> float:
+        return sum(duracion for _, duracion in self.sentencias)
+
+    def repetidas(self, umbral: int) -> List[Tuple[str, int]]:
+        """Formas de sentencia ejecutadas `umbral` veces o más (posible N+1)"""
+        cuentas = Counter(huella_sql(sentencia) for sentencia, _ in self.sentencias)
+        return [(huella, n) for huella, n in cuentas.most_common() if n >= umbral]
+
+    def detalle(self) -> str:
+        return "\n".join(
+            f"  {duracion * 1000:7.2f} ms  {sentencia}" for sentencia, duracion in self.sentencias
+        )
+
+_registro_actual: ContextVar[Optional[RegistroConsultas]] = ContextVar("registro_consultas", default=None)
+
+@asynccontextmanager
+async def registrar_consultas():
+    """Registra las consultas ejecutadas en el contexto actual mientras dura el bloque"""
+    registro = RegistroConsultas()
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+def instrumentar_engine(engine) -> None:
+    """Engancha el registro de consultas a un engine (async o sync)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(sync_engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(sync_engine, "after_cursor_execute", _despues_de_ejecutar)
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _registro_actual.get() is not None:
+        conn.info.setdefault("consultas_inicio", []).append(time.perf_counter())
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    registro = _registro_actual.get()
+    if registro is not None and conn.info.get("consultas_inicio"):
+        registro.sentencias.append((statement, time.perf_counter() - conn.info["consultas_inicio"].pop()))
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+@asynccontextmanager
+async def presupuesto(consultas: Optional[int] = None, ms: Optional[float] = None, n_mas_1: Optional[int] = None):
+    """
+    Falla con PresupuestoExcedido si el bloque ejecuta más de `consultas` sentencias, tarda
+    más de `ms` milisegundos o repite una misma forma de sentencia `n_mas_1` veces o más
+    """
+    inicio = time.perf_counter()
+    async with registrar_consultas() as registro:
+        yield registro
+    transcurrido = (time.perf_counter() - inicio) * 1000
+    errores = []
+    if consultas is not None and registro.total > consultas:
+        errores.append(f"{registro.total} consultas (presupuesto: {consultas})")
+    if ms is not None and transcurrido > ms:
+        errores.append(f"{transcurrido:.1f} ms (presupuesto: {ms} ms)")
+    if n_mas_1 is not None:
+        errores += [f"{n} ejecuciones de: {huella}" for huella, n in registro.repetidas(n_mas_1)]
+    if errores:
+        raise PresupuestoExcedido("; ".join(errores) + "\n" + registro.detalle())
+
+class MiddlewareNMas1:
+    """Middleware ASGI de desarrollo: avisa de formas de sentencia repetidas en una petición"""
+
+    def __init__(self, app, umbral: int):
+        self.app = app
+        self.umbral = umbral
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        async with registrar_consultas() as registro:
+            await self.app(scope, receive, send)
+        for huella, n in registro.repetidas(self.umbral):
+            logger.warning(
+                "Posible N+1 en %s %s: %d ejecuciones de %s",
+                scope["method"], scope["path"], n, huella
+            )
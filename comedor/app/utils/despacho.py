@@ -0,0 +1,208 @@
+# hotel_pedidos/app/utils/despacho.py
+"""
+Planificador de repartos de las líneas confirmadas (`en_proceso`).
+
+Las líneas abiertas se mantienen en memoria agrupadas por (planta, estación): la planta
+sale del número de habitación ("1203" -> 12) y la estación es la categoría del producto,
+que es quien lo prepara. Se cargan de la base una vez y después se actualizan con cada
+confirmación, entrega o cancelación, sin volver a leer la tabla; cada
+DESPACHO_RESINCRONIZAR_SECONDS (o tras un cambio que no se aplica incrementalmente) se
+recargan completas para recoger lo escrito por otros workers.
+
+Dentro de cada grupo las líneas se guardan en orden de confirmación, que es su orden de
+antigüedad. Las rutas se forman con las líneas más antiguas de un grupo hasta
+DESPACHO_MAX_PARADAS habitaciones, y se eligen con una cola de prioridad por la antigüedad
+de su línea más antigua. La salida y entrega estimadas reparten las rutas, en ese orden,
+entre DESPACHO_REPARTIDORES repartidores.
+"""
+import asyncio
+import heapq
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Categoria, EstadoPedidoDB, Habitacion, Pedido, Ticket
+from app.utils.cache import menu_cache
+
+_RE_DIGITOS = re.compile(r"\d+")
+
+class LineaDespacho(NamedTuple):
+    id: int
+    ticket_id: Optional[int]
+    habitacion_id: int
+    habitacion_numero: str
+    producto_id: int
+    cantidad: int
+    notas: Optional[str]
+    confirmada: datetime
+
+Grupo = Tuple[Optional[int], Optional[int]]  # (planta, estación)
+
+def planta(numero: str) -> Optional[int]:
+    """Planta de una habitación: lo que precede a las dos últimas cifras ("305" -> 3)"""
+    digitos = _RE_DIGITOS.search(numero or "")
+    if digitos is None:
+        return None
+    return int(digitos.group()[:-2] or 0)
+
+class PlanificadorDespacho:
+    def __init__(self):
+        self._grupos: Dict[Grupo, "OrderedDict[int, LineaDespacho]"] = {}
+        self._grupo_de: Dict[int, Grupo] = {}  # linea_id -> grupo
+        self._cargado_en: Optional[float] = None
+        self._cambios = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def abiertas(self) -> int:
+        return len(self._grupo_de)
+
+    # --- Actualizaciones incrementales ---
+
+    def _grupo(self, linea: LineaDespacho, productos) -> Grupo:
+        producto = productos.get(linea.producto_id)
+        return (planta(linea.habitacion_numero), producto.categoria_id if producto else None)
+
+    async def agregar(self, db: AsyncSession, lineas: Iterable[LineaDespacho]) -> None:
+        """Incorpora líneas recién confirmadas (después del commit)"""
+        self._cambios += 1
+        if self._cargado_en is None:
+            return  # Se leerán con la primera carga
+        productos = await menu_cache.productos(db)
+        for linea in lineas:
+            self.retirar([linea.id])
+            grupo = self._grupo(linea, productos)
+            self._grupos.setdefault(grupo, OrderedDict())[linea.id] = linea
+            self._grupo_de[linea.id] = grupo
+
+    def retirar(self, linea_ids: Iterable[int]) -> None:
+        """Quita líneas que dejaron de estar en proceso (entregadas, canceladas o borradas)"""
+        self._cambios += 1
+        for linea_id in linea_ids:
+            grupo = self._grupo_de.pop(linea_id, None)
+            if grupo is not None:
+                lineas = self._grupos[grupo]
+                del lineas[linea_id]
+                if not lineas:
+                    del self._grupos[grupo]
+
+    def invalidar(self) -> None:
+        """Fuerza una recarga completa en la próxima consulta"""
+        self._cambios += 1
+        self._cargado_en = None
+
+    # --- Carga completa ---
+
+    async def _cargar(self, db: AsyncSession) -> None:
+        cambios = self._cambios
+        productos = await menu_cache.productos(db)
+        confirmada = func.coalesce(Ticket.fecha, Pedido.fecha)
+        filas = await db.execute(
+            select(
+                Pedido.id, Pedido.ticket_id, Pedido.habitacion_id, Habitacion.numero,
+                Pedido.producto_id, Pedido.cantidad, Pedido.notas, confirmada
+            )
+            .join(Habitacion, Habitacion.id == Pedido.habitacion_id)
+            .outerjoin(Ticket, Ticket.id == Pedido.ticket_id)
+            .where(Pedido.estado == EstadoPedidoDB.en_proceso)
+            .order_by(confirmada, Pedido.id)
+        )
+        grupos: Dict[Grupo, "OrderedDict[int, LineaDespacho]"] = {}
+        grupo_de: Dict[int, Grupo] = {}
+        for fila in filas:
+            linea = LineaDespacho(*fila)
+            grupo = self._grupo(linea, productos)
+            grupos.setdefault(grupo, OrderedDict())[linea.id] = linea
+            grupo_de[linea.id] = grupo
+        self._grupos, self._grupo_de = grupos, grupo_de
+        # Si algo cambió mientras se leía, la próxima consulta vuelve a cargar
+        self._cargado_en = time.monotonic() if cambios == self._cambios else None
+
+    async def _al_dia(self, db: AsyncSession) -> None:
+        caducado = (
+            self._cargado_en is None
+            or time.monotonic() - self._cargado_en > settings.DESPACHO_RESINCRONIZAR_SECONDS
+        )
+        if caducado:
+            async with self._lock:
+                if self._cargado_en is None or time.monotonic() - self._cargado_en > settings.DESPACHO_RESINCRONIZAR_SECONDS:
+                    await self._cargar(db)
+
+    # --- Planificación ---
+
+    def _rutas_grupo(self, lineas: "OrderedDict[int, LineaDespacho]") -> Iterator[List[LineaDespacho]]:
+        """Rutas de un grupo en orden de antigüedad, de hasta DESPACHO_MAX_PARADAS habitaciones"""
+        ruta: List[LineaDespacho] = []
+        habitaciones = set()
+        for linea in lineas.values():
+            if linea.habitacion_id not in habitaciones and len(habitaciones) == settings.DESPACHO_MAX_PARADAS:
+                yield ruta
+                ruta, habitaciones = [], set()
+            ruta.append(linea)
+            habitaciones.add(linea.habitacion_id)
+        if ruta:
+            yield ruta
+
+    async def rutas(self, db: AsyncSession, limite: int) -> dict:
+        await self._al_dia(db)
+        ahora = datetime.utcnow()
+        productos = await menu_cache.productos(db)
+        estaciones = dict((await db.execute(select(Categoria.id, Categoria.nombre))).all())
+
+        # Cola de prioridad de rutas candidatas por antigüedad de su primera línea (a igual
+        # antigüedad, por id); de cada grupo solo se genera la siguiente ruta cuando sale la anterior
+        cola = []
+        for orden, (grupo, lineas) in enumerate(self._grupos.items()):
+            generador = self._rutas_grupo(lineas)
+            primera = next(generador)
+            cola.append((primera[0].confirmada, primera[0].id, orden, grupo, primera, generador))
+        heapq.heapify(cola)
+
+        repartidores = [ahora] * max(settings.DESPACHO_REPARTIDORES, 1)
+        rutas = []
+        while cola and len(rutas) < limite:
+            confirmada, _, orden, grupo, lineas, generador = heapq.heappop(cola)
+            siguiente = next(generador, None)
+            if siguiente is not None:
+                heapq.heappush(cola, (siguiente[0].confirmada, siguiente[0].id, orden, grupo, siguiente, generador))
+
+            paradas: Dict[int, dict] = {}
+            for linea in lineas:
+                parada = paradas.setdefault(linea.habitacion_id, {
+                    "habitacion_id": linea.habitacion_id,
+                    "habitacion_numero": linea.habitacion_numero,
+                    "ticket_ids": [],
+                    "lineas": [],
+                })
+                if linea.ticket_id is not None and linea.ticket_id not in parada["ticket_ids"]:
+                    parada["ticket_ids"].append(linea.ticket_id)
+                producto = productos.get(linea.producto_id)
+                parada["lineas"].append({
+                    "id": linea.id,
+                    "producto_id": linea.producto_id,
+                    "producto_nombre": producto.nombre if producto else "",
+                    "cantidad": linea.cantidad,
+                    "notas": linea.notas,
+                })
+            # Recorrido por el pasillo: paradas en orden de número de habitación
+            recorrido = sorted(paradas.values(), key=lambda p: (len(p["habitacion_numero"]), p["habitacion_numero"]))
+
+            salida = heapq.heappop(repartidores)
+            duracion = timedelta(minutes=settings.DESPACHO_MINUTOS_RUTA + settings.DESPACHO_MINUTOS_PARADA * len(recorrido))
+            heapq.heappush(repartidores, salida + duracion)
+            rutas.append({
+                "planta": grupo[0],
+                "estacion_id": grupo[1],
+                "estacion": estaciones.get(grupo[1], "Sin estación"),
+                "paradas": recorrido,
+                "espera_max_segundos": max(int((ahora - confirmada).total_seconds()), 0),
+                "salida_estimada": salida,
+                "entrega_estimada": salida + duracion,
+            })
+        return {"generado": ahora, "lineas_abiertas": self.abiertas, "rutas": rutas}
+
+despacho = PlanificadorDespacho()
@@ -0,0 +1,137 @@
+# hotel_pedidos/app/utils/estaticos.py
+"""
+Estáticos y plantillas HTML servidos desde memoria.
+
+Al arrancar se leen `app/static` y `app/templates`. Cada estático recibe una URL con la
+huella de su contenido (`/static/css/styles.3f2a9c1b0d.css`) y se guarda ya comprimido en
+gzip y, si está instalado el paquete `brotli`, en br. Las plantillas se reescriben para
+apuntar a esas URLs. Las URLs con huella se sirven como inmutables; las plantillas y las
+URLs sin huella se revalidan con ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from app.utils.cache import no_modificado
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se sirve gzip
+    brotli = None
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+_RE_REFERENCIAS = re.compile(r'''((?:src|href)=["'])(/static/[^"'?#]+)''')
+
+class Activo(NamedTuple):
+    contenido: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    media_type: str
+    etag: str
+
+def _comprimir(contenido: bytes, media_type: str) -> Activo:
+    huella = hashlib.sha256(contenido).hexdigest()
+    comprimido_gzip = comprimido_br = None
+    if len(contenido) > 256:  # Por debajo de esto la compresión no compensa las cabeceras
+        comprimido_gzip = gzip.compress(contenido, compresslevel=9, mtime=0)
+        if len(comprimido_gzip) >= len(contenido):
+            comprimido_gzip = None
+        if brotli is not None:
+            comprimido_br = brotli.compress(contenido, quality=11)
+            if len(comprimido_br) >= len(contenido):
+                comprimido_br = None
+    return Activo(contenido, comprimido_gzip, comprimido_br, media_type, f'"{huella[:16]}"')
+
+def _codificaciones(request: Request) -> set:
+    """Codificaciones aceptadas por el cliente (las que no tienen q=0)"""
+    aceptadas = set()
+    for parte in request.headers.get("accept-encoding", "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = parametros.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        aceptadas.add(nombre.strip().lower())
+    return aceptadas
+
+class AlmacenEstaticos:
+    """Estáticos con huella y plantillas precomprimidos en memoria"""
+
+    def __init__(self, directorio_static: str, directorio_templates: str):
+        self.directorio_static = Path(directorio_static)
+        self.directorio_templates = Path(directorio_templates)
+        self.activos: Dict[str, Activo] = {}  # Ruta relativa a /static (con y sin huella)
+        self.inmutables: set = set()
+        self.urls: Dict[str, str] = {}  # /static/ruta -> /static/ruta.huella.ext
+        self.plantillas: Dict[str, Activo] = {}
+        self._con_datos: Dict[str, Tuple[object, Activo]] = {}
+
+    def cargar(self) -> None:
+        for archivo in sorted(self.directorio_static.rglob("*")):
+            if not archivo.is_file():
+                continue
+            ruta = archivo.relative_to(self.directorio_static).as_posix()
+            media_type = mimetypes.guess_type(archivo.name)[0] or "application/octet-stream"
+            activo = _comprimir(archivo.read_bytes(), media_type)
+            ruta_huella = f"{ruta[:-len(archivo.suffix)] if archivo.suffix else ruta}.{activo.etag[1:11]}{archivo.suffix}"
+            self.activos[ruta] = self.activos[ruta_huella] = activo
+            self.inmutables.add(ruta_huella)
+            self.urls[f"/static/{ruta}"] = f"/static/{ruta_huella}"
+
+        for archivo in sorted(self.directorio_templates.rglob("*.html")):
+            html = archivo.read_text(encoding="utf-8")
+            html = _RE_REFERENCIAS.sub(lambda m: m.group(1) + self.url(m.group(2)), html)
+            ruta = archivo.relative_to(self.directorio_templates).as_posix()
+            self.plantillas[ruta] = _comprimir(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def url(self, ruta: str) -> str:
+        """URL con huella de un estático (la misma ruta si no existe)"""
+        return self.urls.get(ruta, ruta)
+
+    def estatico(self, request: Request, ruta: str) -> Optional[Response]:
+        activo = self.activos.get(ruta)
+        if activo is None:
+            return None
+        cache = CACHE_INMUTABLE if ruta in self.inmutables else CACHE_REVALIDAR
+        return responder(request, activo, cache)
+
+    def plantilla(self, request: Request, nombre: str) -> Response:
+        return responder(request, self.plantillas[nombre], CACHE_REVALIDAR)
+
+    def plantilla_con_datos(
+        self, request: Request, nombre: str, marcador: str, datos: bytes, version: object
+    ) -> Response:
+        """
+        Plantilla con `datos` incrustados en lugar de `marcador`. La página generada (ya
+        comprimida) se reutiliza mientras no cambie `version`.
+        """
+        generada = self._con_datos.get(nombre)
+        if generada is None or generada[0] != version:
+            html = self.plantillas[nombre].contenido.replace(marcador.encode("utf-8"), datos)
+            generada = (version, _comprimir(html, "text/html; charset=utf-8"))
+            self._con_datos[nombre] = generada
+        return responder(request, generada[1], CACHE_REVALIDAR)
+
+def responder(request: Request, activo: Activo, cache_control: str) -> Response:
+    """Respuesta con la mejor codificación que acepte el cliente, o 304 si ya la tiene"""
+    cabeceras = {"ETag": activo.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if no_modificado(request, activo.etag):
+        return Response(status_code=304, headers=cabeceras)
+    aceptadas = _codificaciones(request)
+    contenido = activo.contenido
+    if activo.br is not None and "br" in aceptadas:
+        contenido, cabeceras["Content-Encoding"] = activo.br, "br"
+    elif activo.gzip is not None and "gzip" in aceptadas:
+        contenido, cabeceras["Content-Encoding"] = activo.gzip, "gzip"
+    return Response(content=contenido, media_type=activo.media_type, headers=cabeceras)
+
+estaticos = AlmacenEstaticos("app/static", "app/templates")
@@ -0,0 +1,92 @@
+# hotel_pedidos/app/utils/eventos.py
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Optional, Set, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado (una pantalla de cocina)"""
+
+    def __init__(self, max_cola: int):
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=max_cola)
+        self.descartada = False
+
+class HubPedidos:
+    """
+    Publicación/suscripción en proceso para el feed de pedidos.
+
+    Cada evento recibe un id creciente y se guarda en un buffer circular acotado para
+    poder reenviar lo perdido a partir de `Last-Event-ID`. Publicar nunca bloquea:
+    si la cola de un cliente está llena, ese cliente se descarta (deberá reconectar).
+    """
+
+    def __init__(self, max_buffer: int, max_cola: int):
+        self.max_cola = max_cola
+        # Ids a partir de la hora de arranque: un Last-Event-ID de un proceso anterior
+        # siempre queda por debajo y provoca un `reinicio` en lugar de un reenvío erróneo
+        self._ultimo_id = time.time_ns() // 1_000_000
+        self._buffer: Deque[Tuple[int, str, str]] = deque(maxlen=max_buffer)
+        self._suscripciones: Set[Suscripcion] = set()
+
+    @property
+    def conectados(self) -> int:
+        return len(self._suscripciones)
+
+    def publicar(self, evento: str, datos: dict) -> int:
+        """Publica un evento a todos los suscriptores y lo guarda en el buffer"""
+        self._ultimo_id += 1
+        mensaje = (self._ultimo_id, evento, json.dumps(jsonable_encoder(datos)))
+        self._buffer.append(mensaje)
+        for suscripcion in list(self._suscripciones):
+            try:
+                suscripcion.cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Cliente lento: se descarta en lugar de frenar al resto
+                suscripcion.descartada = True
+                self._suscripciones.discard(suscripcion)
+        return self._ultimo_id
+
+    def suscribir(self, ultimo_id: Optional[int] = None) -> Suscripcion:
+        """
+        Registra un nuevo cliente. Si trae `ultimo_id`, se le encolan los eventos posteriores
+        que sigan en el buffer; si ya no están, recibe un evento `reinicio` para recargar la lista.
+        """
+        suscripcion = Suscripcion(self.max_cola)
+        if ultimo_id is not None and ultimo_id != self._ultimo_id:
+            pendientes = [m for m in self._buffer if m[0] > ultimo_id] if ultimo_id < self._ultimo_id else []
+            if not pendientes or pendientes[0][0] != ultimo_id + 1 or len(pendientes) > self.max_cola:
+                # Hueco en el historial (o ids de un proceso anterior): el cliente debe recargar
+                pendientes = [(self._ultimo_id, "reinicio", "{}")]
+            for mensaje in pendientes:
+                suscripcion.cola.put_nowait(mensaje)
+        self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        self._suscripciones.discard(suscripcion)
+
+    async def stream(self, suscripcion: Suscripcion, desconectado) -> AsyncIterator[str]:
+        """Genera el flujo SSE de una suscripción hasta que el cliente se desconecta o se descarta"""
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            while not suscripcion.descartada:
+                try:
+                    id_evento, evento, datos = await asyncio.wait_for(
+                        suscripcion.cola.get(), timeout=settings.SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await desconectado():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {id_evento}\nevent: {evento}\ndata: {datos}\n\n"
+        finally:
+            self.cancelar(suscripcion)
+
+hub_pedidos = HubPedidos(
+    max_buffer=settings.SSE_BUFFER_SIZE,
+    max_cola=settings.SSE_CLIENT_QUEUE_SIZE,
+)
@@ -0,0 +1,111 @@
+# hotel_pedidos/app/utils/exportacion.py
+"""
+Exportación de líneas de pedido en CSV o NDJSON para contabilidad.
+
+Las filas se leen con un cursor del servidor (`yield_per`) y se escriben lote a lote en
+el generador de la StreamingResponse: la memoria no depende del tamaño del volcado. Si el
+rango llega antes del corte del archivo, se leen `pedidos` y `pedidos_archivo` en la misma
+transacción (misma foto aunque el archivador esté moviendo filas) y se mezclan por
+(fecha, id), sin ordenar el conjunto en ningún sitio.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from app.config import settings
+from app.database import AsyncSessionLectura
+from app.models import EstadoPedidoDB, Pedido, PedidoArchivo
+from app.utils.archivo import incluye_archivo
+from app.utils.proyecciones import select_pedidos
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+CAMPOS = (
+    "id", "ticket_id", "fecha", "hora_entrega", "estado",
+    "habitacion_id", "habitacion_numero", "habitacion_apellido",
+    "producto_id", "producto_nombre", "cantidad", "precio_unitario", "importe", "notas",
+)
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+async def _filas(db, P, inicio: datetime, fin: datetime) -> AsyncIterator:
+    stmt = (
+        select_pedidos(P)
+        .where(P.fecha >= inicio, P.fecha < fin)
+        .order_by(P.fecha, P.id)
+        .execution_options(yield_per=settings.EXPORT_LOTE)
+    )
+    result = await db.stream(stmt)
+    async for particion in result.partitions():
+        for fila in particion:
+            yield fila
+
+async def _mezclar(a: AsyncIterator, b: AsyncIterator) -> AsyncIterator:
+    """Mezcla dos secuencias ya ordenadas por (fecha, id)"""
+    fila_a, fila_b = await anext(a, None), await anext(b, None)
+    while fila_a is not None or fila_b is not None:
+        if fila_b is None or (fila_a is not None and (fila_a.fecha, fila_a.id) <= (fila_b.fecha, fila_b.id)):
+            yield fila_a
+            fila_a = await anext(a, None)
+        else:
+            yield fila_b
+            fila_b = await anext(b, None)
+
+def _registro(fila) -> dict:
+    precio = fila.precio_unitario if fila.precio_unitario is not None else fila.producto_precio
+    importe = 0.0 if fila.estado == EstadoPedidoDB.cancelado else round(fila.cantidad * (precio or 0.0), 2)
+    return {
+        "id": fila.id,
+        "ticket_id": fila.ticket_id,
+        "fecha": fila.fecha,
+        "hora_entrega": fila.hora_entrega,
+        "estado": fila.estado.value,
+        "habitacion_id": fila.habitacion_id,
+        "habitacion_numero": fila.habitacion_numero,
+        "habitacion_apellido": fila.habitacion_apellido,
+        "producto_id": fila.producto_id,
+        "producto_nombre": fila.producto_nombre,
+        "cantidad": fila.cantidad,
+        "precio_unitario": precio,
+        "importe": importe,
+        "notas": fila.notas,
+    }
+
+def _ndjson(registro: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(registro) + b"\n"
+    return (json.dumps(registro, ensure_ascii=False, default=datetime.isoformat) + "\n").encode("utf-8")
+
+def _csv(registros: list, cabecera: bool = False) -> bytes:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if cabecera:
+        buffer.write("﻿")  # BOM: las hojas de cálculo leen bien los acentos
+        escritor.writerow(CAMPOS)
+    for registro in registros:
+        escritor.writerow([
+            valor.isoformat() if isinstance(valor, datetime) else ("" if valor is None else valor)
+            for valor in registro.values()
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+async def exportar_pedidos(formato: str, inicio: datetime, fin: datetime) -> AsyncIterator[bytes]:
+    """Genera el volcado de las líneas con fecha en [inicio, fin) en `formato` (csv o ndjson)"""
+    if formato == "csv":
+        yield _csv([], cabecera=True)  # Primeros bytes antes de la primera consulta
+    async with AsyncSessionLectura() as db:
+        filas = _filas(db, Pedido, inicio, fin)
+        if incluye_archivo(inicio):
+            filas = _mezclar(filas, _filas(db, PedidoArchivo, inicio, fin))
+        lote = []
+        async for fila in filas:
+            lote.append(_registro(fila))
+            if len(lote) >= settings.EXPORT_LOTE:
+                yield _csv(lote) if formato == "csv" else b"".join(_ndjson(r) for r in lote)
+                lote = []
+        if lote:
+            yield _csv(lote) if formato == "csv" else b"".join(_ndjson(r) for r in lote)
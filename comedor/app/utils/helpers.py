@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from app.models import Habitacion, Producto, Pedido, Categoria
+import base64
 import re
 
 # Helper para respuestas API estandarizadas
@@ -56,8 +57,11 @@ def get_producto_by_id(db: Session, producto_id: int) -> Producto:
     return producto
 
 def calcular_total_pedido(pedidos: List[Pedido]) -> float:
-    """Calcula el total de un conjunto de pedidos"""
-    return sum(pedido.producto.precio * pedido.cantidad for pedido in pedidos)
+    """Calcula el total de un conjunto de pedidos con el precio guardado en cada línea"""
+    return sum(
+        (pedido.producto.precio if pedido.precio_unitario is None else pedido.precio_unitario) * pedido.cantidad
+        for pedido in pedidos
+    )
 
 def generar_codigo_pedido(habitacion_numero: str) -> str:
     """Genera un código único para un pedido"""
@@ -84,6 +88,24 @@ def paginate_query(query, page: int = 1, per_page: int = 10):
         "total_pages": (total + per_page - 1) // per_page
     }
 
+# Helpers para paginación por cursor (keyset) sobre (fecha, id)
+def encode_cursor(fecha: datetime, id: int) -> str:
+    """Codifica la posición del último elemento de una página como cursor opaco"""
+    raw = f"{fecha.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decodifica un cursor generado por encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(fecha), int(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
 # Helper para manejo de fechas
 def parse_date_range(
     start_date: Optional[str] = None,
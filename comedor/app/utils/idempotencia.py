@@ -0,0 +1,237 @@
+# hotel_pedidos/app/utils/idempotencia.py
+"""
+Cabecera `Idempotency-Key` para las peticiones que crean o confirman pedidos.
+
+- La clave se guarda por sesión (cookie o cabecera de autorización), método y ruta, junto
+  con la huella del cuerpo: reutilizarla con otro cuerpo devuelve 422.
+- Si la petición original terminó bien (2xx) se repite su respuesta tal cual, con la
+  cabecera `Idempotent-Replayed: true`, sin volver a ejecutar nada. Los errores no se
+  guardan: no escribieron nada y el reintento se ejecuta de nuevo.
+- Si llega un duplicado mientras la original aún se ejecuta, espera a que termine y
+  recibe la misma respuesta (una sola ejecución). Si la original no terminó bien, el
+  primero de los que esperan la ejecuta de nuevo y el resto espera a ese.
+- Las claves viven en memoria con TTL y un máximo de entradas (se descartan las más
+  antiguas). Con IDEMPOTENCIA_PERSISTIR se guardan también en `claves_idempotencia`, y
+  una clave que no está en memoria se busca allí con el pool de lectura (reinicios y
+  varios workers), sin esperar detrás del escritor.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import delete, select
+from app.config import settings
+from app.database import AsyncSessionLectura, AsyncSessionLocal
+from app.models import ClaveIdempotencia
+from app.utils.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+CABECERA = b"idempotency-key"
+MAX_LONGITUD_CLAVE = 255
+
+class RespuestaGuardada(NamedTuple):
+    huella: str
+    estado: int
+    media_type: str
+    cuerpo: bytes
+    expira: float  # time.time()
+
+class AlmacenIdempotencia:
+    """Respuestas por clave en memoria (TTL y tamaño acotados), con copia opcional en la base"""
+
+    def __init__(self, ttl: int, max_claves: int, persistir: bool):
+        self.ttl = ttl
+        self.max_claves = max_claves
+        self.persistir = persistir
+        self._respuestas: "OrderedDict[str, RespuestaGuardada]" = OrderedDict()
+        self._en_curso: Dict[str, asyncio.Future] = {}
+        self.repetidas = 0
+        self.colapsadas = 0
+        self._escrituras = 0
+
+    async def obtener(self, clave: str) -> Optional[RespuestaGuardada]:
+        guardada = self._respuestas.get(clave)
+        if guardada is None and self.persistir:
+            async with AsyncSessionLectura() as db:
+                fila = await db.get(ClaveIdempotencia, clave)
+            if fila is not None:
+                guardada = RespuestaGuardada(
+                    fila.huella, fila.estado, fila.media_type, fila.cuerpo, fila.expira.timestamp()
+                )
+        if guardada is not None and guardada.expira < time.time():
+            self._respuestas.pop(clave, None)
+            return None
+        return guardada
+
+    async def guardar(self, clave: str, respuesta: RespuestaGuardada) -> None:
+        self._respuestas[clave] = respuesta
+        self._respuestas.move_to_end(clave)
+        ahora = time.time()
+        # Las entradas se insertan en orden de expiración: basta mirar las primeras
+        while self._respuestas:
+            primera = next(iter(self._respuestas.values()))
+            if primera.expira >= ahora and len(self._respuestas) <= self.max_claves:
+                break
+            self._respuestas.popitem(last=False)
+        if self.persistir:
+            try:
+                await self._guardar_en_base(clave, respuesta)
+            except Exception:  # La copia en memoria ya protege a este proceso
+                logger.exception("No se pudo guardar la clave de idempotencia en la base")
+
+    async def _guardar_en_base(self, clave: str, respuesta: RespuestaGuardada) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.merge(ClaveIdempotencia(
+                clave=clave,
+                huella=respuesta.huella,
+                estado=respuesta.estado,
+                media_type=respuesta.media_type,
+                cuerpo=respuesta.cuerpo,
+                expira=datetime.fromtimestamp(respuesta.expira),
+            ))
+            self._escrituras += 1
+            if self._escrituras % 100 == 0:  # Purga periódica de las caducadas
+                await db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.expira < datetime.now()))
+            await db.commit()
+
+    def metricas(self) -> List[str]:
+        return [
+            "# HELP idempotencia_claves Respuestas guardadas en memoria por Idempotency-Key",
+            "# TYPE idempotencia_claves gauge",
+            f"idempotencia_claves {len(self._respuestas)}",
+            "# HELP idempotencia_repetidas_total Peticiones respondidas con una respuesta guardada",
+            "# TYPE idempotencia_repetidas_total counter",
+            f"idempotencia_repetidas_total {self.repetidas}",
+            "# HELP idempotencia_colapsadas_total Duplicados que esperaron a la petición original en curso",
+            "# TYPE idempotencia_colapsadas_total counter",
+            f"idempotencia_colapsadas_total {self.colapsadas}",
+        ]
+
+almacen_idempotencia = AlmacenIdempotencia(
+    settings.IDEMPOTENCIA_TTL_SECONDS, settings.IDEMPOTENCIA_MAX_CLAVES, settings.IDEMPOTENCIA_PERSISTIR
+)
+metricas.registrar_colector(almacen_idempotencia.metricas)
+
+def _cabecera(scope, nombre: bytes) -> Optional[bytes]:
+    for clave, valor in scope["headers"]:
+        if clave == nombre:
+            return valor
+    return None
+
+def _sesion(scope) -> bytes:
+    """Identifica al cliente: cabecera Authorization o token de la cookie de sesión"""
+    autorizacion = _cabecera(scope, b"authorization")
+    if autorizacion:
+        return autorizacion
+    for cookie in (_cabecera(scope, b"cookie") or b"").split(b";"):
+        nombre, _, valor = cookie.strip().partition(b"=")
+        if nombre in (b"access_token", b"admin_token"):
+            return valor
+    return b""
+
+async def _responder(send, estado: int, media_type: str, cuerpo: bytes, repetida: bool = False) -> None:
+    cabeceras = [(b"content-type", media_type.encode()), (b"content-length", str(len(cuerpo)).encode())]
+    if repetida:
+        cabeceras.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": estado, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+class MiddlewareIdempotencia:
+    """Middleware ASGI que aplica `Idempotency-Key` a las rutas indicadas (método, ruta)"""
+
+    def __init__(self, app, rutas, almacen: AlmacenIdempotencia = almacen_idempotencia):
+        self.app = app
+        self.rutas = set(rutas)
+        self.almacen = almacen
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.rutas:
+            await self.app(scope, receive, send)
+            return
+        clave_cliente = _cabecera(scope, CABECERA)
+        if not clave_cliente:
+            await self.app(scope, receive, send)
+            return
+        if len(clave_cliente) > MAX_LONGITUD_CLAVE:
+            await _responder(send, 400, "application/json", b'{"detail":"Idempotency-Key demasiado larga"}')
+            return
+
+        # Se lee el cuerpo completo para calcular su huella y se vuelve a entregar a la app
+        partes = []
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] != "http.request":
+                await self.app(scope, receive, send)  # Desconexión: que la app la gestione
+                return
+            partes.append(mensaje.get("body", b""))
+            if not mensaje.get("more_body"):
+                break
+        cuerpo_peticion = b"".join(partes)
+        huella = hashlib.sha256(cuerpo_peticion).hexdigest()
+        clave = hashlib.sha256(b"\0".join((
+            _sesion(scope), scope["method"].encode(), scope["path"].encode(), clave_cliente
+        ))).hexdigest()
+
+        while True:
+            en_curso = self.almacen._en_curso.get(clave)
+            if en_curso is not None:
+                self.almacen.colapsadas += 1
+                guardada = await asyncio.shield(en_curso)
+                if guardada is None:
+                    continue  # La original no terminó bien: se vuelve a ejecutar
+                break
+            guardada = await self.almacen.obtener(clave)
+            if guardada is not None:
+                self.almacen.repetidas += 1
+                break
+            if clave not in self.almacen._en_curso:  # Otra pudo empezar mientras se leía la base
+                break
+        if guardada is not None:
+            if guardada.huella != huella:
+                await _responder(
+                    send, 422, "application/json",
+                    b'{"detail":"Idempotency-Key ya usada con otra petici\\u00f3n"}'
+                )
+            else:
+                await _responder(send, guardada.estado, guardada.media_type, guardada.cuerpo, repetida=True)
+            return
+
+        futuro = asyncio.get_running_loop().create_future()
+        self.almacen._en_curso[clave] = futuro
+        entregado = False
+        async def recibir():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo_peticion, "more_body": False}
+            return await receive()
+
+        estado, media_type, cuerpo = 500, "application/json", []
+        async def enviar(mensaje):
+            nonlocal estado, media_type
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                for nombre, valor in mensaje.get("headers", []):
+                    if nombre.lower() == b"content-type":
+                        media_type = valor.decode("latin-1")
+            elif mensaje["type"] == "http.response.body":
+                cuerpo.append(mensaje.get("body", b""))
+            await send(mensaje)
+
+        respuesta = None
+        try:
+            await self.app(scope, recibir, enviar)
+            if 200 <= estado < 300:
+                respuesta = RespuestaGuardada(
+                    huella, estado, media_type, b"".join(cuerpo), time.time() + self.almacen.ttl
+                )
+                await self.almacen.guardar(clave, respuesta)
+        finally:
+            del self.almacen._en_curso[clave]
+            # Los duplicados en espera reciben la misma respuesta; con None (error o excepción)
+            # vuelven a ejecutarse, igual que un reintento posterior
+            futuro.set_result(respuesta)
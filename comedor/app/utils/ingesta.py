@@ -0,0 +1,84 @@
+# hotel_pedidos/app/utils/ingesta.py
+import asyncio
+from typing import List, Optional, Tuple
+from sqlalchemy import insert
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Pedido
+from app.utils.resumenes import CambioResumen, actualizar_resumenes
+
+class ColaPedidos:
+    """
+    Cola de escritura diferida con commit agrupado (group commit) para las altas de pedidos.
+
+    Las peticiones concurrentes encolan su fila y esperan; cada `intervalo_ms` milisegundos,
+    o en cuanto hay `max_filas` pendientes, se insertan todas en una sola transacción y
+    cada petición recibe el id asignado. Así se paga un commit por lote y no uno por línea.
+    """
+
+    def __init__(self, intervalo_ms: int, max_filas: int):
+        self.intervalo = intervalo_ms / 1000
+        self.max_filas = max_filas
+        self._pendientes: List[Tuple[dict, Optional[CambioResumen], asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._vaciados: set = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self.cerrada = False
+
+    async def encolar(self, fila: dict, cambio: Optional[CambioResumen] = None) -> int:
+        """Encola la fila de un pedido y devuelve su id cuando el lote se confirma"""
+        if self.cerrada:
+            raise RuntimeError("La cola de pedidos está cerrada")
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((fila, cambio, futuro))
+        if len(self._pendientes) >= self.max_filas:
+            self._programar_vaciado()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(self.intervalo, self._programar_vaciado)
+        return await futuro
+
+    def _programar_vaciado(self) -> None:
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if not self._pendientes:
+            return
+        lote, self._pendientes = self._pendientes, []
+        tarea = asyncio.create_task(self._vaciar(lote))
+        self._vaciados.add(tarea)
+        tarea.add_done_callback(self._vaciados.discard)
+
+    async def _vaciar(self, lote) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Un lote detrás de otro: el escritor de SQLite es único de todos modos
+        async with self._lock:
+            try:
+                async with AsyncSessionLocal() as db:
+                    filas = [fila for fila, _, _ in lote]
+                    result = await db.execute(
+                        insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True), filas
+                    )
+                    ids = result.scalars().all()
+                    await actualizar_resumenes(db, [cambio for _, cambio, _ in lote])
+                    await db.commit()
+            except Exception as e:
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                return
+            for pedido_id, (_, _, futuro) in zip(ids, lote):
+                if not futuro.done():
+                    futuro.set_result(pedido_id)
+
+    async def cerrar(self) -> None:
+        """Deja de aceptar filas y vacía todo lo pendiente (apagado ordenado)"""
+        self.cerrada = True
+        self._programar_vaciado()
+        if self._vaciados:
+            await asyncio.gather(*list(self._vaciados), return_exceptions=True)
+
+cola_pedidos = ColaPedidos(
+    intervalo_ms=settings.GROUP_COMMIT_MS,
+    max_filas=settings.GROUP_COMMIT_MAX_FILAS,
+)
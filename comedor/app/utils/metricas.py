@@ -0,0 +1,239 @@
+# hotel_pedidos/app/utils/metricas.py
+"""
+Métricas de peticiones HTTP y de SQL, expuestas en formato de texto de Prometheus
+(GET /api/admin/metrics).
+
+Todo se actualiza desde el hilo del event loop (el middleware ASGI y los eventos de cursor
+de SQLAlchemy, que con el driver async se disparan en ese mismo hilo), así que la recogida
+no usa locks: son sumas sobre listas y dicts ya creados.
+"""
+import re
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+MAX_HUELLAS = 500  # Huellas de sentencias distintas; el resto se agrupa en "otras"
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (como los de Prometheus)"""
+
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+class ConsultasPeticion:
+    """Acumulado de SQL de la petición en curso"""
+
+    __slots__ = ("consultas", "filas", "tiempo")
+
+    def __init__(self):
+        self.consultas = 0
+        self.filas = 0
+        self.tiempo = 0.0
+
+_peticion_actual: ContextVar[Optional[ConsultasPeticion]] = ContextVar("metricas_peticion", default=None)
+
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+def huella_sql(sentencia: str) -> str:
+    """Normaliza una sentencia (literales, listas IN, espacios) para agrupar las equivalentes"""
+    huella = _RE_CADENAS.sub("?", sentencia)
+    huella = _RE_NUMEROS.sub("?", huella)
+    huella = _RE_LISTAS.sub("(?...)", huella)
+    return _RE_ESPACIOS.sub(" ", huella).strip()
+
+class Metricas:
+    """Registro de métricas del proceso"""
+
+    def __init__(self):
+        self.en_curso = 0
+        self.peticiones: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latencias: Dict[Tuple[str, str], Histograma] = {}
+        self.consultas_peticion: Dict[Tuple[str, str], Histograma] = {}
+        self.sql_ruta: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0, 0.0])
+        self.sql_huella: Dict[str, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+        self._huellas: Dict[str, str] = {}
+        self.arranque: Dict[str, float] = {}  # Duración de cada fase del arranque
+        self._colectores: List[Callable[[], List[str]]] = []
+
+    def registrar_colector(self, colector: Callable[[], List[str]]) -> None:
+        """Añade una función que aporta sus propias líneas a la exposición"""
+        self._colectores.append(colector)
+
+    # --- HTTP ---
+
+    def registrar_peticion(
+        self, metodo: str, ruta: str, estado: int, duracion: float, sql: ConsultasPeticion
+    ) -> None:
+        clave = (metodo, ruta)
+        self.peticiones[(metodo, ruta, estado)] += 1
+        histograma = self.latencias.get(clave)
+        if histograma is None:
+            histograma = self.latencias[clave] = Histograma(BUCKETS_LATENCIA)
+            self.consultas_peticion[clave] = Histograma(BUCKETS_CONSULTAS)
+        histograma.observar(duracion)
+        self.consultas_peticion[clave].observar(sql.consultas)
+        acumulado = self.sql_ruta[clave]
+        acumulado[0] += sql.consultas
+        acumulado[1] += sql.filas
+        acumulado[2] += sql.tiempo
+
+    # --- SQL ---
+
+    def _huella(self, sentencia: str) -> str:
+        huella = self._huellas.get(sentencia)
+        if huella is None:
+            huella = huella_sql(sentencia)
+            if huella not in self.sql_huella and len(self.sql_huella) >= MAX_HUELLAS:
+                huella = "otras"
+            if len(self._huellas) < MAX_HUELLAS * 4:
+                self._huellas[sentencia] = huella
+        return huella
+
+    def registrar_sentencia(self, sentencia: str, filas: int, duracion: float) -> None:
+        filas = max(filas, 0)  # rowcount es -1 en los SELECT de sqlite
+        acumulado = self.sql_huella[self._huella(sentencia)]
+        acumulado[0] += 1
+        acumulado[1] += filas
+        acumulado[2] += duracion
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion.consultas += 1
+            peticion.filas += filas
+            peticion.tiempo += duracion
+
+    def instrumentar_engine(self, engine) -> None:
+        """Engancha los contadores de SQL a un engine (async o sync)"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        if event.contains(sync_engine, "before_cursor_execute", _antes_de_ejecutar):
+            return
+        event.listen(sync_engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(sync_engine, "after_cursor_execute", _despues_de_ejecutar)
+
+    # --- Exposición ---
+
+    def exportar(self) -> str:
+        """Texto en formato de exposición de Prometheus"""
+        lineas = [
+            "# HELP arranque_segundos Duración de cada fase del arranque del proceso",
+            "# TYPE arranque_segundos gauge",
+        ]
+        lineas += [f'arranque_segundos{{fase="{fase}"}} {_numero(s)}' for fase, s in self.arranque.items()]
+        lineas += [
+            "# HELP http_peticiones_en_curso Peticiones HTTP en curso",
+            "# TYPE http_peticiones_en_curso gauge",
+            f"http_peticiones_en_curso {self.en_curso}",
+            "# HELP http_peticiones_total Peticiones HTTP por ruta y código de estado",
+            "# TYPE http_peticiones_total counter",
+        ]
+        for (metodo, ruta, estado), n in sorted(self.peticiones.items()):
+            lineas.append(f'http_peticiones_total{{metodo="{metodo}",ruta="{_escapar(ruta)}",estado="{estado}"}} {n}')
+        lineas += _histogramas(
+            "http_latencia_segundos", "Latencia de las peticiones HTTP por ruta", self.latencias
+        )
+        lineas += _histogramas(
+            "http_consultas_sql_por_peticion", "Consultas SQL por petición", self.consultas_peticion
+        )
+        for indice, (nombre, tipo, ayuda) in enumerate((
+            ("http_sql_consultas_total", "counter", "Consultas SQL ejecutadas por ruta"),
+            ("http_sql_filas_total", "counter", "Filas afectadas por las consultas SQL por ruta"),
+            ("http_sql_segundos_total", "counter", "Tiempo en consultas SQL por ruta"),
+        )):
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+            for (metodo, ruta), valores in sorted(self.sql_ruta.items()):
+                lineas.append(f'{nombre}{{metodo="{metodo}",ruta="{_escapar(ruta)}"}} {_numero(valores[indice])}')
+        for indice, (nombre, ayuda) in enumerate((
+            ("sql_sentencias_total", "Ejecuciones por huella de sentencia"),
+            ("sql_filas_total", "Filas afectadas por huella de sentencia"),
+            ("sql_segundos_total", "Tiempo por huella de sentencia"),
+        )):
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+            for huella, valores in sorted(self.sql_huella.items()):
+                lineas.append(f'{nombre}{{sentencia="{_escapar(huella)}"}} {_numero(valores[indice])}')
+        for colector in self._colectores:
+            lineas += colector()
+        return "\n".join(lineas) + "\n"
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["metricas_inicio"].pop()
+    metricas.registrar_sentencia(statement, cursor.rowcount, time.perf_counter() - inicio)
+
+def _histogramas(nombre: str, ayuda: str, histogramas: Dict[Tuple[str, str], Histograma]) -> List[str]:
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+    for (metodo, ruta), histograma in sorted(histogramas.items()):
+        lineas += lineas_histograma(nombre, histograma, f'metodo="{metodo}",ruta="{_escapar(ruta)}"')
+    return lineas
+
+def lineas_histograma(nombre: str, histograma: Histograma, etiquetas: str = "") -> List[str]:
+    """Líneas _bucket/_sum/_count de un histograma (sin HELP ni TYPE)"""
+    prefijo = f"{etiquetas}," if etiquetas else ""
+    sufijo = f"{{{etiquetas}}}" if etiquetas else ""
+    lineas = []
+    acumulado = 0
+    for limite, cuenta in zip(histograma.limites, histograma.cuentas):
+        acumulado += cuenta
+        lineas.append(f'{nombre}_bucket{{{prefijo}le="{limite}"}} {acumulado}')
+    lineas.append(f'{nombre}_bucket{{{prefijo}le="+Inf"}} {histograma.total}')
+    lineas.append(f"{nombre}_sum{sufijo} {_numero(histograma.suma)}")
+    lineas.append(f"{nombre}_count{sufijo} {histograma.total}")
+    return lineas
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _numero(valor: float) -> str:
+    return str(round(valor, 6)) if isinstance(valor, float) else str(valor)
+
+class MiddlewareMetricas:
+    """Middleware ASGI: latencia, código de estado, peticiones en curso y SQL por ruta"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        estado = 500
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        sql = ConsultasPeticion()
+        token = _peticion_actual.set(sql)
+        metricas.en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            metricas.en_curso -= 1
+            _peticion_actual.reset(token)
+            # Plantilla de la ruta (no la URL) para no disparar la cardinalidad
+            route = scope.get("route")
+            ruta = getattr(route, "path", None) or "sin_ruta"
+            metricas.registrar_peticion(scope["method"], ruta, estado, duracion, sql)
+
+metricas = Metricas()
@@ -0,0 +1,104 @@
+# hotel_pedidos/app/utils/proyecciones.py
+"""
+Ruta de lectura de pedidos sin ORM: una sola consulta con JOIN que trae columnas planas
+(pedido + producto + habitación) y se serializa directamente a JSON, sin hidratar objetos
+ni pasar por el identity map de la sesión.
+"""
+from typing import Any, Iterable, List
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from sqlalchemy import Select, select
+from app import schemas
+from app.models import Habitacion, Pedido, Producto
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el serializador de pydantic
+    orjson = None
+
+COLUMNAS_REFERENCIA = (
+    Producto.nombre.label("producto_nombre"),
+    Producto.precio.label("producto_precio"),
+    Producto.imagen.label("producto_imagen"),
+    Producto.disponible.label("producto_disponible"),
+    Habitacion.numero.label("habitacion_numero"),
+    Habitacion.apellido.label("habitacion_apellido"),
+    Habitacion.telefono.label("habitacion_telefono"),
+    Habitacion.check_in.label("habitacion_check_in"),
+    Habitacion.check_out.label("habitacion_check_out"),
+    Habitacion.activa.label("habitacion_activa"),
+)
+
+def columnas_pedido(P=Pedido) -> tuple:
+    """Columnas planas de una línea (de `pedidos` o, con P=PedidoArchivo, del archivo)"""
+    return (
+        P.id,
+        P.habitacion_id,
+        P.producto_id,
+        P.cantidad,
+        P.notas,
+        P.estado,
+        P.fecha,
+        P.hora_entrega,
+        P.precio_unitario,
+        P.ticket_id,
+    ) + COLUMNAS_REFERENCIA
+
+COLUMNAS_PEDIDO = columnas_pedido()
+
+pedidos_adapter = TypeAdapter(List[schemas.PedidoResponse])
+pagina_adapter = TypeAdapter(schemas.PedidoPaginaResponse)
+tickets_adapter = TypeAdapter(schemas.TicketPaginaResponse)
+
+def select_pedidos(P=Pedido) -> Select:
+    """SELECT de pedidos con su producto y habitación en una sola consulta"""
+    return (
+        select(*columnas_pedido(P))
+        .select_from(P)
+        .join(Producto, Producto.id == P.producto_id)
+        .join(Habitacion, Habitacion.id == P.habitacion_id)
+    )
+
+def pedido_dict(fila) -> dict:
+    """Convierte una fila de select_pedidos en el dict con la forma de PedidoResponse"""
+    return {
+        "habitacion_id": fila.habitacion_id,
+        "producto_id": fila.producto_id,
+        "cantidad": fila.cantidad,
+        "notas": fila.notas,
+        "estado": fila.estado.value,
+        "id": fila.id,
+        "fecha": fila.fecha,
+        "hora_entrega": fila.hora_entrega,
+        "precio_unitario": fila.precio_unitario,
+        "ticket_id": fila.ticket_id,
+        "producto": {
+            "id": fila.producto_id,
+            "nombre": fila.producto_nombre,
+            "precio": fila.producto_precio,
+            "imagen": fila.producto_imagen,
+            "disponible": fila.producto_disponible,
+        },
+        "habitacion": {
+            "numero": fila.habitacion_numero,
+            "apellido": fila.habitacion_apellido,
+            "telefono": fila.habitacion_telefono,
+            "check_in": fila.habitacion_check_in,
+            "check_out": fila.habitacion_check_out,
+            "id": fila.habitacion_id,
+            "activa": fila.habitacion_activa,
+            "pedidos": [],
+        },
+    }
+
+def pedidos_dicts(filas: Iterable) -> List[dict]:
+    return [pedido_dict(fila) for fila in filas]
+
+def a_json(datos: Any, adapter: TypeAdapter) -> bytes:
+    """Serializa a bytes JSON con orjson si está instalado, o con el TypeAdapter de pydantic"""
+    if orjson is not None:
+        return orjson.dumps(datos)
+    return adapter.dump_json(adapter.validate_python(datos))
+
+def respuesta_json(datos: Any, adapter: TypeAdapter, status_code: int = 200) -> Response:
+    return Response(content=a_json(datos, adapter), media_type="application/json", status_code=status_code)
@@ -0,0 +1,135 @@
+# hotel_pedidos/app/utils/registro.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Habitacion, UsuarioAdmin
+
+class RegistroAuth:
+    """
+    Registro en memoria de habitaciones y administradores para resolver la autenticación
+    sin consultar la base de datos en cada petición.
+
+    - Las habitaciones y admins se cargan al arrancar y se actualizan en cada escritura
+      (login, check-in/check-out, alta o baja de admins).
+    - Los claims ya verificados de cada token se cachean con un TTL acotado.
+    - Las revocaciones se guardan por sujeto ("habitacion:<id>", "admin:<username>") con la
+      marca de tiempo a partir de la cual los tokens emitidos antes dejan de valer, y por
+      token individual (logout) hasta que el token expira.
+    """
+
+    def __init__(self, ttl: int, max_tokens: int):
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.cargado = False
+        self.habitaciones: Dict[int, dict] = {}
+        self.admins: Dict[str, UsuarioAdmin] = {}
+        self._claims: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._revocados: Dict[str, float] = {}
+        self._tokens_revocados: Dict[str, float] = {}
+
+    # --------------------------
+    # Carga y sincronización
+    # --------------------------
+    async def cargar(self, db: AsyncSession) -> None:
+        """Carga todas las habitaciones y admins en memoria"""
+        habitaciones = (await db.execute(select(Habitacion))).scalars().all()
+        admins = (await db.execute(select(UsuarioAdmin))).scalars().all()
+        self.habitaciones = {h.id: self._habitacion_dict(h) for h in habitaciones}
+        self.admins = {a.username: self._admin_snapshot(a) for a in admins}
+        self._claims.clear()
+        self.cargado = True
+
+    def actualizar_habitacion(self, habitacion: Habitacion) -> None:
+        self.habitaciones[habitacion.id] = self._habitacion_dict(habitacion)
+
+    def actualizar_admin(self, admin: UsuarioAdmin) -> None:
+        self.admins[admin.username] = self._admin_snapshot(admin)
+        if not admin.activo:
+            self.revocar(f"admin:{admin.username}")
+
+    @staticmethod
+    def _habitacion_dict(habitacion: Habitacion) -> dict:
+        return {
+            "id": habitacion.id,
+            "numero": habitacion.numero,
+            "apellido": habitacion.apellido,
+            "telefono": habitacion.telefono,
+            "check_in": habitacion.check_in,
+            "check_out": habitacion.check_out,
+            "activa": habitacion.activa,
+        }
+
+    @staticmethod
+    def _admin_snapshot(admin: UsuarioAdmin) -> UsuarioAdmin:
+        # Copia desligada de la sesión y sin el hash de la contraseña
+        return UsuarioAdmin(
+            id=admin.id,
+            username=admin.username,
+            email=admin.email,
+            nombre=admin.nombre,
+            activo=admin.activo,
+            es_superadmin=admin.es_superadmin,
+        )
+
+    # --------------------------
+    # Revocación
+    # --------------------------
+    def revocar(self, sujeto: str) -> None:
+        """Invalida todos los tokens del sujeto emitidos hasta ahora"""
+        self._revocados[sujeto] = time.time()
+        self._claims.clear()
+
+    def revocar_token(self, token: str, exp: Optional[float]) -> None:
+        """Invalida un token concreto (logout) hasta su expiración"""
+        ahora = time.time()
+        if len(self._tokens_revocados) >= self.max_tokens:
+            self._tokens_revocados = {k: v for k, v in self._tokens_revocados.items() if v > ahora}
+        self._tokens_revocados[self._digest(token)] = exp or ahora + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self._claims.pop(token, None)
+
+    def esta_revocado(self, token: str, sujeto: str, iat: float) -> bool:
+        """
+        Comprueba las revocaciones de un token recién decodificado.
+        No hace falta repetirlo en los aciertos de caché: revocar limpia los claims afectados.
+        """
+        revocado_en = self._revocados.get(sujeto)
+        if revocado_en is not None and iat <= revocado_en:
+            return True
+        return bool(self._tokens_revocados) and self._digest(token) in self._tokens_revocados
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+    # --------------------------
+    # Caché de claims verificados
+    # --------------------------
+    def claims(self, token: str) -> Optional[dict]:
+        entrada = self._claims.get(token)
+        if entrada is None:
+            return None
+        caduca, payload = entrada
+        if caduca < time.monotonic():
+            self._claims.pop(token, None)
+            return None
+        return payload
+
+    def guardar_claims(self, token: str, payload: dict) -> None:
+        ttl = self.ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+        self._claims[token] = (time.monotonic() + ttl, payload)
+        if len(self._claims) > self.max_tokens:
+            self._claims.popitem(last=False)
+
+registro_auth = RegistroAuth(
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+    max_tokens=settings.AUTH_CACHE_MAX_TOKENS,
+)
@@ -0,0 +1,146 @@
+# hotel_pedidos/app/utils/resumenes.py
+"""
+Resúmenes incrementales del dashboard (pedidos por hora, por día y por producto/categoría).
+
+Cada escritura sobre pedidos llama a `actualizar_resumenes` antes del commit, de modo que
+los resúmenes cambian en la misma transacción. Las líneas canceladas no cuentan.
+
+Reconstrucción completa desde el histórico:
+    python -m app.utils.resumenes
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy import delete, func, select, insert as sa_insert
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.archivo import pedidos_historico
+from app.models import (
+    EstadoPedidoDB, Pedido, Producto, ResumenDia, ResumenHora, ResumenProductoDia
+)
+
+class CambioResumen(NamedTuple):
+    fecha: datetime
+    producto_id: int
+    categoria_id: Optional[int]
+    precio: float
+    pedidos: int  # +1 / -1 / 0
+    unidades: int
+
+def _contribucion(estado, cantidad: int) -> Tuple[int, int]:
+    if estado in (EstadoPedidoDB.cancelado, "cancelado"):
+        return 0, 0
+    return 1, cantidad
+
+def cambio_pedido(
+    pedido: Pedido,
+    producto: Producto,
+    antes: Optional[Tuple[object, int]] = None,
+    eliminado: bool = False
+) -> Optional[CambioResumen]:
+    """
+    Calcula la diferencia que supone un pedido en los resúmenes.
+    `antes` es el (estado, cantidad) previo a la escritura (None si el pedido es nuevo).
+    """
+    pedidos_antes, unidades_antes = _contribucion(*antes) if antes else (0, 0)
+    pedidos_despues, unidades_despues = (0, 0) if eliminado else _contribucion(pedido.estado, pedido.cantidad)
+    if (pedidos_antes, unidades_antes) == (pedidos_despues, unidades_despues):
+        return None
+    return CambioResumen(
+        fecha=pedido.fecha,
+        producto_id=producto.id,
+        categoria_id=producto.categoria_id,
+        precio=producto.precio if pedido.precio_unitario is None else pedido.precio_unitario,
+        pedidos=pedidos_despues - pedidos_antes,
+        unidades=unidades_despues - unidades_antes,
+    )
+
+async def actualizar_resumenes(db: AsyncSession, cambios: Iterable[Optional[CambioResumen]]) -> None:
+    """Aplica los cambios a los resúmenes (upsert acumulativo, sin hacer commit)"""
+    por_hora = defaultdict(lambda: [0, 0, 0.0])
+    por_dia = defaultdict(lambda: [0, 0, 0.0])
+    por_producto = {}
+    for cambio in cambios:
+        if cambio is None:
+            continue
+        ingresos = cambio.unidades * cambio.precio
+        for acumulado in (
+            por_hora[cambio.fecha.replace(minute=0, second=0, microsecond=0)],
+            por_dia[cambio.fecha.date()],
+        ):
+            acumulado[0] += cambio.pedidos
+            acumulado[1] += cambio.unidades
+            acumulado[2] += ingresos
+        clave = (cambio.fecha.date(), cambio.producto_id)
+        acumulado = por_producto.setdefault(clave, [cambio.categoria_id, 0, 0.0])
+        acumulado[1] += cambio.unidades
+        acumulado[2] += ingresos
+
+    if por_hora:
+        await _upsert(db, ResumenHora, ["hora"], ["pedidos", "unidades", "ingresos"], [
+            {"hora": hora, "pedidos": p, "unidades": u, "ingresos": i}
+            for hora, (p, u, i) in por_hora.items()
+        ])
+    if por_dia:
+        await _upsert(db, ResumenDia, ["dia"], ["pedidos", "unidades", "ingresos"], [
+            {"dia": dia, "pedidos": p, "unidades": u, "ingresos": i}
+            for dia, (p, u, i) in por_dia.items()
+        ])
+    if por_producto:
+        await _upsert(db, ResumenProductoDia, ["dia", "producto_id"], ["unidades", "ingresos"], [
+            {"dia": dia, "producto_id": producto_id, "categoria_id": c, "unidades": u, "ingresos": i}
+            for (dia, producto_id), (c, u, i) in por_producto.items()
+        ])
+
+async def _upsert(db: AsyncSession, modelo, claves: list, columnas: list, filas: list) -> None:
+    stmt = insert(modelo)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=claves,
+        set_={col: getattr(modelo, col) + getattr(stmt.excluded, col) for col in columnas},
+    )
+    await db.execute(stmt, filas)
+
+async def reconstruir_resumenes(db: AsyncSession) -> None:
+    """Regenera todos los resúmenes a partir del histórico de pedidos (incluido el archivo)"""
+    P = pedidos_historico()
+    # Mismo formato de texto que usa SQLAlchemy para DateTime/Date en SQLite,
+    # para que las claves coincidan con las que escribe actualizar_resumenes
+    hora = func.strftime("%Y-%m-%d %H:00:00.000000", P.fecha)
+    dia = func.date(P.fecha)
+    # Precio de la línea; las líneas anteriores a guardarlo usan el precio actual del producto
+    ingresos = func.sum(P.cantidad * func.coalesce(P.precio_unitario, Producto.precio))
+    activos = (
+        select(P)
+        .join(Producto, Producto.id == P.producto_id)
+        .where(P.estado != EstadoPedidoDB.cancelado)
+    )
+
+    for modelo in (ResumenHora, ResumenDia, ResumenProductoDia):
+        await db.execute(delete(modelo))
+    await db.execute(sa_insert(ResumenHora).from_select(
+        ["hora", "pedidos", "unidades", "ingresos"],
+        activos.with_only_columns(hora, func.count(P.id), func.sum(P.cantidad), ingresos).group_by(hora),
+    ))
+    await db.execute(sa_insert(ResumenDia).from_select(
+        ["dia", "pedidos", "unidades", "ingresos"],
+        activos.with_only_columns(dia, func.count(P.id), func.sum(P.cantidad), ingresos).group_by(dia),
+    ))
+    await db.execute(sa_insert(ResumenProductoDia).from_select(
+        ["dia", "producto_id", "categoria_id", "unidades", "ingresos"],
+        activos.with_only_columns(
+            dia, P.producto_id, Producto.categoria_id, func.sum(P.cantidad), ingresos
+        ).group_by(dia, P.producto_id, Producto.categoria_id),
+    ))
+    await db.commit()
+
+async def _main():
+    from app.database import AsyncSessionLocal, Base, engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await reconstruir_resumenes(db)
+    print("Resúmenes reconstruidos")
+
+if __name__ == "__main__":
+    asyncio.run(_main())
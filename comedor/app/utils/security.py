@@ -1,33 +1,119 @@
 # hotel_pedidos/app/utils/security.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, List, Optional
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Request, Depends  # Añadido Depends aquí
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 from app.models import UsuarioAdmin, Habitacion
-from app.database import get_db
+from app.database import AsyncSessionLocal
+from app.utils.registro import registro_auth
+from app.utils.metricas import BUCKETS_LATENCIA, Histograma, lineas_histograma, metricas
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 # Configuración de seguridad
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+_pwd_context = None
+
+def _contexto_passwords():
+    """CryptContext de passlib, creado en el primer uso: solo lo necesitan el login de admin y la semilla"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña coincide con su versión hasheada"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _contexto_passwords().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Genera el hash de una contraseña"""
-    return pwd_context.hash(password)
+    return _contexto_passwords().hash(password)
+
+class PoolPasswords:
+    """
+    Ejecuta bcrypt fuera del event loop en un pool de hilos acotado. Si ya hay
+    `max_pendientes` operaciones en cola o en curso, rechaza con 503 en vez de encolar:
+    un login más no debe retrasar a los demás ni al resto de peticiones.
+    """
+
+    def __init__(self, workers: int, max_pendientes: int):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.pendientes = 0
+        self.rechazadas = 0
+        self.espera = Histograma(BUCKETS_LATENCIA)  # Tiempo en cola hasta tener un hilo
+        self.duracion = Histograma(BUCKETS_LATENCIA)  # Tiempo de bcrypt
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def ejecutar(self, funcion: Callable, *args):
+        if self.pendientes >= self.max_pendientes:
+            self.rechazadas += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiados inicios de sesión simultáneos, reintente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="passwords")
+        encolado = time.perf_counter()
+        tiempos = []
+
+        def medir():
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args)
+            finally:
+                tiempos.append((inicio - encolado, time.perf_counter() - inicio))
+
+        self.pendientes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, medir)
+        finally:
+            self.pendientes -= 1
+            # Los histogramas se actualizan aquí, en el hilo del event loop
+            for espera, duracion in tiempos:
+                self.espera.observar(espera)
+                self.duracion.observar(duracion)
+
+    def metricas(self) -> List[str]:
+        return [
+            "# HELP passwords_pendientes Operaciones de contraseña en cola o en curso",
+            "# TYPE passwords_pendientes gauge",
+            f"passwords_pendientes {self.pendientes}",
+            "# HELP passwords_rechazadas_total Operaciones de contraseña rechazadas por cola llena",
+            "# TYPE passwords_rechazadas_total counter",
+            f"passwords_rechazadas_total {self.rechazadas}",
+            "# HELP passwords_espera_segundos Espera en cola del pool de contraseñas",
+            "# TYPE passwords_espera_segundos histogram",
+            *lineas_histograma("passwords_espera_segundos", self.espera),
+            "# HELP passwords_duracion_segundos Duración del hash o la verificación",
+            "# TYPE passwords_duracion_segundos histogram",
+            *lineas_histograma("passwords_duracion_segundos", self.duracion),
+        ]
+
+pool_passwords = PoolPasswords(settings.PASSWORD_WORKERS, settings.PASSWORD_MAX_PENDIENTES)
+metricas.registrar_colector(pool_passwords.metricas)
+
+async def verificar_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool de contraseñas (503 si está saturado)"""
+    return await pool_passwords.ejecutar(verify_password, plain_password, hashed_password)
+
+async def hashear_password(password: str) -> str:
+    """get_password_hash en el pool de contraseñas (503 si está saturado)"""
+    return await pool_passwords.ejecutar(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crea un token JWT"""
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # iat con fracciones de segundo para compararlo con las revocaciones del registro
+    to_encode.update({"exp": expire, "iat": time.time()})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 def decode_access_token(token: str) -> dict:
@@ -48,33 +134,62 @@ async def authenticate_habitacion(db: AsyncSession, numero: str, apellido: str)
     habitacion = result.scalars().first()
     return habitacion
 
-async def get_current_habitacion(request: Request, db: AsyncSession = Depends(get_db)) -> dict:
-    """Obtiene la habitación actual basada en el token"""
+def _sujeto(payload: dict) -> str:
+    if payload.get("user_type") == "admin":
+        return f"admin:{payload.get('sub')}"
+    return f"habitacion:{payload.get('habitacion_id')}"
+
+def resolver_token(token: str) -> dict:
+    """
+    Devuelve los claims de un token usando la caché del registro.
+    Solo se decodifica y se comprueba la revocación cuando el token no está cacheado.
+    """
+    payload = registro_auth.claims(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        if registro_auth.esta_revocado(token, _sujeto(payload), payload.get("iat", 0)):
+            raise HTTPException(status_code=401, detail="Token inválido o expirado")
+        registro_auth.guardar_claims(token, payload)
+    return payload
+
+async def get_current_habitacion(request: Request) -> dict:
+    """Obtiene la habitación actual basada en el token (resuelta desde el registro en memoria)"""
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="No autenticado")
     token = token.replace("Bearer ", "")
-    payload = decode_access_token(token)
+    payload = resolver_token(token)
     numero: str = payload.get("sub")
     habitacion_id: int = payload.get("habitacion_id")
     
-    stmt = select(Habitacion).where(
-        Habitacion.id == habitacion_id,
-        Habitacion.numero == numero
-    )
-    result = await db.execute(stmt)
-    habitacion = result.scalars().first()
+    habitacion = registro_auth.habitaciones.get(habitacion_id)
+    if habitacion is None and not registro_auth.cargado:
+        # Registro aún sin cargar (p.ej. arranque en frío): se consulta y se incorpora
+        async with AsyncSessionLocal() as db:
+            encontrada = await db.get(Habitacion, habitacion_id)
+        if encontrada is not None:
+            registro_auth.actualizar_habitacion(encontrada)
+            habitacion = registro_auth.habitaciones[habitacion_id]
     
-    if not habitacion:
+    if not habitacion or habitacion["numero"] != numero:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Habitación no encontrada",
         )
-    return {"id": habitacion.id, "numero": habitacion.numero, "apellido": habitacion.apellido}
+    return {"id": habitacion["id"], "numero": habitacion["numero"], "apellido": habitacion["apellido"]}
 
-async def get_current_admin(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UsuarioAdmin:
-    """Obtiene el usuario admin actual basado en el token"""
-    payload = decode_access_token(token)
+async def get_current_admin(request: Request, token: Optional[str] = Depends(oauth2_scheme)) -> UsuarioAdmin:
+    """Obtiene el usuario admin actual basado en el token (resuelto desde el registro en memoria)"""
+    if not token:
+        # Los clientes que no pueden enviar cabeceras (EventSource) usan la cookie admin_token
+        token = (request.cookies.get("admin_token") or "").replace("Bearer ", "")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    payload = resolver_token(token)
     username: str = payload.get("sub")
     if username is None:
         raise HTTPException(
@@ -82,12 +197,17 @@ async def get_current_admin(token: str = Depends(oauth2_scheme), db: AsyncSessio
             detail="Credenciales inválidas",
         )
     
-    stmt = select(UsuarioAdmin).where(UsuarioAdmin.username == username)
-    result = await db.execute(stmt)
-    user = result.scalars().first()
+    user = registro_auth.admins.get(username)
+    if user is None and not registro_auth.cargado:
+        async with AsyncSessionLocal() as db:
+            stmt = select(UsuarioAdmin).where(UsuarioAdmin.username == username)
+            encontrado = (await db.execute(stmt)).scalars().first()
+        if encontrado is not None:
+            registro_auth.actualizar_admin(encontrado)
+            user = registro_auth.admins[username]
     if user is None or not user.activo:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario no encontrado o inactivo",
         )
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,83 @@
+# hotel_pedidos/app/utils/stock.py
+"""
+Existencias por producto. `Producto.stock` NULL significa que no se controla (cocina,
+cafetería); con un número, cada confirmación lo descuenta.
+
+El descuento es una única UPDATE por conjuntos con la condición `stock >= requerido`
+dentro de la transacción de la confirmación: dos habitaciones que confirman a la vez
+nunca dejan el stock en negativo, porque la segunda UPDATE ya ve el stock descontado
+por la primera y no pasa la condición. Al llegar a cero el producto deja de estar
+disponible y hay que invalidar el menú cacheado; al reponer un producto agotado vuelve a
+estarlo (igual que al fijar el stock a mano).
+"""
+from typing import Iterable, List, Tuple
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Pedido, Producto
+
+class StockInsuficiente(Exception):
+    def __init__(self, productos: List[dict]):
+        super().__init__("Stock insuficiente")
+        self.productos = productos  # id, nombre, solicitado y disponible de cada producto sin stock
+
+async def descontar_stock(db: AsyncSession, ticket_id: int) -> List[int]:
+    """
+    Descuenta el stock de las líneas del ticket (sin hacer commit). Devuelve los ids de los
+    productos agotados. Si algún producto controlado no tiene stock suficiente lanza
+    StockInsuficiente y quien llama debe deshacer la transacción (y con ella lo descontado).
+    """
+    requerido = (
+        select(func.sum(Pedido.cantidad))
+        .where(Pedido.ticket_id == ticket_id, Pedido.producto_id == Producto.id)
+        .scalar_subquery()
+    )
+    restante = Producto.stock - requerido
+    descontados = (await db.execute(
+        update(Producto)
+        .where(
+            Producto.stock.is_not(None),
+            Producto.id.in_(select(Pedido.producto_id).where(Pedido.ticket_id == ticket_id)),
+            Producto.stock >= requerido,
+        )
+        .values(stock=restante, disponible=case((restante > 0, Producto.disponible), else_=False))
+        .returning(Producto.id, Producto.stock)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    # Productos controlados del ticket que no pasaron la condición
+    ids_descontados = [fila.id for fila in descontados]
+    faltantes = (await db.execute(
+        select(Producto.id, Producto.nombre, Producto.stock, func.sum(Pedido.cantidad).label("solicitado"))
+        .join(Pedido, and_(Pedido.producto_id == Producto.id, Pedido.ticket_id == ticket_id))
+        .where(Producto.stock.is_not(None), Producto.id.not_in(ids_descontados))
+        .group_by(Producto.id, Producto.nombre, Producto.stock)
+    )).all()
+    if faltantes:
+        raise StockInsuficiente([
+            {"id": fila.id, "nombre": fila.nombre, "solicitado": fila.solicitado, "disponible": fila.stock}
+            for fila in faltantes
+        ])
+    return [fila.id for fila in descontados if fila.stock <= 0]
+
+async def reponer_stock(db: AsyncSession, lineas: Iterable[Tuple[int, int]]) -> List[int]:
+    """
+    Devuelve al stock las cantidades (producto_id, cantidad) de líneas confirmadas anuladas
+    (sin hacer commit). Los productos agotados vuelven a estar disponibles; devuelve sus ids.
+    """
+    por_producto = {}
+    for producto_id, cantidad in lineas:
+        por_producto[producto_id] = por_producto.get(producto_id, 0) + cantidad
+    por_producto = {producto_id: cantidad for producto_id, cantidad in por_producto.items() if cantidad > 0}
+    if not por_producto:
+        return []
+    repuestos = (await db.execute(
+        update(Producto)
+        .where(Producto.id.in_(por_producto), Producto.stock.is_not(None))
+        .values(
+            stock=Producto.stock + case(por_producto, value=Producto.id, else_=0),
+            disponible=case((Producto.stock <= 0, True), else_=Producto.disponible),
+        )
+        .returning(Producto.id, Producto.stock)
+        .execution_options(synchronize_session=False)
+    )).all()
+    return [fila.id for fila in repuestos if fila.stock - por_producto[fila.id] <= 0]
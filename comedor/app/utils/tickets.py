@@ -0,0 +1,125 @@
+# hotel_pedidos/app/utils/tickets.py
+"""
+Tickets: cabecera que agrupa las líneas de pedido confirmadas juntas.
+
+Cada línea guarda su `precio_unitario` al crearse, así que el total del ticket se calcula
+en SQL sobre las propias líneas (sin JOIN con productos) y un cambio de precio posterior
+no reescribe el histórico. Toda escritura que cambie el estado o la cantidad de líneas con
+ticket llama a `actualizar_tickets` antes del commit.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import and_, case, exists, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import EstadoPedidoDB, Pedido, PedidoArchivo, Ticket
+from app.utils.archivo import corte_archivo
+from app.utils.cache import menu_cache
+from app.utils.helpers import generar_codigo_pedido
+
+async def crear_ticket(db: AsyncSession, habitacion: dict) -> Optional[int]:
+    """
+    Agrupa las líneas pendientes de la habitación en un ticket nuevo y las pasa a `en_proceso`.
+    Devuelve el id del ticket sin hacer commit; si no había nada pendiente, deshace la
+    transacción y devuelve None.
+    """
+    fecha = datetime.utcnow()
+    ticket_id = (await db.execute(
+        insert(Ticket).values(
+            codigo=generar_codigo_pedido(habitacion["numero"]),
+            habitacion_id=habitacion["id"],
+            habitacion_numero=habitacion["numero"],
+            habitacion_apellido=habitacion["apellido"],
+            estado=EstadoPedidoDB.en_proceso,
+            fecha=fecha,
+            total=0.0,
+        ).returning(Ticket.id)
+    )).scalar_one()
+    pedido_ids = (await db.execute(
+        update(Pedido)
+        .where(Pedido.habitacion_id == habitacion["id"])
+        .where(Pedido.estado == EstadoPedidoDB.pendiente)
+        .values(estado=EstadoPedidoDB.en_proceso, ticket_id=ticket_id)
+        .returning(Pedido.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    if not pedido_ids:
+        await db.rollback()
+        return None
+    await actualizar_tickets(db, [ticket_id])
+    return ticket_id
+
+async def actualizar_tickets(db: AsyncSession, ticket_ids: Iterable[Optional[int]]) -> None:
+    """Recalcula total y estado de los tickets a partir de sus líneas (sin hacer commit)"""
+    ids = sorted({ticket_id for ticket_id in ticket_ids if ticket_id is not None})
+    if not ids:
+        return
+
+    def lineas(*condiciones):
+        return and_(Pedido.ticket_id == Ticket.id, *condiciones)
+
+    activas = lineas(Pedido.estado != EstadoPedidoDB.cancelado)
+    total = (
+        select(func.coalesce(func.sum(Pedido.cantidad * Pedido.precio_unitario), 0.0))
+        .where(activas)
+        .scalar_subquery()
+    )
+    # El ticket sigue en proceso mientras quede alguna línea por servir
+    estado = case(
+        (exists().where(lineas(Pedido.estado.in_([EstadoPedidoDB.pendiente, EstadoPedidoDB.en_proceso]))),
+         EstadoPedidoDB.en_proceso.name),
+        (exists().where(lineas(Pedido.estado == EstadoPedidoDB.entregado)), EstadoPedidoDB.entregado.name),
+        else_=EstadoPedidoDB.cancelado.name,
+    )
+    await db.execute(
+        update(Ticket)
+        .where(Ticket.id.in_(ids))
+        .values(total=total, estado=estado)
+        .execution_options(synchronize_session=False)
+    )
+
+async def tickets_dicts(db: AsyncSession, tickets: List[Ticket]) -> List[dict]:
+    """
+    Tickets con sus líneas. Las líneas se leen en una consulta por `ticket_id` (dos si hay
+    tickets anteriores al corte del archivo) y el nombre del producto sale de la caché de
+    referencia del catálogo, sin JOIN con productos.
+    """
+    por_ticket = {ticket.id: [] for ticket in tickets}
+    if por_ticket:
+        productos = await menu_cache.productos(db)
+        # Las líneas de tickets anteriores al corte pueden estar ya en el archivo
+        tablas = [Pedido]
+        if any(ticket.fecha < corte_archivo() for ticket in tickets):
+            tablas.append(PedidoArchivo)
+        filas = []
+        for P in tablas:
+            filas += (await db.execute(
+                select(P.id, P.ticket_id, P.producto_id, P.cantidad, P.precio_unitario, P.notas, P.estado)
+                .where(P.ticket_id.in_(por_ticket))
+            )).all()
+        filas.sort(key=lambda fila: fila.id)
+        for fila in filas:
+            producto = productos.get(fila.producto_id)
+            por_ticket[fila.ticket_id].append({
+                "id": fila.id,
+                "producto_id": fila.producto_id,
+                "producto_nombre": producto.nombre if producto else "",
+                "cantidad": fila.cantidad,
+                "precio_unitario": fila.precio_unitario,
+                "notas": fila.notas,
+                "estado": fila.estado.value,
+            })
+    return [ticket_dict(ticket, por_ticket[ticket.id]) for ticket in tickets]
+
+def ticket_dict(ticket, lineas: List[dict]) -> dict:
+    """Ticket con sus líneas, con la forma que usa el panel de administración"""
+    return {
+        "id": ticket.id,
+        "codigo": ticket.codigo,
+        "habitacion_id": ticket.habitacion_id,
+        "habitacion_numero": ticket.habitacion_numero,
+        "habitacion_apellido": ticket.habitacion_apellido,
+        "estado": ticket.estado.value,
+        "fecha": ticket.fecha,
+        "total": round(ticket.total or 0.0, 2),
+        "items": lineas,
+    }
@@ -0,0 +1,11 @@
+"""
+Benchmark de carga de extremo a extremo (huéspedes y administración).
+
+Se ejecuta desde el directorio del proyecto:
+    python -m bench --habitaciones 20 --ciclos 5
+    python -m bench --uvicorn            # contra un uvicorn real en un puerto local
+    python -m bench --url http://127.0.0.1:8000 --demo-rooms 101:Gomez,102:Perez
+
+Cada ejecución usa un SQLite temporal con datos de demo (salvo --url) y deja los
+resultados en JSON para comparar ejecuciones.
+"""
@@ -0,0 +1,165 @@
+# hotel_pedidos/bench/__main__.py
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from bench.carga import ejecutar
+
+ADMIN_USUARIO = "bench"
+ADMIN_PASSWORD = "bench-password"
+
+def _argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark de carga de la API de pedidos")
+    parser.add_argument("--habitaciones", type=int, default=20, help="Habitaciones (huéspedes) concurrentes")
+    parser.add_argument("--ciclos", type=int, default=5, help="Pedidos confirmados por habitación")
+    parser.add_argument("--lineas", type=int, default=3, help="Líneas añadidas por pedido")
+    parser.add_argument("--admins", type=int, default=2, help="Sesiones de administración concurrentes")
+    parser.add_argument("--admin-pausa", type=float, default=0.05, help="Pausa entre rondas de admin (s)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de la elección de productos")
+    parser.add_argument("--uvicorn", action="store_true", help="Levantar uvicorn y medir por socket")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (con --uvicorn)")
+    parser.add_argument("--url", help="Medir un servidor ya levantado (no crea base de datos)")
+    parser.add_argument("--demo-rooms", default="101:Gomez,102:Perez,103:Lopez",
+                        help="Habitaciones existentes numero:apellido (con --url)")
+    parser.add_argument("--admin-usuario", default=ADMIN_USUARIO, help="Usuario admin (con --url)")
+    parser.add_argument("--admin-password", default=ADMIN_PASSWORD, help="Contraseña admin (con --url)")
+    parser.add_argument("--salida", help="Fichero JSON de resultados (por defecto bench/resultados/)")
+    parser.add_argument("--etiqueta", default="", help="Texto libre para identificar la ejecución")
+    return parser.parse_args()
+
+def _preparar_entorno(directorio: str, habitaciones: list) -> dict:
+    """Variables de entorno para una instancia de la app sobre un SQLite temporal con semilla"""
+    entorno = {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{directorio}/bench.db",
+        "DB_ECHO": "false",
+        "ADMIN_USERNAME": ADMIN_USUARIO,
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "ADMIN_EMAIL": "bench@example.com",
+        "DEMO_ROOMS": ",".join(f"{numero}:{apellido}" for numero, apellido in habitaciones),
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "bench-secret-key"),
+    }
+    os.environ.update(entorno)
+    return entorno
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _esperar_servidor(url: str, proceso: subprocess.Popen, timeout: float = 30.0) -> None:
+    limite = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as cliente:
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise RuntimeError("uvicorn terminó antes de arrancar")
+            try:
+                if (await cliente.get("/api/productos")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn no respondió a tiempo")
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+async def _principal(args: argparse.Namespace) -> dict:
+    parametros = dict(
+        ciclos=args.ciclos,
+        lineas=args.lineas,
+        admins=args.admins,
+        admin_pausa=args.admin_pausa,
+        semilla=args.semilla,
+    )
+    if args.url:
+        habitaciones = [tuple(room.split(":")) for room in args.demo_rooms.split(",")]
+        resumen = await ejecutar(
+            lambda: httpx.AsyncClient(base_url=args.url, timeout=60),
+            habitaciones, admin_usuario=args.admin_usuario, admin_password=args.admin_password, **parametros
+        )
+        return {"modo": "url", "objetivo": args.url, **resumen}
+
+    habitaciones = [(f"B{i:04d}", "Bench") for i in range(1, args.habitaciones + 1)]
+    directorio = tempfile.mkdtemp(prefix="bench-comedor-")
+    try:
+        entorno = _preparar_entorno(directorio, habitaciones)
+        credenciales = dict(admin_usuario=ADMIN_USUARIO, admin_password=ADMIN_PASSWORD)
+        if args.uvicorn:
+            puerto = _puerto_libre()
+            url = f"http://127.0.0.1:{puerto}"
+            proceso = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(puerto), "--workers", str(args.workers), "--log-level", "warning"],
+                env={**os.environ, **entorno},
+            )
+            try:
+                await _esperar_servidor(url, proceso)
+                resumen = await ejecutar(
+                    lambda: httpx.AsyncClient(base_url=url, timeout=60), habitaciones, **credenciales, **parametros
+                )
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=30)
+            return {"modo": "uvicorn", "objetivo": url, "workers": args.workers, **resumen}
+
+        # En proceso: la app se importa después de fijar el entorno (settings se leen al importar)
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            transporte = httpx.ASGITransport(app=app)
+            resumen = await ejecutar(
+                lambda: httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60),
+                habitaciones, **credenciales, **parametros
+            )
+        return {"modo": "asgi", "objetivo": "app.main:app", **resumen}
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+def _imprimir(resultado: dict) -> None:
+    print(f"\n{resultado['modo']} · {resultado['peticiones']} peticiones en {resultado['duracion_s']} s "
+          f"· {resultado['rps']} req/s · errores: {resultado['errores']}\n")
+    print(f"{'ruta':<40} {'n':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}  estados")
+    for ruta, datos in resultado["rutas"].items():
+        estados = " ".join(f"{codigo}:{n}" for codigo, n in sorted(datos["estados"].items()))
+        print(f"{ruta:<40} {datos['peticiones']:>6} {datos['rps']:>8} {datos['p50_ms']:>8} "
+              f"{datos['p95_ms']:>8} {datos['p99_ms']:>8}  {estados}")
+
+def main() -> None:
+    args = _argumentos()
+    resultado = asyncio.run(_principal(args))
+    resultado = {
+        "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "etiqueta": args.etiqueta,
+        "python": platform.python_version(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("admin_password", "salida")},
+        "entorno": {k: os.environ.get(k) for k in ("DB_PROFILE", "PEDIDOS_GROUP_COMMIT", "DB_READ_POOL_SIZE")},
+        **resultado,
+    }
+    _imprimir(resultado)
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).parent / "resultados" / f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['modo']}.json"
+    )
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"\nResultados: {salida}")
+
+if __name__ == "__main__":
+    main()
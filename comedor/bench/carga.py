@@ -0,0 +1,155 @@
+# hotel_pedidos/bench/carga.py
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+class Metricas:
+    """Latencias y códigos de estado por ruta (plantilla de la ruta, no la URL concreta)"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.estados: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def medir(self, cliente: httpx.AsyncClient, metodo: str, ruta: str, url: str, **kwargs) -> httpx.Response:
+        inicio = time.perf_counter()
+        respuesta = await cliente.request(metodo, url, **kwargs)
+        clave = f"{metodo} {ruta}"
+        self.latencias[clave].append(time.perf_counter() - inicio)
+        self.estados[clave][respuesta.status_code] += 1
+        return respuesta
+
+    def resumen(self, duracion: float) -> dict:
+        rutas = {}
+        for clave, muestras in sorted(self.latencias.items()):
+            ordenadas = sorted(muestras)
+            rutas[clave] = {
+                "peticiones": len(ordenadas),
+                "rps": round(len(ordenadas) / duracion, 2),
+                "p50_ms": _percentil(ordenadas, 50),
+                "p95_ms": _percentil(ordenadas, 95),
+                "p99_ms": _percentil(ordenadas, 99),
+                "max_ms": round(ordenadas[-1] * 1000, 2),
+                "estados": dict(self.estados[clave]),
+            }
+        total = sum(len(m) for m in self.latencias.values())
+        errores = sum(
+            n for estados in self.estados.values() for codigo, n in estados.items()
+            if codigo >= 400 and codigo != 404
+        )
+        return {
+            "duracion_s": round(duracion, 3),
+            "peticiones": total,
+            "rps": round(total / duracion, 2) if duracion else 0.0,
+            "errores": errores,
+            "rutas": rutas,
+        }
+
+def _percentil(ordenadas: List[float], p: int) -> float:
+    """Percentil por rango más cercano, en milisegundos"""
+    indice = max(0, -(-len(ordenadas) * p // 100) - 1)
+    return round(ordenadas[indice] * 1000, 2)
+
+async def huesped(
+    cliente: httpx.AsyncClient,
+    metricas: Metricas,
+    numero: str,
+    apellido: str,
+    ciclos: int,
+    lineas: int,
+    aleatorio: random.Random,
+) -> None:
+    """Una habitación: login, navega el menú y hace `ciclos` pedidos (añadir, editar, confirmar)"""
+    r = await metricas.medir(cliente, "POST", "/api/auth/login", "/api/auth/login",
+                             json={"numero": numero, "apellido": apellido})
+    r.raise_for_status()
+    etags: Dict[str, str] = {}
+    for _ in range(ciclos):
+        productos = []
+        for ruta in ("/api/categorias", "/api/productos"):
+            # Como un navegador: reenvía el ETag y reutiliza lo que ya tenía
+            cabeceras = {"If-None-Match": etags[ruta]} if ruta in etags else {}
+            r = await metricas.medir(cliente, "GET", ruta, ruta, headers=cabeceras)
+            if "etag" in r.headers:
+                etags[ruta] = r.headers["etag"]
+            if ruta == "/api/productos" and r.status_code == 200:
+                productos = [p["id"] for p in r.json() if p["disponible"]]
+        productos = productos or [1]
+
+        creados = []
+        for _ in range(lineas):
+            r = await metricas.medir(cliente, "POST", "/api/pedidos/", "/api/pedidos/", json={
+                "producto_id": aleatorio.choice(productos),
+                "cantidad": aleatorio.randint(1, 3),
+            })
+            if r.status_code == 201:
+                creados.append(r.json()["id"])
+        if creados:
+            await metricas.medir(cliente, "PUT", "/api/pedidos/{pedido_id}", f"/api/pedidos/{creados[0]}",
+                                 json={"cantidad": aleatorio.randint(1, 4), "notas": "sin hielo"})
+        await metricas.medir(cliente, "GET", "/api/pedidos/pendientes", "/api/pedidos/pendientes")
+        await metricas.medir(cliente, "POST", "/api/pedidos/confirmar", "/api/pedidos/confirmar")
+    await metricas.medir(cliente, "GET", "/api/pedidos/cuenta", "/api/pedidos/cuenta")
+
+async def administrador(
+    cliente: httpx.AsyncClient,
+    metricas: Metricas,
+    usuario: str,
+    password: str,
+    terminado: asyncio.Event,
+    pausa: float,
+) -> None:
+    """Panel de administración: listados y dashboard en bucle mientras haya huéspedes activos"""
+    r = await metricas.medir(cliente, "POST", "/api/auth/admin/login", "/api/auth/admin/login",
+                             data={"username": usuario, "password": password})
+    r.raise_for_status()
+    cliente.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+    rutas = (
+        ("/api/admin/pedidos", {"status": "en_proceso", "per_page": 20}),
+        ("/api/admin/tickets", {"per_page": 10}),
+        ("/api/admin/stats", None),
+        ("/api/admin/orders-by-hour", None),
+    )
+    while not terminado.is_set():
+        for ruta, params in rutas:
+            await metricas.medir(cliente, "GET", ruta, ruta, params=params)
+        await asyncio.sleep(pausa)
+
+async def ejecutar(
+    crear_cliente,
+    habitaciones: List[tuple],
+    ciclos: int,
+    lineas: int,
+    admins: int,
+    admin_usuario: str,
+    admin_password: str,
+    admin_pausa: float,
+    semilla: Optional[int],
+) -> dict:
+    """Lanza huéspedes y administradores concurrentes y devuelve el resumen de métricas"""
+    metricas = Metricas()
+    terminado = asyncio.Event()
+    aleatorio = random.Random(semilla)
+    clientes = [crear_cliente() for _ in range(len(habitaciones) + admins)]
+    inicio = time.perf_counter()
+    try:
+        tareas_admin = [
+            asyncio.create_task(administrador(cliente, metricas, admin_usuario, admin_password, terminado, admin_pausa))
+            for cliente in clientes[len(habitaciones):]
+        ]
+        try:
+            await asyncio.gather(*(
+                huesped(cliente, metricas, numero, apellido, ciclos, lineas, random.Random(aleatorio.random()))
+                for cliente, (numero, apellido) in zip(clientes, habitaciones)
+            ))
+        finally:
+            terminado.set()
+            await asyncio.gather(*tareas_admin)
+        duracion = time.perf_counter() - inicio
+    finally:
+        for cliente in clientes:
+            await cliente.aclose()
+    return metricas.resumen(duracion)
@@ -0,0 +1,87 @@
+"""
+Fixtures de los tests: la app en proceso (httpx.ASGITransport) sobre un SQLite temporal.
+
+Se ejecutan desde el directorio del proyecto (las rutas de estáticos son relativas):
+    python -m pytest tests
+"""
+import os
+import shutil
+import tempfile
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="tests-comedor-")
+# Antes de importar la app: settings se leen al importar
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_DIRECTORIO}/tests.db",
+    "DB_ECHO": "false",
+    "SECRET_KEY": "tests-secret-key",
+    "ADMIN_USERNAME": "admin",
+    "ADMIN_PASSWORD": "admin-password",
+    "ADMIN_EMAIL": "admin@example.com",
+    "DEMO_ROOMS": "101:Gomez,102:Perez,103:Lopez,104:Diaz,105:Ruiz,106:Vega,107:Mora",
+    "ARCHIVO_INTERVALO_SECONDS": "86400",  # Los tests archivan a mano
+})
+
+import httpx
+import pytest
+from app.database import engine, engine_lectura
+from app.main import app
+from app.utils.consultas import instrumentar_engine, presupuesto
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="session")
+async def app_en_marcha(anyio_backend):
+    """La app arrancada (esquema, semilla y tareas de fondo) durante toda la sesión"""
+    async with app.router.lifespan_context(app):
+        yield app
+    await engine.dispose()
+    await engine_lectura.dispose()
+    shutil.rmtree(_DIRECTORIO, ignore_errors=True)
+
+def _cliente(aplicacion) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=aplicacion), base_url="http://test")
+
+@pytest.fixture
+async def cliente(app_en_marcha):
+    """Cliente sin sesión"""
+    async with _cliente(app_en_marcha) as cliente:
+        yield cliente
+
+@pytest.fixture
+async def iniciar_sesion(app_en_marcha):
+    """Abre clientes con la sesión de una habitación de demo: `await iniciar_sesion("102", "Perez")`"""
+    clientes = []
+    async def iniciar(numero: str, apellido: str) -> httpx.AsyncClient:
+        cliente = _cliente(app_en_marcha)
+        clientes.append(cliente)
+        respuesta = await cliente.post("/api/auth/login", json={"numero": numero, "apellido": apellido})
+        assert respuesta.status_code == 200, respuesta.text
+        return cliente
+    yield iniciar
+    for cliente in clientes:
+        await cliente.aclose()
+
+@pytest.fixture
+async def huesped(iniciar_sesion):
+    """Cliente con la sesión de la habitación 101"""
+    return await iniciar_sesion("101", "Gomez")
+
+@pytest.fixture
+async def admin(app_en_marcha):
+    """Cliente con el token del administrador"""
+    async with _cliente(app_en_marcha) as cliente:
+        respuesta = await cliente.post(
+            "/api/auth/admin/login", data={"username": "admin", "password": "admin-password"}
+        )
+        assert respuesta.status_code == 200, respuesta.text
+        cliente.headers["Authorization"] = f"Bearer {respuesta.json()['access_token']}"
+        yield cliente
+
+@pytest.fixture
+def presupuesto_consultas():
+    """`presupuesto` con el registro de consultas enganchado a los engines de la app"""
+    instrumentar_engine(engine)
+    instrumentar_engine(engine_lectura)
+    return presupuesto
@@ -0,0 +1,68 @@
+"""Archivo de pedidos: los ids archivados no se reutilizan"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select, text, update
+from app.database import AsyncSessionLocal, Base
+from app.models import Pedido, PedidoArchivo, Ticket
+from app.utils.archivo import ids_sin_reutilizar
+
+pytestmark = pytest.mark.anyio
+
+async def _pedido_antiguo_entregado(huesped, admin) -> int:
+    """Línea confirmada y entregada con fecha anterior al corte del archivo"""
+    respuesta = await huesped.post("/api/pedidos/", json={"producto_id": 4, "cantidad": 1})
+    assert respuesta.status_code == 201, respuesta.text
+    pedido_id = respuesta.json()["id"]
+    # Confirma también lo que otros tests dejaron pendiente en la habitación: se entrega todo
+    ticket_id = (await huesped.post("/api/pedidos/confirmar")).json()["ticket_id"]
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"habitacion": "101", "estado": "entregado"})
+    assert respuesta.status_code == 200, respuesta.text
+    hace_40_dias = datetime.utcnow() - timedelta(days=40)
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(fecha=hace_40_dias))
+        await db.execute(update(Pedido).where(Pedido.ticket_id == ticket_id).values(fecha=hace_40_dias))
+        await db.commit()
+    return pedido_id
+
+async def test_archivar_insertar_y_archivar_de_nuevo(huesped, admin):
+    archivado_id = await _pedido_antiguo_entregado(huesped, admin)
+    respuesta = await admin.post("/api/admin/archivo")
+    assert respuesta.status_code == 200 and respuesta.json()["archivadas"] >= 1
+
+    # La siguiente línea no recibe el id que acaba de salir de la tabla
+    siguiente_id = await _pedido_antiguo_entregado(huesped, admin)
+    assert siguiente_id > archivado_id
+
+    respuesta = await admin.post("/api/admin/archivo")
+    assert respuesta.status_code == 200 and respuesta.json()["archivadas"] >= 1
+    async with AsyncSessionLocal() as db:
+        archivados = set((await db.execute(select(PedidoArchivo.id))).scalars())
+        vivos = set((await db.execute(select(Pedido.id))).scalars())
+    assert {archivado_id, siguiente_id} <= archivados
+    assert not archivados & vivos
+
+def test_migracion_de_tabla_sin_autoincrement():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        # Tabla como la creaban las versiones anteriores, con un id ya reutilizado
+        conn.exec_driver_sql("DROP TABLE pedidos")
+        conn.exec_driver_sql(
+            "CREATE TABLE pedidos (id INTEGER NOT NULL PRIMARY KEY, habitacion_id INTEGER, "
+            "producto_id INTEGER, cantidad INTEGER, notas VARCHAR(255), estado VARCHAR(10), "
+            "fecha DATETIME, hora_entrega DATETIME, precio_unitario FLOAT, ticket_id INTEGER)"
+        )
+        conn.exec_driver_sql("INSERT INTO pedidos (id, cantidad, estado) VALUES (3, 1, 'pendiente'), (5, 2, 'pendiente')")
+        conn.exec_driver_sql("INSERT INTO pedidos_archivo (id, cantidad, estado) VALUES (5, 1, 'entregado')")
+
+        ids_sin_reutilizar(conn)
+
+        ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'pedidos'").scalar()
+        assert "AUTOINCREMENT" in ddl
+        assert conn.exec_driver_sql("SELECT id, cantidad FROM pedidos ORDER BY id").all() == [(3, 1), (10, 2)]
+        indices = {fila[0] for fila in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE tbl_name = 'pedidos' AND type = 'index'")}
+        assert {index.name for index in Pedido.__table__.indexes} <= indices
+
+        conn.exec_driver_sql("DELETE FROM pedidos WHERE id = 10")
+        conn.exec_driver_sql("INSERT INTO pedidos (cantidad, estado) VALUES (1, 'pendiente')")
+        assert conn.execute(text("SELECT max(id) FROM pedidos")).scalar() == 11
@@ -0,0 +1,28 @@
+"""Arranque en frío: los módulos de funciones desactivadas no se importan"""
+import os
+import subprocess
+import sys
+
+OPCIONALES = ("app.utils.ingesta", "app.utils.estaticos", "app.utils.idempotencia", "app.utils.exportacion")
+
+def _modulos_cargados(**entorno) -> set:
+    codigo = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {OPCIONALES!r} if m in sys.modules))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], env={**os.environ, **entorno},
+        capture_output=True, text=True, check=True, timeout=60,
+    ).stdout.strip()
+    return set(filter(None, salida.split(",")))
+
+def test_funciones_desactivadas_no_se_importan():
+    assert not _modulos_cargados(
+        PEDIDOS_GROUP_COMMIT="false", ESTATICOS_EN_MEMORIA="false",
+        IDEMPOTENCIA_HABILITADA="false", ARCHIVO_HABILITADO="false",
+    )
+
+def test_funciones_activadas_se_importan():
+    assert _modulos_cargados(
+        PEDIDOS_GROUP_COMMIT="true", ESTATICOS_EN_MEMORIA="true", IDEMPOTENCIA_HABILITADA="true",
+    ) == {"app.utils.ingesta", "app.utils.estaticos", "app.utils.idempotencia"}
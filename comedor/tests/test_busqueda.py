@@ -0,0 +1,32 @@
+"""Búsqueda de productos: FTS5 sin acentos y por prefijo, y la alternativa con LIKE"""
+import pytest
+from app.utils import busqueda
+
+pytestmark = pytest.mark.anyio
+
+async def _nombres(cliente, q):
+    respuesta = await cliente.get("/api/productos/buscar", params={"q": q, "todos": True})
+    assert respuesta.status_code == 200
+    return [producto["nombre"] for producto in respuesta.json()]
+
+@pytest.mark.parametrize("q, nombre", [
+    ("cafe", "Café Espresso"),
+    ("CAFÉ esp", "Café Espresso"),
+    ("te verde", "Té Verde"),
+    ("cerv", "Cerveza Lager"),
+])
+async def test_fts_sin_acentos_y_por_prefijo(cliente, q, nombre):
+    assert busqueda._fts is True
+    assert await _nombres(cliente, q) == [nombre]
+
+async def test_sintaxis_fts_del_huesped_no_se_interpreta(cliente):
+    # "OR" es un término más (que ningún producto contiene), no un operador
+    assert await _nombres(cliente, 'vino" OR "agua') == []
+    assert await _nombres(cliente, 'vino"') == ["Vino Tinto"]
+    assert await _nombres(cliente, "*") == []
+
+async def test_like_sin_fts(cliente, monkeypatch):
+    monkeypatch.setattr(busqueda, "_fts", False)
+    assert await _nombres(cliente, "cerv") == ["Cerveza Lager"]
+    assert await _nombres(cliente, "Café esp") == ["Café Espresso"]
+    assert await _nombres(cliente, "naranja zumo") == ["Zumo de Naranja"]
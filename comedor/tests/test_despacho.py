@@ -0,0 +1,44 @@
+"""El plan de despacho mantenido incrementalmente coincide con el de una recarga completa"""
+import pytest
+from app.utils.despacho import despacho, planta
+
+pytestmark = pytest.mark.anyio
+
+def test_planta():
+    assert planta("305") == 3
+    assert planta("1203") == 12
+    assert planta("12") == 0
+    assert planta("") is None
+
+async def _plan(admin):
+    respuesta = await admin.get("/api/admin/despacho", params={"limit": 100})
+    assert respuesta.status_code == 200
+    plan = respuesta.json()
+    # Lo que depende del reloj no es comparable entre dos llamadas
+    del plan["generado"]
+    for ruta in plan["rutas"]:
+        for campo in ("espera_max_segundos", "salida_estimada", "entrega_estimada"):
+            del ruta[campo]
+    return plan
+
+async def test_incremental_igual_que_recarga(huesped, iniciar_sesion, admin):
+    despacho.invalidar()
+    antes = await _plan(admin)  # Carga completa; desde aquí solo cambios incrementales
+
+    otro = await iniciar_sesion("102", "Perez")
+    ids = []
+    for cliente, producto_id in ((huesped, 1), (otro, 3), (huesped, 4), (otro, 4), (huesped, 7)):
+        ids.append((await cliente.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 1})).json()["id"])
+    assert (await huesped.post("/api/pedidos/confirmar")).status_code == 200
+    assert (await otro.post("/api/pedidos/confirmar")).status_code == 200
+    assert (await admin.put(f"/api/admin/pedidos/{ids[0]}", params={"estado": "entregado"})).status_code == 200
+    assert (await admin.put("/api/admin/pedidos/estado", json={"ids": [ids[3]], "estado": "cancelado"})).status_code == 200
+
+    incremental = await _plan(admin)
+    assert incremental["lineas_abiertas"] == antes["lineas_abiertas"] + 3
+    en_plan = {linea["id"] for ruta in incremental["rutas"] for parada in ruta["paradas"] for linea in parada["lineas"]}
+    assert {ids[1], ids[2], ids[4]} <= en_plan
+    assert not {ids[0], ids[3]} & en_plan
+
+    despacho.invalidar()
+    assert await _plan(admin) == incremental
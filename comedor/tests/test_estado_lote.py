@@ -0,0 +1,42 @@
+"""Cambio de estado en lote: resultado por id y solo transiciones válidas"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+def _por_id(respuesta) -> dict:
+    return {r["id"]: r for r in respuesta.json()["resultados"]}
+
+async def test_resultado_por_id(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("106", "Vega")
+    confirmados = [
+        (await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 1})).json()["id"]
+        for producto_id in (1, 3)
+    ]
+    assert (await huesped.post("/api/pedidos/confirmar")).status_code == 200
+    pendiente = (await huesped.post("/api/pedidos/", json={"producto_id": 4, "cantidad": 1})).json()["id"]
+
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={
+        "ids": [confirmados[0], pendiente, 99999999], "estado": "entregado"
+    })
+    assert respuesta.status_code == 200
+    assert respuesta.json()["actualizados"] == 1
+    resultados = _por_id(respuesta)
+    assert resultados[confirmados[0]]["resultado"] == "actualizado"
+    assert resultados[pendiente] == {"id": pendiente, "resultado": "transicion_invalida", "estado_actual": "pendiente"}
+    assert resultados[99999999]["resultado"] == "no_encontrado"
+
+    # Repetir la entrega: lo ya entregado queda como transición inválida
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"ids": confirmados, "estado": "entregado"})
+    resultados = _por_id(respuesta)
+    assert resultados[confirmados[1]]["resultado"] == "actualizado"
+    assert resultados[confirmados[0]]["estado_actual"] == "entregado"
+
+    # Por filtro: habitación y estado actual
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={
+        "habitacion": "106", "estado_actual": "pendiente", "estado": "cancelado"
+    })
+    assert respuesta.json()["actualizados"] == 1
+    assert _por_id(respuesta)[pendiente]["resultado"] == "actualizado"
+
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"estado": "cancelado"})
+    assert respuesta.status_code == 400
@@ -0,0 +1,29 @@
+"""Estáticos en memoria: URLs con huella, compresión y revalidación con If-None-Match"""
+import pytest
+from app.utils.estaticos import CACHE_INMUTABLE, estaticos
+
+pytestmark = pytest.mark.anyio
+
+async def test_revalidacion_con_if_none_match(cliente):
+    respuesta = await cliente.get("/static/js/app.js")
+    assert respuesta.status_code == 200
+    etag = respuesta.headers["etag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"otra", {etag}', "*"):
+        respuesta = await cliente.get("/static/js/app.js", headers={"If-None-Match": if_none_match})
+        assert respuesta.status_code == 304, if_none_match
+        assert respuesta.headers["etag"] == etag
+    respuesta = await cliente.get("/static/js/app.js", headers={"If-None-Match": '"otra"'})
+    assert respuesta.status_code == 200
+
+async def test_url_con_huella_inmutable_y_comprimida(cliente):
+    url = estaticos.url("/static/js/app.js")
+    assert url != "/static/js/app.js"
+    respuesta = await cliente.get(url, headers={"Accept-Encoding": "gzip"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["cache-control"] == CACHE_INMUTABLE
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.content == estaticos.activos["js/app.js"].contenido  # httpx ya descomprime
+
+    respuesta = await cliente.get("/", headers={"If-None-Match": "*"})
+    assert respuesta.status_code == 304
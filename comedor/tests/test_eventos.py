@@ -0,0 +1,51 @@
+"""Feed de pedidos: reenvío desde Last-Event-ID y `reinicio` cuando hay hueco"""
+import json
+import pytest
+from app.utils.eventos import HubPedidos, hub_pedidos
+
+pytestmark = pytest.mark.anyio
+
+def _pendientes(suscripcion) -> list:
+    mensajes = []
+    while not suscripcion.cola.empty():
+        mensajes.append(suscripcion.cola.get_nowait())
+    return mensajes
+
+async def test_reenvio_desde_last_event_id():
+    hub = HubPedidos(max_buffer=3, max_cola=10)
+    ids = [hub.publicar("pedido_creado", {"n": n}) for n in range(5)]
+
+    # Lo posterior al último id recibido, en orden
+    assert [m[0] for m in _pendientes(hub.suscribir(ids[2]))] == ids[3:]
+    # Al día: nada que reenviar
+    assert _pendientes(hub.suscribir(ids[-1])) == []
+    # Los eventos 1 y 2 ya salieron del buffer (o el id es de otro proceso): recargar
+    for ultimo_id in (ids[0], 12345):
+        assert [m[1] for m in _pendientes(hub.suscribir(ultimo_id))] == ["reinicio"]
+
+async def test_formato_sse():
+    hub = HubPedidos(max_buffer=10, max_cola=10)
+    suscripcion = hub.suscribir()
+    id_evento = hub.publicar("pedidos_estado", {"ids": [1, 2], "estado": "entregado"})
+
+    async def desconectado():
+        return False
+    flujo = hub.stream(suscripcion, desconectado)
+    assert (await anext(flujo)).startswith("retry: ")
+    assert await anext(flujo) == (
+        f'id: {id_evento}\nevent: pedidos_estado\ndata: {{"ids": [1, 2], "estado": "entregado"}}\n\n'
+    )
+    await flujo.aclose()
+    assert hub.conectados == 0
+
+async def test_la_confirmacion_publica_en_el_feed(huesped):
+    suscripcion = hub_pedidos.suscribir()
+    try:
+        pedido_id = (await huesped.post("/api/pedidos/", json={"producto_id": 1, "cantidad": 1})).json()["id"]
+        ticket_id = (await huesped.post("/api/pedidos/confirmar")).json()["ticket_id"]
+        eventos = {evento: json.loads(datos) for _, evento, datos in _pendientes(suscripcion)}
+        assert eventos["pedido_creado"]["id"] == pedido_id
+        assert eventos["pedidos_confirmados"]["ticket_id"] == ticket_id
+        assert pedido_id in eventos["pedidos_confirmados"]["pedido_ids"]
+    finally:
+        hub_pedidos.cancelar(suscripcion)
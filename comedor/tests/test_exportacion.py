@@ -0,0 +1,61 @@
+"""Exportación CSV/NDJSON: une tabla viva y archivo, y `hasta` sin hora incluye el día"""
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import update
+from app.database import AsyncSessionLocal
+from app.models import Pedido, Ticket
+
+pytestmark = pytest.mark.anyio
+
+async def _exportar(admin, formato: str, desde: date, hasta: date) -> list:
+    respuesta = await admin.get("/api/admin/pedidos/export", params={
+        "format": formato, "desde": desde.isoformat(), "hasta": hasta.isoformat()
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    assert "attachment" in respuesta.headers["content-disposition"]
+    if formato == "csv":
+        assert respuesta.headers["content-type"].startswith("text/csv")
+        return list(csv.DictReader(io.StringIO(respuesta.content.decode("utf-8-sig"))))
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(linea) for linea in respuesta.text.splitlines()]
+
+async def test_exportacion_sobre_el_archivo(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("107", "Mora")
+    antiguos = [
+        (await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 2})).json()["id"]
+        for producto_id in (1, 5)
+    ]
+    ticket_id = (await huesped.post("/api/pedidos/confirmar")).json()["ticket_id"]
+    await admin.put("/api/admin/pedidos/estado", json={"ids": antiguos, "estado": "entregado"})
+    hace_40_dias = datetime.utcnow() - timedelta(days=40)
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(fecha=hace_40_dias))
+        await db.execute(update(Pedido).where(Pedido.ticket_id == ticket_id).values(fecha=hace_40_dias))
+        await db.commit()
+    assert (await admin.post("/api/admin/archivo")).json()["archivadas"] >= 2
+    reciente = (await huesped.post("/api/pedidos/", json={"producto_id": 3, "cantidad": 1})).json()["id"]
+
+    hoy = datetime.utcnow().date()
+    desde = hoy - timedelta(days=60)
+    filas = await _exportar(admin, "csv", desde, hoy)
+    ids = [int(fila["id"]) for fila in filas]
+    assert set(antiguos) | {reciente} <= set(ids)
+    assert len(ids) == len(set(ids))
+    claves = [(fila["fecha"], int(fila["id"])) for fila in filas]
+    assert claves == sorted(claves)
+    fila = next(fila for fila in filas if int(fila["id"]) == antiguos[0])
+    assert (fila["estado"], fila["cantidad"], fila["importe"]) == ("entregado", "2", "20.0")
+
+    registros = await _exportar(admin, "ndjson", desde, hoy)
+    assert [registro["id"] for registro in registros] == ids
+
+    # Hasta ayer: lo de hoy queda fuera y lo archivado sigue dentro
+    ids = {registro["id"] for registro in await _exportar(admin, "ndjson", desde, hoy - timedelta(days=1))}
+    assert reciente not in ids and set(antiguos) <= ids
+
+async def test_formato_invalido(admin):
+    assert (await admin.get("/api/admin/pedidos/export", params={"format": "xml"})).status_code == 422
+    assert (await admin.get("/api/admin/pedidos/export", params={"desde": "ayer"})).status_code == 400
@@ -0,0 +1,35 @@
+"""Idempotency-Key en el alta de pedidos"""
+import asyncio
+import time
+import pytest
+from app.utils.idempotencia import AlmacenIdempotencia, RespuestaGuardada
+
+pytestmark = pytest.mark.anyio
+
+async def test_repite_la_respuesta_sin_ejecutar_de_nuevo(huesped):
+    cabeceras = {"Idempotency-Key": "alta-repetida"}
+    primera = await huesped.post("/api/pedidos/", json={"producto_id": 1, "cantidad": 1}, headers=cabeceras)
+    segunda = await huesped.post("/api/pedidos/", json={"producto_id": 1, "cantidad": 1}, headers=cabeceras)
+    assert primera.status_code == segunda.status_code == 201
+    assert segunda.headers["idempotent-replayed"] == "true"
+    assert segunda.json()["id"] == primera.json()["id"]
+
+    otra = await huesped.post("/api/pedidos/", json={"producto_id": 1, "cantidad": 2}, headers=cabeceras)
+    assert otra.status_code == 422
+
+async def test_los_errores_no_se_repiten_a_los_duplicados(huesped):
+    cabeceras = {"Idempotency-Key": "alta-fallida"}
+    respuestas = await asyncio.gather(*(
+        huesped.post("/api/pedidos/", json={"producto_id": 99999, "cantidad": 1}, headers=cabeceras)
+        for _ in range(3)
+    ))
+    assert [r.status_code for r in respuestas] == [404, 404, 404]
+    assert not any("idempotent-replayed" in r.headers for r in respuestas)
+
+async def test_persistida_se_lee_de_la_base(app_en_marcha):
+    guardada = RespuestaGuardada("huella", 201, "application/json", b'{"id":1}', time.time() + 60)
+    await AlmacenIdempotencia(60, 10, persistir=True).guardar("clave-persistida", guardada)
+    # Otro proceso (almacén vacío) la encuentra en la base
+    leida = await AlmacenIdempotencia(60, 10, persistir=True).obtener("clave-persistida")
+    assert leida is not None
+    assert (leida.huella, leida.estado, leida.cuerpo) == ("huella", 201, b'{"id":1}')
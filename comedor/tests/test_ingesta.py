@@ -0,0 +1,37 @@
+"""Commit agrupado: cada petición recibe el id de su propia fila"""
+import asyncio
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models import EstadoPedidoDB, Pedido
+from app.utils.ingesta import ColaPedidos
+
+pytestmark = pytest.mark.anyio
+
+def _fila(n: int) -> dict:
+    # Canceladas: no entran en confirmaciones ni resúmenes de otros tests
+    return {
+        "habitacion_id": 3, "producto_id": 1 + n % 3, "cantidad": n + 1, "notas": f"lote-{n}",
+        "estado": EstadoPedidoDB.cancelado, "fecha": datetime.utcnow(), "precio_unitario": 1.0,
+    }
+
+async def _notas_por_id(ids) -> dict:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(select(Pedido.id, Pedido.notas).where(Pedido.id.in_(ids)))).all())
+
+async def test_ids_de_cada_fila(app_en_marcha):
+    cola = ColaPedidos(intervalo_ms=20, max_filas=5)  # 12 filas: lotes de 5, 5 y 2
+    ids = await asyncio.gather(*(cola.encolar(_fila(n)) for n in range(12)))
+    assert len(set(ids)) == 12
+    assert await _notas_por_id(ids) == {pedido_id: f"lote-{n}" for n, pedido_id in enumerate(ids)}
+
+async def test_cerrar_vacia_lo_pendiente(app_en_marcha):
+    cola = ColaPedidos(intervalo_ms=60_000, max_filas=100)  # Sin cerrar no se vaciaría
+    tareas = [asyncio.create_task(cola.encolar(_fila(n))) for n in range(3)]
+    await asyncio.sleep(0)
+    await cola.cerrar()
+    ids = [await tarea for tarea in tareas]
+    assert sorted((await _notas_por_id(ids)).values()) == ["lote-0", "lote-1", "lote-2"]
+    with pytest.raises(RuntimeError):
+        await cola.encolar(_fila(3))
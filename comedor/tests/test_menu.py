@@ -0,0 +1,50 @@
+"""Menú cacheado: ETag por versión, 304 y invalidación al escribir productos"""
+import json
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+@pytest.mark.parametrize("ruta", ["/api/productos", "/api/categorias"])
+async def test_etag_y_304(cliente, admin, presupuesto_consultas, ruta):
+    respuesta = await cliente.get(ruta)
+    assert respuesta.status_code == 200
+    etag = respuesta.headers["etag"]
+
+    async with presupuesto_consultas(consultas=0):
+        for if_none_match in (etag, f"W/{etag}", f'"viejo", {etag}'):
+            respuesta = await cliente.get(ruta, headers={"If-None-Match": if_none_match})
+            assert respuesta.status_code == 304
+            assert respuesta.content == b""
+
+    # Una escritura de productos cambia la versión: el ETag anterior deja de valer
+    assert (await admin.put("/api/admin/productos/6/stock", json={"stock": None})).status_code == 200
+    respuesta = await cliente.get(ruta, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+
+def _menu_incrustado(html: str) -> dict:
+    inicio = html.index('<script id="menu-inicial" type="application/json">')
+    contenido = html[html.index(">", inicio) + 1:html.index("</script>", inicio)]
+    return json.loads(contenido)
+
+async def test_pagina_de_productos_con_el_menu(huesped, admin, presupuesto_consultas):
+    respuesta = await huesped.get("/productos")
+    assert respuesta.status_code == 200
+    menu = _menu_incrustado(respuesta.text)
+    disponibles = [p for p in (await huesped.get("/api/productos")).json() if p["disponible"]]
+    assert sorted(p["id"] for p in menu["productos"]) == sorted(p["id"] for p in disponibles)
+    assert [c["id"] for c in menu["categorias"]] == [c["id"] for c in (await huesped.get("/api/categorias")).json()]
+
+    # Mientras no cambie el catálogo la página sale de memoria
+    async with presupuesto_consultas(consultas=0):
+        assert (await huesped.get("/productos")).content == respuesta.content
+
+    # Un producto agotado desaparece de la página regenerada
+    assert (await admin.put("/api/admin/productos/6/stock", json={"stock": 0})).status_code == 200
+    try:
+        menu_nuevo = _menu_incrustado((await huesped.get("/productos")).text)
+        assert menu_nuevo["version"] != menu["version"]
+        assert 6 not in {p["id"] for p in menu_nuevo["productos"]}
+    finally:
+        await admin.put("/api/admin/productos/6/stock", json={"stock": 10})
+        await admin.put("/api/admin/productos/6/stock", json={"stock": None})
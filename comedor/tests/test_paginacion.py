@@ -0,0 +1,58 @@
+"""Listado de administración: paginación por cursor sobre (fecha, id) con tabla viva y archivo"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from app.database import AsyncSessionLocal
+from app.models import Habitacion, Pedido, Ticket
+from app.utils.archivo import pedidos_historico
+
+pytestmark = pytest.mark.anyio
+
+async def _recorrer(admin, **params) -> list:
+    ids, cursor = [], None
+    while True:
+        pagina = (await admin.get("/api/admin/pedidos", params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        ids += [item["id"] for item in pagina["items"]]
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            return ids
+
+async def _esperados(habitacion: str = None, estado: str = None, desde: datetime = None) -> list:
+    P = pedidos_historico()
+    stmt = select(P.id).order_by(P.fecha.desc(), P.id.desc())
+    if habitacion:
+        stmt = stmt.where(P.habitacion_id == select(Habitacion.id).where(Habitacion.numero == habitacion).scalar_subquery())
+    if estado:
+        stmt = stmt.where(P.estado == estado)
+    if desde:
+        stmt = stmt.where(P.fecha >= desde)
+    async with AsyncSessionLocal() as db:
+        return list((await db.execute(stmt)).scalars())
+
+async def test_cursor_sobre_el_archivo(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("105", "Ruiz")
+    # Unas líneas antiguas archivadas y otras vivas intercaladas por fecha
+    for ronda in range(3):
+        ids = [
+            (await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 1})).json()["id"]
+            for producto_id in (1, 3)
+        ]
+        ticket_id = (await huesped.post("/api/pedidos/confirmar")).json()["ticket_id"]
+        await admin.put("/api/admin/pedidos/estado", json={"ids": ids, "estado": "entregado"})
+        fecha = datetime.utcnow() - timedelta(days=40 + ronda)
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(fecha=fecha))
+            await db.execute(update(Pedido).where(Pedido.ticket_id == ticket_id).values(fecha=fecha))
+            await db.commit()
+    assert (await admin.post("/api/admin/archivo")).json()["archivadas"] >= 6
+    for _ in range(3):
+        await huesped.post("/api/pedidos/", json={"producto_id": 4, "cantidad": 1})
+
+    assert await _recorrer(admin, per_page=7) == await _esperados()
+    assert await _recorrer(admin, per_page=2, habitacion="105") == await _esperados("105")
+    assert await _recorrer(admin, per_page=3, habitacion="105", status="entregado") == await _esperados("105", "entregado")
+    # Desde una fecha posterior al corte solo queda lo reciente
+    desde = datetime.combine((datetime.utcnow() - timedelta(days=1)).date(), datetime.min.time())
+    recientes = await _recorrer(admin, per_page=5, habitacion="105", desde=desde.date().isoformat())
+    assert recientes == await _esperados("105", desde=desde)
+    assert len(recientes) >= 3
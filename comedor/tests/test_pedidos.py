@@ -0,0 +1,27 @@
+"""Alta de líneas con INSERT ... RETURNING y datos de referencia cacheados"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_alta_igual_que_la_lectura(iniciar_sesion):
+    huesped = await iniciar_sesion("103", "Lopez")
+    respuesta = await huesped.post("/api/pedidos/", json={"producto_id": 3, "cantidad": 2, "notas": "sin hielo"})
+    assert respuesta.status_code == 201
+    creada = respuesta.json()
+    assert creada["producto"]["id"] == 3 and creada["precio_unitario"] == 3.0
+    assert creada["habitacion"]["numero"] == "103"
+
+    pendientes = {linea["id"]: linea for linea in (await huesped.get("/api/pedidos/pendientes")).json()}
+    assert pendientes[creada["id"]] == creada
+
+async def test_producto_inexistente_o_no_disponible(huesped, admin):
+    respuesta = await huesped.post("/api/pedidos/", json={"producto_id": 9999, "cantidad": 1})
+    assert respuesta.status_code == 404
+
+    assert (await admin.put("/api/admin/productos/6/stock", json={"stock": 0})).status_code == 200
+    try:
+        respuesta = await huesped.post("/api/pedidos/", json={"producto_id": 6, "cantidad": 1})
+        assert respuesta.status_code == 404
+    finally:
+        await admin.put("/api/admin/productos/6/stock", json={"stock": 10})
+        await admin.put("/api/admin/productos/6/stock", json={"stock": None})
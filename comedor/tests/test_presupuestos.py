@@ -0,0 +1,54 @@
+"""Presupuestos de consultas y latencia de los endpoints más llamados"""
+import pytest
+from app.utils.cache import invalidar_menu
+
+pytestmark = pytest.mark.anyio
+
+async def test_pedidos_pendientes(huesped, presupuesto_consultas):
+    for producto_id in (1, 2, 3):
+        respuesta = await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 1})
+        assert respuesta.status_code == 201, respuesta.text
+
+    # Una sola consulta con JOIN, sin una carga por línea
+    async with presupuesto_consultas(consultas=1, ms=250, n_mas_1=2):
+        respuesta = await huesped.get("/api/pedidos/pendientes")
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()) >= 3
+
+async def test_listar_categorias(huesped, presupuesto_consultas):
+    invalidar_menu()  # Medir la carga, no la caché del menú
+    async with presupuesto_consultas(consultas=2, ms=250, n_mas_1=2):
+        respuesta = await huesped.get("/api/categorias")
+    assert respuesta.status_code == 200
+    assert any(categoria["productos"] for categoria in respuesta.json())
+
+    async with presupuesto_consultas(consultas=0):
+        respuesta = await huesped.get("/api/categorias")
+    assert respuesta.status_code == 200
+
+async def test_alta_y_confirmacion(huesped, presupuesto_consultas):
+    # INSERT ... RETURNING más los resúmenes; los productos salen de la caché de referencia
+    for producto_id in (1, 3, 4, 5):
+        async with presupuesto_consultas(consultas=5, ms=250, n_mas_1=2):
+            respuesta = await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 1})
+        assert respuesta.status_code == 201
+
+    # Confirmar cuesta lo mismo con una línea que con muchas
+    async with presupuesto_consultas(consultas=7, ms=250, n_mas_1=2):
+        respuesta = await huesped.post("/api/pedidos/confirmar")
+    assert respuesta.status_code == 200
+
+async def test_listados_de_administracion(huesped, admin, presupuesto_consultas):
+    for _ in range(5):
+        await huesped.post("/api/pedidos/", json={"producto_id": 1, "cantidad": 1})
+        await huesped.post("/api/pedidos/confirmar")
+
+    # Tabla viva y archivo: una consulta cada una, sin cargas por línea
+    async with presupuesto_consultas(consultas=2, ms=250, n_mas_1=2):
+        respuesta = await admin.get("/api/admin/pedidos", params={"per_page": 50})
+    assert respuesta.status_code == 200 and len(respuesta.json()["items"]) >= 5
+
+    # Cabeceras y líneas (más el archivo si alguna es anterior al corte)
+    async with presupuesto_consultas(consultas=3, ms=250, n_mas_1=2):
+        respuesta = await admin.get("/api/admin/tickets", params={"desde": "2000-01-01", "per_page": 50})
+    assert respuesta.status_code == 200 and len(respuesta.json()["items"]) >= 5
@@ -0,0 +1,33 @@
+"""Proyecciones sin ORM: mismos bytes que la serialización de pydantic sobre objetos ORM"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import noload, selectinload
+from app.database import AsyncSessionLocal
+from app.models import Habitacion, Pedido
+from app.utils.proyecciones import a_json, pedidos_adapter, pedidos_dicts, select_pedidos
+
+pytestmark = pytest.mark.anyio
+
+async def test_mismos_bytes_que_el_orm(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("102", "Perez")
+    for producto_id, notas in ((1, None), (3, 'con "comillas" y ñ'), (4, "")):
+        await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": 2, "notas": notas})
+    ticket_id = (await huesped.post("/api/pedidos/confirmar")).json()["ticket_id"]
+    await admin.put("/api/admin/pedidos/estado", json={"habitacion": "102", "estado_actual": "en_proceso", "estado": "entregado"})
+    await huesped.post("/api/pedidos/", json={"producto_id": 5, "cantidad": 1})
+
+    async with AsyncSessionLocal() as db:
+        filas = (await db.execute(select_pedidos().order_by(Pedido.id))).all()
+        objetos = (await db.execute(
+            select(Pedido)
+            .options(selectinload(Pedido.producto), selectinload(Pedido.habitacion).noload(Habitacion.pedidos))
+            .order_by(Pedido.id)
+        )).scalars().all()
+    esperado = pedidos_adapter.dump_json(pedidos_adapter.validate_python(objetos, from_attributes=True))
+    assert a_json(pedidos_dicts(filas), pedidos_adapter) == esperado
+    assert ticket_id in {fila.ticket_id for fila in filas}
+
+    # El endpoint responde esos mismos bytes
+    pendientes = [o for o in objetos if o.habitacion_id == 2 and o.estado.value == "pendiente"]
+    respuesta = await huesped.get("/api/pedidos/pendientes")
+    assert respuesta.content == pedidos_adapter.dump_json(pedidos_adapter.validate_python(pendientes, from_attributes=True))
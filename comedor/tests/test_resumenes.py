@@ -0,0 +1,46 @@
+"""Resúmenes incrementales: tras cualquier secuencia de escrituras coinciden con la reconstrucción"""
+import pytest
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models import ResumenDia, ResumenHora, ResumenProductoDia
+
+pytestmark = pytest.mark.anyio
+
+async def _resumenes() -> dict:
+    async with AsyncSessionLocal() as db:
+        return {
+            modelo.__tablename__: sorted(
+                tuple(round(valor, 6) if isinstance(valor, float) else valor for valor in fila)
+                for fila in (await db.execute(select(*modelo.__table__.columns))).all()
+                if any(fila[-2:])  # Unidades e ingresos a cero equivalen a no tener fila
+            )
+            for modelo in (ResumenHora, ResumenDia, ResumenProductoDia)
+        }
+
+async def test_incrementales_igual_que_reconstruidos(iniciar_sesion, admin):
+    # Otros tests reescriben fechas por SQL: se parte de resúmenes reconstruidos
+    assert (await admin.post("/api/admin/resumenes/reconstruir")).status_code == 200
+    huesped = await iniciar_sesion("105", "Ruiz")
+
+    ids = []
+    for producto_id, cantidad in ((1, 1), (3, 2), (5, 3), (6, 1)):
+        respuesta = await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": cantidad})
+        ids.append(respuesta.json()["id"])
+    respuesta = await huesped.post("/api/pedidos/batch", json=[
+        {"producto_id": 4, "cantidad": 2}, {"producto_id": 7, "cantidad": 1}
+    ])
+    assert respuesta.status_code == 201, respuesta.text
+    ids += [p["id"] for p in respuesta.json()]
+    assert (await huesped.put(f"/api/pedidos/{ids[1]}", json={"cantidad": 5})).status_code == 200
+    assert (await huesped.put(f"/api/pedidos/{ids[2]}", json={"estado": "cancelado"})).status_code == 200
+    assert (await huesped.delete(f"/api/pedidos/{ids[3]}")).status_code == 200
+    assert (await huesped.post("/api/pedidos/confirmar")).status_code == 200
+
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"ids": [ids[4]], "estado": "cancelado"})
+    assert respuesta.json()["actualizados"] == 1
+    assert (await admin.put(f"/api/admin/pedidos/{ids[0]}", params={"estado": "entregado"})).status_code == 200
+    assert (await admin.put(f"/api/admin/pedidos/{ids[5]}", params={"estado": "cancelado"})).status_code == 200
+
+    incrementales = await _resumenes()
+    assert (await admin.post("/api/admin/resumenes/reconstruir")).status_code == 200
+    assert incrementales == await _resumenes()
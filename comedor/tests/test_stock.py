@@ -0,0 +1,74 @@
+"""Existencias: las líneas confirmadas no se pueden inflar ni devolver al stock dos veces"""
+import pytest
+from sqlalchemy import select
+from app.database import AsyncSessionLocal
+from app.models import Producto
+
+pytestmark = pytest.mark.anyio
+
+PRODUCTO = 2
+
+async def _producto(producto_id: int):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(Producto.stock, Producto.disponible).where(Producto.id == producto_id)
+        )).one()
+
+async def _confirmar(cliente, cantidad: int) -> int:
+    respuesta = await cliente.post("/api/pedidos/", json={"producto_id": PRODUCTO, "cantidad": cantidad})
+    assert respuesta.status_code == 201, respuesta.text
+    pedido_id = respuesta.json()["id"]
+    respuesta = await cliente.post("/api/pedidos/confirmar")
+    assert respuesta.status_code == 200, respuesta.text
+    return pedido_id
+
+async def test_huesped_no_modifica_lineas_confirmadas(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("102", "Perez")
+    assert (await admin.put(f"/api/admin/productos/{PRODUCTO}/stock", json={"stock": 5})).status_code == 200
+    pedido_id = await _confirmar(huesped, 2)
+    assert (await _producto(PRODUCTO)).stock == 3
+
+    respuesta = await huesped.put(f"/api/pedidos/{pedido_id}", json={"cantidad": 50})
+    assert respuesta.status_code == 409
+    respuesta = await huesped.put(f"/api/pedidos/{pedido_id}", json={"estado": "cancelado"})
+    assert respuesta.status_code == 409
+    respuesta = await huesped.delete(f"/api/pedidos/{pedido_id}")
+    assert respuesta.status_code == 409
+
+    # Un pendiente se puede cambiar o cancelar, pero no confirmar por esta vía
+    respuesta = await huesped.post("/api/pedidos/", json={"producto_id": PRODUCTO, "cantidad": 1})
+    pendiente_id = respuesta.json()["id"]
+    respuesta = await huesped.put(f"/api/pedidos/{pendiente_id}", json={"estado": "en_proceso"})
+    assert respuesta.status_code == 409
+    respuesta = await huesped.put(f"/api/pedidos/{pendiente_id}", json={"cantidad": 3})
+    assert respuesta.status_code == 200 and respuesta.json()["cantidad"] == 3
+    respuesta = await huesped.put(f"/api/pedidos/{pendiente_id}", json={"estado": "cancelado"})
+    assert respuesta.status_code == 200
+    assert (await _producto(PRODUCTO)).stock == 3
+
+async def test_cancelar_repone_y_vuelve_a_estar_disponible(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("103", "Lopez")
+    assert (await admin.put(f"/api/admin/productos/{PRODUCTO}/stock", json={"stock": 2})).status_code == 200
+    pedido_id = await _confirmar(huesped, 2)
+    assert tuple(await _producto(PRODUCTO)) == (0, False)
+    menu = (await huesped.get("/api/productos")).json()
+    assert not next(p for p in menu if p["id"] == PRODUCTO)["disponible"]
+
+    respuesta = await admin.put(f"/api/admin/pedidos/{pedido_id}", params={"estado": "cancelado"})
+    assert respuesta.status_code == 200, respuesta.text
+    assert tuple(await _producto(PRODUCTO)) == (2, True)
+    menu = (await huesped.get("/api/productos")).json()
+    assert next(p for p in menu if p["id"] == PRODUCTO)["disponible"]
+
+async def test_admin_respeta_las_transiciones(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("103", "Lopez")
+    assert (await admin.put(f"/api/admin/productos/{PRODUCTO}/stock", json={"stock": 4})).status_code == 200
+    pedido_id = await _confirmar(huesped, 1)
+    respuesta = await admin.put(f"/api/admin/pedidos/{pedido_id}", params={"estado": "entregado"})
+    assert respuesta.status_code == 200, respuesta.text
+
+    # Lo entregado no vuelve a proceso ni se cancela: no se repone lo ya servido
+    for estado in ("en_proceso", "cancelado"):
+        respuesta = await admin.put(f"/api/admin/pedidos/{pedido_id}", params={"estado": estado})
+        assert respuesta.status_code == 409
+    assert (await _producto(PRODUCTO)).stock == 3
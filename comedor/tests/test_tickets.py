@@ -0,0 +1,47 @@
+"""Tickets: total guardado sobre los precios de cada línea y cuenta de la habitación"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def _cuenta_ticket(cliente, ticket_id: int) -> dict:
+    cuenta = (await cliente.get("/api/pedidos/cuenta")).json()
+    assert cuenta["total"] == round(sum(ticket["total"] for ticket in cuenta["tickets"]), 2)
+    return next(ticket for ticket in cuenta["tickets"] if ticket["id"] == ticket_id)
+
+async def test_total_del_ticket_y_cuenta(iniciar_sesion, admin):
+    huesped = await iniciar_sesion("104", "Diaz")
+    precios = {p["id"]: p["precio"] for p in (await huesped.get("/api/productos")).json()}
+    lineas = []
+    for producto_id, cantidad in ((1, 2), (3, 1), (5, 4)):
+        respuesta = await huesped.post("/api/pedidos/", json={"producto_id": producto_id, "cantidad": cantidad})
+        assert respuesta.status_code == 201, respuesta.text
+        lineas.append(respuesta.json())
+
+    confirmado = (await huesped.post("/api/pedidos/confirmar")).json()
+    esperado = round(sum(l["cantidad"] * precios[l["producto_id"]] for l in lineas), 2)
+    assert confirmado["total"] == esperado
+    ticket = await _cuenta_ticket(huesped, confirmado["ticket_id"])
+    assert ticket["total"] == esperado and ticket["estado"] == "en_proceso"
+    assert sorted(item["id"] for item in ticket["items"]) == sorted(l["id"] for l in lineas)
+
+    # El huésped no puede quitar líneas de un ticket confirmado: el total no cambia
+    respuesta = await huesped.delete(f"/api/pedidos/{lineas[0]['id']}")
+    assert respuesta.status_code == 409
+    assert (await _cuenta_ticket(huesped, confirmado["ticket_id"]))["total"] == esperado
+
+    # Una cancelación de administración sí descuenta la línea; al cerrar todo, el ticket se cierra
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"ids": [lineas[0]["id"]], "estado": "cancelado"})
+    assert respuesta.json()["actualizados"] == 1
+    esperado = round(esperado - lineas[0]["cantidad"] * precios[1], 2)
+    assert (await _cuenta_ticket(huesped, confirmado["ticket_id"]))["total"] == esperado
+    respuesta = await admin.put("/api/admin/pedidos/estado", json={"ids": [l["id"] for l in lineas[1:]], "estado": "entregado"})
+    assert respuesta.json()["actualizados"] == 2
+    ticket = await _cuenta_ticket(huesped, confirmado["ticket_id"])
+    assert ticket["total"] == esperado and ticket["estado"] == "entregado"
+
+async def test_eliminar_solo_pendientes(iniciar_sesion):
+    huesped = await iniciar_sesion("104", "Diaz")
+    respuesta = await huesped.post("/api/pedidos/", json={"producto_id": 2, "cantidad": 1})
+    pedido_id = respuesta.json()["id"]
+    assert (await huesped.delete(f"/api/pedidos/{pedido_id}")).status_code == 200
+    assert pedido_id not in [p["id"] for p in (await huesped.get("/api/pedidos/pendientes")).json()]